@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+AOT - Whole-ELF ahead-of-time translation to a cached Python module
+
+The block engine only compiles a block to Python source after it has run
+HOT_THRESHOLD times, and a new session starts that warm-up from scratch.
+For fixed binaries (NetHack, makedefs) the whole program can be
+translated once, offline:
+
+    python aot.py nethack.elf          # writes nethack.elf.aot.py
+
+The tool loads the executable PT_LOAD segments and walks the code from
+the entry point and every function symbol, following branch and jump
+targets, fall-through paths and call return sites. Each basic block it
+finds (with the same extent the block engine would give it) becomes one
+generated factory function (block_codegen), and the module maps block
+start addresses to the block's instruction words and factory.
+
+Running the module means importing Python code from the ELF's
+directory, so it is opt-in: RV32System(aot=True), SessionManager(aot=True)
+or pyrv32.py --aot. With it enabled, RV32System.load_elf() imports the
+module sitting next to the ELF if it was generated from the same image (ElfLoadResult.image_digest) and hands
+the blocks to the block engine, which runs them in the generated-source
+tier from the first execution. Python caches the compiled module in
+__pycache__, so later sessions skip code generation and compilation
+entirely. Blocks the walk did not reach (targets of indirect jumps
+through function pointers or jump tables) and blocks whose words no
+longer match (stores into code, intercepted routines) are translated at
+run time as before.
+"""
+
+import argparse
+import importlib.util
+import os
+from pathlib import Path
+
+from elftools.elf.elffile import ELFFile
+
+from cpu import RV32CPU
+from memory import Memory
+from predecode import PredecodeCache
+from block_engine import BlockEngine, RAS_PUSH, OPCODE_SYSTEM
+from block_codegen import RUNTIME_NAMES, generate_block_source
+from elf_loader import load_elf_image
+from exceptions import MemoryAccessFault
+
+
+# Bump when the generated module or the generated block code changes shape
+FORMAT_VERSION = 1
+
+MODULE_SUFFIX = '.aot.py'
+
+PF_X = 0x1
+
+# Symbol types that mark code entry points (assembly labels are NOTYPE)
+CODE_SYMBOL_TYPES = ('STT_FUNC', 'STT_NOTYPE')
+
+
+def module_path(elf_path):
+    """Return the path of the AOT module for an ELF (next to it)."""
+    return Path(str(elf_path) + MODULE_SUFFIX)
+
+
+def _header(image_digest):
+    """First line of a module, identifying the format and the image."""
+    return f"# pyrv32 AOT module: format {FORMAT_VERSION}, image {image_digest}\n"
+
+
+def _code_symbols(elf_path, ranges):
+    """Addresses of function and label symbols inside the code ranges."""
+    addresses = set()
+    with open(elf_path, 'rb') as fp:
+        symtab = ELFFile(fp).get_section_by_name('.symtab')
+        if symtab is None:
+            return addresses
+        for symbol in symtab.iter_symbols():
+            addr = symbol['st_value']
+            if symbol['st_info']['type'] in CODE_SYMBOL_TYPES and not addr & 3 and \
+                    any(low <= addr < high for low, high in ranges):
+                addresses.add(addr)
+    return addresses
+
+
+def discover_blocks(engine, roots, ranges):
+    """
+    Translate every block reachable from roots without running the program.
+
+    Args:
+        engine: BlockEngine over memory holding the loaded image
+        roots: Start addresses (entry point, function symbols)
+        ranges: (start, end) address ranges of executable segments
+
+    Returns:
+        Dict mapping start address to TranslatedBlock
+    """
+    blocks = {}
+    seen = set()
+    pending = list(roots)
+    while pending:
+        pc = pending.pop()
+        if pc in seen or not any(low <= pc < high for low, high in ranges):
+            continue
+        seen.add(pc)
+        block = engine.translate(pc)
+        if block is None:
+            # A system instruction ends blocks; execution continues after it
+            try:
+                if engine.predecode.lookup(pc)[2].opcode == OPCODE_SYSTEM:
+                    pending.append(pc + 4)
+            except (MemoryAccessFault, NotImplementedError):
+                pass
+            continue
+        blocks[pc] = block
+        for successor in (block.taken_pc, block.fall_pc):
+            if successor is not None:
+                pending.append(successor)
+        if block.ras is RAS_PUSH:
+            pending.append(block.end)
+    return blocks
+
+
+def generate_module_source(blocks, image_digest, name):
+    """
+    Generate the source of an AOT module.
+
+    Args:
+        blocks: Dict mapping start address to TranslatedBlock
+        image_digest: ElfLoadResult.image_digest of the translated image
+        name: Program name for the module docstring
+
+    Returns:
+        Module source string
+    """
+    lines = [_header(image_digest).rstrip("\n"),
+             f'"""Ahead-of-time translation of {name} (generated by aot.py, do not edit)"""',
+             ""]
+    imports = {}
+    for runtime_name, value in RUNTIME_NAMES.items():
+        imports.setdefault(value.__module__, []).append(runtime_name)
+    lines += [f"from {module} import {', '.join(names)}" for module, names in imports.items()]
+    lines += ["", f"FORMAT_VERSION = {FORMAT_VERSION}", f"IMAGE_DIGEST = {image_digest!r}", ""]
+    table = []
+    for start in sorted(blocks):
+        block = blocks[start]
+        function_name = f"block_{start:08x}"
+        lines += ["", generate_block_source([(pc, d) for pc, _, d in block.insns],
+                                            block.end, block.fusions, function_name)]
+        words = ", ".join(f"0x{d.raw:08x}" for _, _, d in block.insns)
+        table.append(f"    0x{start:08x}: (({words},), {function_name}),")
+    lines += ["", "# start pc -> (instruction words, factory)", "BLOCKS = {"] + table + ["}", ""]
+    return "\n".join(lines)
+
+
+def translate_elf(elf_path, output=None):
+    """
+    Translate an ELF ahead of time and write its module.
+
+    Args:
+        elf_path: Path to the ELF file
+        output: Module path (default: module_path(elf_path))
+
+    Returns:
+        Tuple (path of the written module, number of blocks)
+    """
+    memory = Memory()
+    result = load_elf_image(memory, str(elf_path))
+    ranges = [(seg.vaddr, seg.vaddr + seg.filesz) for seg in result.segments
+              if seg.flags & PF_X and seg.filesz]
+    predecode = PredecodeCache(memory)
+    engine = BlockEngine(RV32CPU(), memory, predecode, hot_threshold=None)
+    roots = _code_symbols(elf_path, ranges) | {result.entry_point}
+    blocks = discover_blocks(engine, roots, ranges)
+
+    path = Path(output) if output is not None else module_path(elf_path)
+    source = generate_module_source(blocks, result.image_digest, Path(elf_path).name)
+    temp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp.write_text(source)
+    os.replace(temp, path)
+    return path, len(blocks)
+
+
+def load_module(elf_path, image_digest):
+    """
+    Import the AOT module of an ELF if it was generated from this image.
+
+    Args:
+        elf_path: Path of the loaded ELF
+        image_digest: ElfLoadResult.image_digest of the loaded image
+
+    Returns:
+        The module, or None if there is none or it is stale
+    """
+    path = module_path(elf_path)
+    try:
+        with path.open() as fp:
+            if fp.readline() != _header(image_digest):
+                return None
+    except OSError:
+        return None
+    spec = importlib.util.spec_from_file_location(f"pyrv32_aot_{image_digest[:16]}", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        return None
+    return module
+
+
+def install_precompiled(elf_path, image_digest, engine):
+    """
+    Hand the blocks of an ELF's AOT module to a block engine.
+
+    Args:
+        elf_path: Path of the loaded ELF
+        image_digest: ElfLoadResult.image_digest of the loaded image
+        engine: BlockEngine running the image
+
+    Returns:
+        Number of precompiled blocks installed (0 without a usable module)
+    """
+    module = load_module(elf_path, image_digest)
+    if module is None:
+        return 0
+    engine.precompiled.update(module.BLOCKS)
+    return len(module.BLOCKS)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Translate an RV32 ELF ahead of time to a Python module for the block engine')
+    parser.add_argument('elf', help='ELF file to translate')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help=f'Module path (default: ELF path + {MODULE_SUFFIX})')
+    args = parser.parse_args()
+
+    path, count = translate_elf(args.elf, args.output)
+    print(f"{count} blocks written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,782 @@
+"""
+Batch Engine - Many copies of one program, vectorized with NumPy
+
+Fuzzing and bot rollouts run hundreds of copies of the same program that
+differ only in their input. BatchEngine runs N such copies ("lanes") as
+one machine:
+
+    regs        (N, 32) uint32 register files
+    pc          (N,) uint32 program counters
+    page_map    (N, RAM pages) int32, each lane's RAM as 4 KiB frames
+                of a shared page pool
+
+Lanes at the same PC form a group, and one decode_instruction() dispatch
+executes the instruction for the whole group with NumPy array ops. Groups
+split when a branch or indirect jump goes different ways for different
+lanes and merge again when they meet at the same PC. The group with the
+lowest PC runs first, so lanes that fell behind in a loop catch up with
+the lanes ahead of them instead of running in lockstep one block apart.
+
+RAM is copy-on-write per page: every lane starts out mapping the frames
+of the loaded image and gets a private copy of a page on its first store
+to it, so N lanes cost one image plus the pages each lane writes (a dense
+(N, 8 MiB) array would not fit for hundreds of lanes). Instructions on
+shared frames are decoded once for all lanes; instructions on private
+frames are decoded per word, and lanes whose private code differs are
+executed as separate groups.
+
+Rare work is done per lane with plain integers: MMIO (each lane has its
+own console UART buffers, debug UART output and a VirtualClock over its
+own instruction count), ECALLs (through its own SyscallHandler) and
+faults. EBREAK, exit syscalls and faults stop only the lanes that reach
+them. A lane that polls for console input it does not have spins until
+its step budget runs out, as the interpreter would.
+
+Lanes execute RV32IM like the reference interpreter; breakpoints,
+watchpoints, tracing and HLE are not available here.
+"""
+
+import sys
+
+from clock import VirtualClock
+from decoder import decode_instruction
+from elf_loader import load_elf_image
+from exceptions import MemoryAccessFault
+from memory import Memory, CODE_PAGE_SHIFT
+from pyrv32_system import ExecutionResult
+from syscalls import SyscallHandler
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("[Warning] numpy library not available - batch engine disabled", file=sys.stderr)
+
+
+MASK32 = 0xFFFFFFFF
+
+PAGE_SHIFT = CODE_PAGE_SHIFT
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+RAM_BASE = Memory.RAM_BASE
+RAM_SIZE = Memory.RAM_SIZE
+RAM_PAGES = RAM_SIZE >> PAGE_SHIFT
+
+# Pool frame every lane maps for RAM nobody has written
+ZERO_FRAME = 0
+
+# Lane status values
+RUNNING = 0
+HALTED = 1
+FAULTED = 2
+WAITING = 3  # At a WFI with no console input; inject_input() resumes it
+
+LANE_STATUS = {RUNNING: 'running', HALTED: 'halted', FAULTED: 'error', WAITING: 'waiting'}
+
+DEFAULT_CLOCK_MHZ = 100
+
+
+def _to_signed(value):
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+def _sign_extend(values, bits):
+    """Sign-extend the low bits (of bits) of uint32 values."""
+    sign = np.uint32(1 << (bits - 1))
+    return (values ^ sign) - sign
+
+
+def _div(a, b):
+    """Signed division truncated toward zero, with the RISC-V special cases."""
+    sa = a.view(np.int32).astype(np.int64)
+    sb = b.view(np.int32).astype(np.int64)
+    zero = sb == 0
+    divisor = np.where(zero, 1, sb)
+    quotient = np.abs(sa) // np.abs(divisor)
+    quotient = np.where((sa < 0) != (divisor < 0), -quotient, quotient)
+    return np.where(zero, -1, quotient).astype(np.uint32)
+
+
+def _rem(a, b):
+    """Signed remainder with the sign of the dividend (rs1 if rs2 == 0)."""
+    sa = a.view(np.int32).astype(np.int64)
+    sb = b.view(np.int32).astype(np.int64)
+    zero = sb == 0
+    divisor = np.where(zero, 1, sb)
+    remainder = np.abs(sa) % np.abs(divisor)
+    remainder = np.where(sa < 0, -remainder, remainder)
+    return np.where(zero, sa, remainder).astype(np.uint32)
+
+
+def _divu(a, b):
+    zero = b == 0
+    return np.where(zero, np.uint32(MASK32), a // np.where(zero, np.uint32(1), b))
+
+
+def _remu(a, b):
+    zero = b == 0
+    return np.where(zero, a, a % np.where(zero, np.uint32(1), b))
+
+
+# name -> op(rs1 values, rs2 values) on uint32 arrays
+REGISTER_OPS = {
+    'ADD': lambda a, b: a + b,
+    'SUB': lambda a, b: a - b,
+    'SLL': lambda a, b: a << (b & np.uint32(31)),
+    'SLT': lambda a, b: (a.view(np.int32) < b.view(np.int32)).astype(np.uint32),
+    'SLTU': lambda a, b: (a < b).astype(np.uint32),
+    'XOR': lambda a, b: a ^ b,
+    'SRL': lambda a, b: a >> (b & np.uint32(31)),
+    'SRA': lambda a, b: (a.view(np.int32) >> (b & np.uint32(31)).view(np.int32)).view(np.uint32),
+    'OR': lambda a, b: a | b,
+    'AND': lambda a, b: a & b,
+    'MUL': lambda a, b: (a.astype(np.uint64) * b).astype(np.uint32),
+    'MULH': lambda a, b: ((a.view(np.int32).astype(np.int64) *
+                           b.view(np.int32).astype(np.int64)) >> 32).astype(np.uint32),
+    'MULHSU': lambda a, b: ((a.view(np.int32).astype(np.int64) *
+                             b.astype(np.int64)) >> 32).astype(np.uint32),
+    'MULHU': lambda a, b: ((a.astype(np.uint64) * b) >> np.uint64(32)).astype(np.uint32),
+    'DIV': _div,
+    'DIVU': _divu,
+    'REM': _rem,
+    'REMU': _remu,
+}
+
+# name -> op(rs1 values, imm) with imm the 32-bit immediate as a Python int
+IMMEDIATE_OPS = {
+    'ADDI': lambda a, imm: a + np.uint32(imm),
+    'SLTI': lambda a, imm: (a.view(np.int32) < _to_signed(imm)).astype(np.uint32),
+    'SLTIU': lambda a, imm: (a < np.uint32(imm)).astype(np.uint32),
+    'XORI': lambda a, imm: a ^ np.uint32(imm),
+    'ORI': lambda a, imm: a | np.uint32(imm),
+    'ANDI': lambda a, imm: a & np.uint32(imm),
+    'SLLI': lambda a, imm: a << np.uint32(imm & 31),
+    'SRLI': lambda a, imm: a >> np.uint32(imm & 31),
+    'SRAI': lambda a, imm: (a.view(np.int32) >> np.int32(imm & 31)).view(np.uint32),
+}
+
+# name -> condition(rs1 values, rs2 values)
+BRANCH_OPS = {
+    'BEQ': lambda a, b: a == b,
+    'BNE': lambda a, b: a != b,
+    'BLT': lambda a, b: a.view(np.int32) < b.view(np.int32),
+    'BGE': lambda a, b: a.view(np.int32) >= b.view(np.int32),
+    'BLTU': lambda a, b: a < b,
+    'BGEU': lambda a, b: a >= b,
+}
+
+# name -> (size in bytes, sign-extend)
+LOAD_OPS = {
+    'LB': (1, True), 'LH': (2, True), 'LW': (4, False),
+    'LBU': (1, False), 'LHU': (2, False),
+}
+
+STORE_OPS = {'SB': 1, 'SH': 2, 'SW': 4}
+
+
+class LaneConsole:
+    """Console UART of one lane: queued input and captured output."""
+
+    def __init__(self):
+        self.rx_buffer = bytearray()
+        self.output = bytearray()
+
+    def tx_byte(self, value):
+        self.output.append(value & 0xFF)
+
+    def rx_byte(self):
+        """Next input byte, or 0xFF if no data is available."""
+        return self.rx_buffer.pop(0) if self.rx_buffer else 0xFF
+
+    def rx_status(self):
+        """1 if input is available, 0 otherwise."""
+        return 1 if self.rx_buffer else 0
+
+
+class _LaneView:
+    """One lane presented as the cpu and memory a SyscallHandler expects."""
+
+    def __init__(self, engine, lane, pc):
+        self.engine = engine
+        self.lane = lane
+        self.pc = pc
+        self.regs = [int(value) for value in engine.regs[lane]] + [0]
+        self.console_uart = engine.consoles[lane]
+
+    def read_byte(self, address):
+        return self.engine.read_byte(self.lane, address)
+
+    def write_byte(self, address, value):
+        self.engine.write_byte(self.lane, address, value)
+
+
+class _ImageWriter:
+    """Memory stand-in for load_elf_image() that fills the shared frames."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def load_program(self, address, data):
+        self.engine._load_shared(address, data)
+
+
+class BatchEngine:
+    """N copies of one RV32IM program executed with vectorized NumPy ops."""
+
+    def __init__(self, lanes, fs_root=".", clock_mhz=DEFAULT_CLOCK_MHZ):
+        """
+        Args:
+            lanes: Number of program copies
+            fs_root: Root directory for each lane's file syscalls
+            clock_mhz: Rate of each lane's virtual clock (timer registers
+                       are computed from the lane's instruction count)
+
+        Raises:
+            RuntimeError: If numpy is not installed
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("BatchEngine requires numpy")
+        if lanes < 1:
+            raise ValueError(f"Need at least one lane, got {lanes}")
+        self.lanes = lanes
+        self.fs_root = fs_root
+        self.clock_mhz = clock_mhz
+        # instruction name -> handler(pc, lanes, decoded) returning the
+        # next PC as for _execute()
+        self._handlers = {
+            'JAL': self._jal, 'JALR': self._jalr, 'LUI': self._lui, 'AUIPC': self._auipc,
+            'FENCE': self._fence, 'ECALL': self._ecall, 'EBREAK': self._ebreak,
+            'WFI': self._wfi,
+        }
+        for names, handler in ((REGISTER_OPS, self._register_op), (IMMEDIATE_OPS, self._immediate_op),
+                               (BRANCH_OPS, self._branch), (LOAD_OPS, self._load),
+                               (STORE_OPS, self._store)):
+            self._handlers.update(dict.fromkeys(names, handler))
+        self.reset()
+
+    def reset(self):
+        """Clear registers, RAM, I/O and counts of every lane."""
+        n = self.lanes
+        self.regs = np.zeros((n, 32), dtype=np.uint32)
+        self.pc = np.full(n, RAM_BASE, dtype=np.uint32)
+        self.counts = np.zeros(n, dtype=np.int64)
+        self.status = np.full(n, RUNNING, dtype=np.int8)
+        self.errors = [None] * n
+
+        self.page_map = np.full((n, RAM_PAGES), ZERO_FRAME, dtype=np.int32)
+        self._pool = np.zeros((64, PAGE_SIZE), dtype=np.uint8)
+        self._owner = np.full(64, -1, dtype=np.int32)  # lane owning a frame, -1 = shared
+        self._frames_used = 1
+        self._copies = 0  # copy-on-write events, invalidates shared-code checks
+        self._views()
+
+        self.consoles = [LaneConsole() for _ in range(n)]
+        self.debug_output = [bytearray() for _ in range(n)]
+        self.syscall_handlers = [SyscallHandler(self.fs_root) for _ in range(n)]
+        self.clocks = [VirtualClock(self.clock_mhz, self._retired(lane)) for lane in range(n)]
+
+        self._decoded = {}     # pc -> DecodedInsn for instructions on shared frames
+        self._steps = 0        # instructions the running group has completed
+        self._stopped = False  # set when an op stops some of its lanes
+        self.entry_point = RAM_BASE
+
+    def _retired(self, lane):
+        return lambda: int(self.counts[lane]) + self._steps
+
+    def _views(self):
+        self._pool16 = self._pool.view('<u2')
+        self._pool32 = self._pool.view('<u4')
+
+    # Loading
+
+    def load_elf(self, elf_path):
+        """
+        Reset and load an ELF into every lane.
+
+        Args:
+            elf_path: Path to ELF file
+
+        Returns:
+            Entry point address
+        """
+        with open(elf_path, 'rb') as f:
+            elf_bytes = f.read()
+        self.reset()
+        result = load_elf_image(_ImageWriter(self), elf_bytes)
+        self.entry_point = result.entry_point
+        self.pc[:] = result.entry_point
+        return result.entry_point
+
+    def load_binary_data(self, data, address=RAM_BASE):
+        """Reset, write raw program bytes at address in every lane and start there."""
+        self.reset()
+        self._load_shared(address, bytes(data))
+        self.entry_point = address
+        self.pc[:] = address
+        return len(data)
+
+    def _load_shared(self, address, data):
+        """Write data into frames shared by all lanes (before any lane runs)."""
+        position = 0
+        while position < len(data):
+            offset = address + position - RAM_BASE
+            if not 0 <= offset < RAM_SIZE:
+                raise MemoryAccessFault(address + position, 'store', 0)
+            page, within = offset >> PAGE_SHIFT, offset & PAGE_MASK
+            chunk = min(len(data) - position, PAGE_SIZE - within)
+            frame = int(self.page_map[0, page])
+            if frame == ZERO_FRAME:
+                frame = int(self._allocate(1)[0])
+                self.page_map[:, page] = frame
+            self._pool[frame, within:within + chunk] = np.frombuffer(
+                data, dtype=np.uint8, count=chunk, offset=position)
+            position += chunk
+
+    def inject_input(self, lane, data):
+        """Queue console input for one lane, resuming it if it waits at a WFI."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.consoles[lane].rx_buffer.extend(data)
+        if data and self.status[lane] == WAITING:
+            self.status[lane] = RUNNING
+            self.errors[lane] = None
+
+    def console_output(self, lane):
+        """Console UART output of one lane as bytes."""
+        return bytes(self.consoles[lane].output)
+
+    # Per-lane scalar access (MMIO, syscalls, inspection)
+
+    def read_byte(self, lane, address):
+        """
+        Read a byte of one lane's address space, including MMIO.
+
+        Raises:
+            MemoryAccessFault: If address is not RAM or a device register
+        """
+        address &= MASK32
+        offset = address - RAM_BASE
+        if 0 <= offset < RAM_SIZE:
+            return int(self._pool[self.page_map[lane, offset >> PAGE_SHIFT], offset & PAGE_MASK])
+        if address in (Memory.DEBUG_UART_TX, Memory.CONSOLE_UART_TX):
+            return 0
+        if 0x10000004 <= address <= 0x1000000F:
+            register = address & ~3
+            return (self.clocks[lane].read_register(register) >> ((address - register) * 8)) & 0xFF
+        if address == Memory.CONSOLE_UART_RX:
+            return self.consoles[lane].rx_byte()
+        if address == Memory.CONSOLE_UART_RX_STATUS:
+            return self.consoles[lane].rx_status()
+        raise MemoryAccessFault(address, 'load', int(self.pc[lane]))
+
+    def write_byte(self, lane, address, value):
+        """
+        Write a byte of one lane's address space, including MMIO.
+
+        Raises:
+            MemoryAccessFault: If address is not RAM or a device register
+        """
+        address &= MASK32
+        value &= 0xFF
+        offset = address - RAM_BASE
+        if 0 <= offset < RAM_SIZE:
+            lanes = np.array([lane])
+            frame = self._writable(lanes, np.array([offset >> PAGE_SHIFT]))[0]
+            self._pool[frame, offset & PAGE_MASK] = value
+        elif address == Memory.DEBUG_UART_TX:
+            self.debug_output[lane].append(value)
+        elif address == Memory.CONSOLE_UART_TX:
+            self.consoles[lane].tx_byte(value)
+        elif not 0x10000004 <= address <= 0x1000000F and \
+                address not in (Memory.CONSOLE_UART_RX, Memory.CONSOLE_UART_RX_STATUS):
+            raise MemoryAccessFault(address, 'store', int(self.pc[lane]))
+
+    def read_memory(self, lane, address, length):
+        """Read length bytes of one lane's memory."""
+        return bytes(self.read_byte(lane, address + i) for i in range(length))
+
+    def write_memory(self, lane, address, data):
+        """Write bytes into one lane's memory."""
+        for i, value in enumerate(data):
+            self.write_byte(lane, address + i, value)
+
+    def lane_registers(self, lane):
+        """Registers x0-x31 of one lane as a list of ints."""
+        return [int(value) for value in self.regs[lane]]
+
+    def private_pages(self, lane):
+        """Number of RAM pages one lane has written (copied from the image)."""
+        return int(np.count_nonzero(self._owner[:self._frames_used] == lane))
+
+    # Copy-on-write frames
+
+    def _allocate(self, count):
+        """Indices of count fresh frames, growing the pool as needed."""
+        start = self._frames_used
+        if start + count > len(self._pool):
+            size = max(2 * len(self._pool), start + count)
+            pool = np.zeros((size, PAGE_SIZE), dtype=np.uint8)
+            pool[:start] = self._pool[:start]
+            owner = np.full(size, -1, dtype=np.int32)
+            owner[:start] = self._owner[:start]
+            self._pool, self._owner = pool, owner
+            self._views()
+        self._frames_used += count
+        return np.arange(start, start + count)
+
+    def _writable(self, lanes, pages):
+        """Frames lanes may store to for pages (one page per lane), copying shared ones."""
+        frames = self.page_map[lanes, pages]
+        shared = self._owner[frames] != lanes
+        if shared.any():
+            copy_lanes = lanes[shared]
+            new = self._allocate(len(copy_lanes))
+            self._pool[new] = self._pool[frames[shared]]
+            self._owner[new] = copy_lanes
+            self.page_map[copy_lanes, pages[shared]] = new
+            frames[shared] = new
+            self._copies += 1
+        return frames
+
+    # Execution
+
+    def run(self, max_steps=1000000):
+        """
+        Run every running lane for up to max_steps instructions.
+
+        Args:
+            max_steps: Instruction budget per lane for this call
+
+        Returns:
+            List with an ExecutionResult per lane ('halted' for EBREAK or
+            exit, 'error' for faults and unsupported instructions or
+            syscalls, 'waiting' at a WFI without input, 'max_steps' if
+            the budget ran out). instruction_count
+            is the instructions the lane executed in this call.
+        """
+        start = self.counts.copy()
+        limit = start + max_steps
+        while True:
+            active = np.flatnonzero((self.status == RUNNING) & (self.counts < limit))
+            if not active.size:
+                break
+            pcs = self.pc[active]
+            low = pcs.min()
+            same = pcs == low
+            lanes = active if same.all() else active[same]
+            budget = int((limit[lanes] - self.counts[lanes]).min())
+            self._run_group(int(low), lanes, budget, solo=lanes.size == active.size)
+
+        results = []
+        for lane in range(self.lanes):
+            executed = int(self.counts[lane] - start[lane])
+            status = LANE_STATUS[int(self.status[lane])] if self.status[lane] != RUNNING else 'max_steps'
+            results.append(ExecutionResult(status, executed, error=self.errors[lane],
+                                           pc=int(self.pc[lane])))
+        return results
+
+    def _run_group(self, pc, lanes, budget, solo):
+        """
+        Execute lanes, all at pc, until they diverge or budget runs out.
+
+        A group that is not alone also stops after a taken branch or jump,
+        so groups meeting at the same PC are merged before they go on.
+        """
+        steps = 0
+        # Code page already seen to be on frames shared by all lanes (valid
+        # until the next copy-on-write)
+        shared_page = copies = None
+        try:
+            while steps < budget:
+                self._steps = steps
+                decoded = None
+                if (pc - RAM_BASE) >> PAGE_SHIFT == shared_page and self._copies == copies:
+                    decoded = self._decoded.get(pc)
+                if decoded is None:
+                    fetched = self._fetch(pc, lanes)
+                    if fetched is None:
+                        self._stopped = False
+                        return
+                    decoded, split, shared = fetched
+                    if split is not None:
+                        # Lanes run different code at pc: one instruction per variant
+                        self._stopped = False
+                        for variant, sub in split:
+                            self._execute_alone(pc, sub, variant)
+                        return
+                    if shared:
+                        shared_page, copies = (pc - RAM_BASE) >> PAGE_SHIFT, self._copies
+
+                target = self._execute(pc, lanes, decoded)
+                if self._stopped:
+                    self._stopped = False
+                    keep = self.status[lanes] == RUNNING
+                    self.counts[lanes[~keep]] += steps
+                    if type(target) is not int and target is not None:
+                        target = target[keep]
+                    lanes = lanes[keep]
+                    if not lanes.size:
+                        return
+                steps += 1
+
+                if target is None:
+                    pc = (pc + 4) & MASK32
+                    continue
+                if type(target) is not int:
+                    first = target[0]
+                    if not (target == first).all():
+                        self.pc[lanes] = target
+                        return
+                    target = int(first)
+                pc = target
+                if not solo:
+                    break
+            self.pc[lanes] = pc
+        finally:
+            self.counts[lanes] += steps
+            self._steps = 0
+
+    def _execute_alone(self, pc, lanes, decoded):
+        """Execute one instruction for lanes and store their next PCs."""
+        target = self._execute(pc, lanes, decoded)
+        if self._stopped:
+            self._stopped = False
+            keep = self.status[lanes] == RUNNING
+            if type(target) is not int and target is not None:
+                target = target[keep]
+            lanes = lanes[keep]
+        self.pc[lanes] = (pc + 4) & MASK32 if target is None else target
+        self.counts[lanes] += 1
+
+    def _fetch(self, pc, lanes):
+        """
+        Decode the instruction lanes execute at pc.
+
+        Returns:
+            (decoded, None, shared) if all lanes see the same word, with
+            shared True if it is on one shared frame; (None, [(decoded,
+            lanes)...], False) if their private code differs; None if
+            every lane faulted
+        """
+        decoded = self._decoded.get(pc)
+        offset = pc - RAM_BASE
+        if not 0 <= offset <= RAM_SIZE - 4 or pc & 3:
+            self._stop(lanes, FAULTED, f"Memory fault: fetch at 0x{pc:08x}", pc)
+            return None
+        page, word = offset >> PAGE_SHIFT, (offset & PAGE_MASK) >> 2
+        frames = self.page_map[lanes, page]
+        frame = frames[0]
+        shared = self._owner[frame] < 0 and (frames == frame).all()
+        if decoded is not None and shared:
+            return decoded, None, True
+
+        words = self._pool32[frames, word]
+        variants = np.unique(words)
+        split = []
+        for insn in variants:
+            try:
+                variant = decode_instruction(int(insn))
+            except NotImplementedError as e:
+                self._stop(lanes[words == insn], FAULTED, str(e), pc)
+                continue
+            split.append((variant, lanes[words == insn]))
+        if not split:
+            return None
+        if len(split) == 1 and split[0][1].size == lanes.size:
+            if shared:
+                self._decoded[pc] = split[0][0]
+            return split[0][0], None, shared
+        return None, split, False
+
+    def _stop(self, lanes, status, error, pc):
+        """Stop lanes at pc with status (HALTED or FAULTED)."""
+        self.status[lanes] = status
+        self.pc[lanes] = pc
+        for lane in np.atleast_1d(lanes):
+            self.errors[int(lane)] = error
+        self._stopped = True
+
+    def _execute(self, pc, lanes, decoded):
+        """
+        Execute one decoded instruction for lanes at pc.
+
+        Returns:
+            None to fall through to pc + 4, an int target shared by all
+            lanes, or a uint32 array of per-lane targets
+        """
+        handler = self._handlers.get(decoded.name)
+        if handler is None:
+            self._stop(lanes, FAULTED, f"Instruction {decoded.name} not supported by the batch engine", pc)
+            return None
+        return handler(pc, lanes, decoded)
+
+    def _register_op(self, pc, lanes, decoded):
+        if decoded.rd:
+            regs = self.regs
+            regs[lanes, decoded.rd] = REGISTER_OPS[decoded.name](regs[lanes, decoded.rs1],
+                                                                 regs[lanes, decoded.rs2])
+
+    def _immediate_op(self, pc, lanes, decoded):
+        if decoded.rd:
+            regs = self.regs
+            regs[lanes, decoded.rd] = IMMEDIATE_OPS[decoded.name](regs[lanes, decoded.rs1],
+                                                                  decoded.imm & MASK32)
+
+    def _branch(self, pc, lanes, decoded):
+        regs = self.regs
+        taken = BRANCH_OPS[decoded.name](regs[lanes, decoded.rs1], regs[lanes, decoded.rs2])
+        if not taken.any():
+            return None
+        target = (pc + decoded.imm) & MASK32
+        if taken.all():
+            return target
+        return np.where(taken, np.uint32(target), np.uint32((pc + 4) & MASK32))
+
+    def _jal(self, pc, lanes, decoded):
+        if decoded.rd:
+            self.regs[lanes, decoded.rd] = (pc + 4) & MASK32
+        return (pc + decoded.imm) & MASK32
+
+    def _jalr(self, pc, lanes, decoded):
+        target = (self.regs[lanes, decoded.rs1] + np.uint32(decoded.imm & MASK32)) & np.uint32(0xFFFFFFFE)
+        if decoded.rd:
+            self.regs[lanes, decoded.rd] = (pc + 4) & MASK32
+        return target
+
+    def _lui(self, pc, lanes, decoded):
+        if decoded.rd:
+            self.regs[lanes, decoded.rd] = decoded.imm & MASK32
+
+    def _auipc(self, pc, lanes, decoded):
+        if decoded.rd:
+            self.regs[lanes, decoded.rd] = (pc + decoded.imm) & MASK32
+
+    def _fence(self, pc, lanes, decoded):
+        return None
+
+    def _ebreak(self, pc, lanes, decoded):
+        self._stop(lanes, HALTED, None, pc)
+
+    def _wfi(self, pc, lanes, decoded):
+        """Lanes with console input go on; the others wait at the WFI."""
+        idle = [lane for lane in lanes.tolist() if not self.consoles[lane].rx_buffer]
+        if idle:
+            self._stop(np.array(idle), WAITING, f"Waiting for input (WFI at 0x{pc:08x})", pc)
+
+    def _addresses(self, lanes, decoded, size):
+        """Effective addresses, RAM offsets and the mask of lanes whose access is all RAM."""
+        address = self.regs[lanes, decoded.rs1] + np.uint32(decoded.imm & MASK32)
+        offset = address - np.uint32(RAM_BASE)
+        return address, offset, offset <= np.uint32(RAM_SIZE - size)
+
+    def _load(self, pc, lanes, decoded):
+        size, signed = LOAD_OPS[decoded.name]
+        address, offset, in_ram = self._addresses(lanes, decoded, size)
+        if in_ram.all():
+            values = self._gather(lanes, offset, size)
+            slow = ()
+        else:
+            values = np.zeros(lanes.size, dtype=np.uint32)
+            values[in_ram] = self._gather(lanes[in_ram], offset[in_ram], size)
+            slow = np.flatnonzero(~in_ram)
+        if signed:
+            values = _sign_extend(values, size * 8)
+
+        ok = None
+        for i in slow:
+            lane = int(lanes[i])
+            try:
+                value = 0
+                for k in range(size):
+                    value |= self.read_byte(lane, int(address[i]) + k) << (8 * k)
+            except MemoryAccessFault as e:
+                self._stop(lane, FAULTED, f"Memory fault: load at 0x{e.address:08x}", pc)
+                ok = self.status[lanes] == RUNNING
+                continue
+            if signed and value & (1 << (size * 8 - 1)):
+                value |= MASK32 & ~((1 << (size * 8)) - 1)
+            values[i] = value
+
+        if decoded.rd:
+            if ok is None:
+                self.regs[lanes, decoded.rd] = values
+            else:
+                self.regs[lanes[ok], decoded.rd] = values[ok]
+
+    def _gather(self, lanes, offset, size):
+        """Little-endian uint32 values of size bytes at RAM offsets."""
+        if size == 4 and not (offset & np.uint32(3)).any():
+            return self._pool32[self.page_map[lanes, offset >> PAGE_SHIFT],
+                                (offset & np.uint32(PAGE_MASK)) >> 2].astype(np.uint32)
+        if size == 2 and not (offset & np.uint32(1)).any():
+            return self._pool16[self.page_map[lanes, offset >> PAGE_SHIFT],
+                                (offset & np.uint32(PAGE_MASK)) >> 1].astype(np.uint32)
+        values = np.zeros(lanes.size, dtype=np.uint32)
+        for k in range(size):
+            byte_offset = offset + np.uint32(k)
+            byte = self._pool[self.page_map[lanes, byte_offset >> PAGE_SHIFT],
+                              byte_offset & np.uint32(PAGE_MASK)]
+            values |= byte.astype(np.uint32) << np.uint32(8 * k)
+        return values
+
+    def _store(self, pc, lanes, decoded):
+        size = STORE_OPS[decoded.name]
+        address, offset, in_ram = self._addresses(lanes, decoded, size)
+        values = self.regs[lanes, decoded.rs2]
+        if in_ram.all():
+            self._scatter(lanes, offset, values, size)
+            return
+        self._scatter(lanes[in_ram], offset[in_ram], values[in_ram], size)
+        for i in np.flatnonzero(~in_ram):
+            lane = int(lanes[i])
+            try:
+                for k in range(size):
+                    self.write_byte(lane, int(address[i]) + k, int(values[i]) >> (8 * k))
+            except MemoryAccessFault as e:
+                self._stop(lane, FAULTED, f"Memory fault: store at 0x{e.address:08x}", pc)
+
+    def _scatter(self, lanes, offset, values, size):
+        """Store the low size bytes of values at RAM offsets, copying shared pages."""
+        if not lanes.size:
+            return
+        if size == 4 and not (offset & np.uint32(3)).any():
+            frames = self._writable(lanes, offset >> PAGE_SHIFT)
+            self._pool32[frames, (offset & np.uint32(PAGE_MASK)) >> 2] = values
+            return
+        if size == 2 and not (offset & np.uint32(1)).any():
+            frames = self._writable(lanes, offset >> PAGE_SHIFT)
+            self._pool16[frames, (offset & np.uint32(PAGE_MASK)) >> 1] = values.astype(np.uint16)
+            return
+        for k in range(size):
+            byte_offset = offset + np.uint32(k)
+            frames = self._writable(lanes, byte_offset >> PAGE_SHIFT)
+            self._pool[frames, byte_offset & np.uint32(PAGE_MASK)] = \
+                (values >> np.uint32(8 * k)).astype(np.uint8)
+
+    def _ecall(self, pc, lanes, decoded):
+        """Service an ECALL for each lane through its own SyscallHandler."""
+        for lane in lanes.tolist():
+            view = _LaneView(self, lane, pc)
+            handler = self.syscall_handlers[lane]
+            try:
+                serviced = handler.service(view, view)
+            except MemoryAccessFault as e:
+                self._stop(lane, FAULTED, f"Memory fault: {e.access_type} at 0x{e.address:08x}", pc)
+                continue
+            self.regs[lane] = view.regs[:32]
+            if not serviced:
+                self._stop(lane, HALTED, handler.stop_reason, pc)
+        return np.full(lanes.size, (pc + 4) & MASK32, dtype=np.uint32)
+
+    def stats(self):
+        """Dict with per-status lane counts, instructions executed and RAM frames in use."""
+        return {
+            'lanes': self.lanes,
+            'running': int(np.count_nonzero(self.status == RUNNING)),
+            'halted': int(np.count_nonzero(self.status == HALTED)),
+            'errors': int(np.count_nonzero(self.status == FAULTED)),
+            'waiting': int(np.count_nonzero(self.status == WAITING)),
+            'instructions': int(self.counts.sum()),
+            'frames': self._frames_used,
+        }
@@ -0,0 +1,302 @@
+"""
+Block Codegen - Python source generation for hot translated blocks
+
+The top tier of the block engine. A hot block is rendered as the source
+of one Python function with guest registers held in local variables and
+every ALU operation inlined as an expression, then compiled with
+compile()/exec. Compared to the closure tier this removes one Python call
+and two list accesses per guest instruction.
+
+Generated functions have the same contract as the closure tier: they run
+the whole block, write modified registers back to cpu.regs and return the
+next PC. If a memory access faults part-way through, registers written by
+the instructions before it are written back before the fault propagates.
+Fused pairs (fusion.py) are rendered as one constant build, one constant
+jump or one shared comparison.
+"""
+
+from execute import (exec_mul, exec_mulh, exec_mulhsu, exec_mulhu,
+                     exec_div, exec_divu, exec_rem, exec_remu)
+from fusion import LUI_ADDI, AUIPC_JALR, lui_addi_values, auipc_jalr_values
+
+
+def _signed(value):
+    """Interpret a 32-bit register value as signed."""
+    return value - ((value & 0x80000000) << 1)
+
+
+# Globals generated functions use besides their make_block arguments
+RUNTIME_NAMES = {
+    '_signed': _signed,
+    'exec_mul': exec_mul, 'exec_mulh': exec_mulh,
+    'exec_mulhsu': exec_mulhsu, 'exec_mulhu': exec_mulhu,
+    'exec_div': exec_div, 'exec_divu': exec_divu,
+    'exec_rem': exec_rem, 'exec_remu': exec_remu,
+}
+
+
+# R-type ALU and M-extension expressions ({a} = rs1, {b} = rs2)
+REGISTER_EXPRS = {
+    'ADD': '({a} + {b}) & 0xFFFFFFFF',
+    'SUB': '({a} - {b}) & 0xFFFFFFFF',
+    'SLL': '({a} << ({b} & 0x1F)) & 0xFFFFFFFF',
+    'SLT': '1 if ({a} ^ 0x80000000) < ({b} ^ 0x80000000) else 0',
+    'SLTU': '1 if {a} < {b} else 0',
+    'XOR': '{a} ^ {b}',
+    'SRL': '{a} >> ({b} & 0x1F)',
+    'SRA': '(_signed({a}) >> ({b} & 0x1F)) & 0xFFFFFFFF',
+    'OR': '{a} | {b}',
+    'AND': '{a} & {b}',
+    'MUL': 'exec_mul(_signed({a}), _signed({b}))',
+    'MULH': 'exec_mulh(_signed({a}), _signed({b}))',
+    'MULHSU': 'exec_mulhsu(_signed({a}), {b})',
+    'MULHU': 'exec_mulhu({a}, {b})',
+    'DIV': 'exec_div(_signed({a}), _signed({b}))',
+    'DIVU': 'exec_divu({a}, {b})',
+    'REM': 'exec_rem(_signed({a}), _signed({b}))',
+    'REMU': 'exec_remu({a}, {b})',
+}
+
+# I-type ALU expressions ({imm} = masked immediate, {shamt}, {bound} = imm ^ sign bit)
+IMMEDIATE_EXPRS = {
+    'ADDI': '({a} + {imm}) & 0xFFFFFFFF',
+    'SLTI': '1 if ({a} ^ 0x80000000) < {bound} else 0',
+    'SLTIU': '1 if {a} < {imm} else 0',
+    'XORI': '{a} ^ {imm}',
+    'ORI': '{a} | {imm}',
+    'ANDI': '{a} & {imm}',
+    'SLLI': '({a} << {shamt}) & 0xFFFFFFFF',
+    'SRLI': '{a} >> {shamt}',
+    'SRAI': '(_signed({a}) >> {shamt}) & 0xFFFFFFFF',
+}
+
+LOAD_EXPRS = {
+    'LW': 'read_word({addr})',
+    'LBU': 'read_byte({addr})',
+    'LHU': 'read_halfword({addr})',
+    'LB': '((_v := read_byte({addr})) - ((_v & 0x80) << 1)) & 0xFFFFFFFF',
+    'LH': '((_v := read_halfword({addr})) - ((_v & 0x8000) << 1)) & 0xFFFFFFFF',
+}
+
+STORE_EXPRS = {
+    'SW': 'write_word({addr}, {b})',
+    'SH': 'write_halfword({addr}, {b} & 0xFFFF)',
+    'SB': 'write_byte({addr}, {b} & 0xFF)',
+}
+
+# Comparison of set-less-than instructions ({imm}, {bound} as for IMMEDIATE_EXPRS)
+SET_LESS_THAN_CONDS = {
+    'SLT': '({a} ^ 0x80000000) < ({b} ^ 0x80000000)',
+    'SLTU': '{a} < {b}',
+    'SLTI': '({a} ^ 0x80000000) < {bound}',
+    'SLTIU': '{a} < {imm}',
+}
+
+BRANCH_CONDS = {
+    'BEQ': '{a} == {b}',
+    'BNE': '{a} != {b}',
+    'BLT': '({a} ^ 0x80000000) < ({b} ^ 0x80000000)',
+    'BGE': '({a} ^ 0x80000000) >= ({b} ^ 0x80000000)',
+    'BLTU': '{a} < {b}',
+    'BGEU': '{a} >= {b}',
+}
+
+
+def _reg(index):
+    """Source expression for reading register index."""
+    return f"x{index}" if index else "0"
+
+
+def _addr(rs1, imm):
+    """Source expression for an effective address rs1 + imm."""
+    if imm == 0:
+        return _reg(rs1)
+    return f"({_reg(rs1)} + 0x{imm:x}) & 0xFFFFFFFF"
+
+
+def generate_block_source(insns, fallthrough, fusions=None, function_name='make_block'):
+    """
+    Generate the source of a factory for one block function.
+
+    Args:
+        insns: Sequence of (pc, decoded) pairs, in program order. Only the
+               last one may be a branch, JAL or JALR.
+        fallthrough: PC after the last instruction
+        fusions: Dict of fused pairs (index of first instruction -> idiom),
+                 as returned by fusion.find_fusions()
+        function_name: Name of the factory function
+
+    Returns:
+        Source string defining function_name(regs, memory), which returns the
+        block function (uses the globals in RUNTIME_NAMES)
+    """
+    body = []
+    used = set()
+    written = set()
+    touches_memory = False
+    next_pc = f"0x{fallthrough:x}"
+
+    def assign(rd, expr):
+        used.add(rd)
+        written.add(rd)
+        body.append(f"x{rd} = {expr}")
+
+    fusions = fusions or {}
+    index = 0
+    while index < len(insns):
+        pc, d = insns[index]
+        idiom = fusions.get(index)
+        index += 1
+        if idiom is not None:
+            second = insns[index][1]
+            index += 1
+            if idiom == LUI_ADDI:
+                high, value = lui_addi_values(d, second)
+                if second.rd != d.rd:
+                    assign(d.rd, f"0x{high:x}")
+                if second.rd:
+                    assign(second.rd, f"0x{value:x}")
+            elif idiom == AUIPC_JALR:
+                base, target, link = auipc_jalr_values(pc, d, second)
+                assign(d.rd, f"0x{base:x}")
+                if second.rd:
+                    assign(second.rd, f"0x{link:x}")
+                next_pc = f"0x{target:x}"
+            else:  # slt+branch
+                for reg in (d.rs1, d.rs2 if d.opcode == 0b0110011 else 0):
+                    if reg:
+                        used.add(reg)
+                body.append("_c = " + SET_LESS_THAN_CONDS[d.name].format(
+                    a=_reg(d.rs1), b=_reg(d.rs2), imm=f"0x{d.imm:x}", bound=f"0x{d.imm ^ 0x80000000:x}"))
+                assign(d.rd, "1 if _c else 0")
+                target = f"0x{(pc + 4 + second.imm) & 0xFFFFFFFF:x}"
+                if second.name == 'BEQ':
+                    next_pc = f"(0x{fallthrough:x} if _c else {target})"
+                else:
+                    next_pc = f"({target} if _c else 0x{fallthrough:x})"
+            continue
+
+        name = d.name
+        opcode = d.opcode
+        rd, rs1, rs2 = d.rd, d.rs1, d.rs2
+        imm = d.imm
+        for reg in (rs1, rs2):
+            if reg:
+                used.add(reg)
+        a, b = _reg(rs1), _reg(rs2)
+
+        if opcode == 0b0000011:
+            touches_memory = True
+            body.append(f"memory.current_pc = 0x{pc:x}")
+            expr = LOAD_EXPRS[name].format(addr=_addr(rs1, imm))
+            if rd:
+                assign(rd, expr)
+            else:
+                body.append(expr)
+        elif opcode == 0b0100011:
+            touches_memory = True
+            body.append(f"memory.current_pc = 0x{pc:x}")
+            body.append(STORE_EXPRS[name].format(addr=_addr(rs1, imm), b=b))
+        elif opcode == 0b1100011:
+            cond = BRANCH_CONDS[name].format(a=a, b=b)
+            target = (pc + imm) & 0xFFFFFFFF
+            next_pc = f"(0x{target:x} if {cond} else 0x{fallthrough:x})"
+        elif opcode == 0b1101111:
+            if rd:
+                assign(rd, f"0x{(pc + 4) & 0xFFFFFFFF:x}")
+            next_pc = f"0x{(pc + imm) & 0xFFFFFFFF:x}"
+        elif opcode == 0b1100111:
+            # Target is computed before the link write (rd may equal rs1)
+            body.append(f"next_pc = ({a} + 0x{imm:x}) & 0xFFFFFFFE")
+            if rd:
+                assign(rd, f"0x{(pc + 4) & 0xFFFFFFFF:x}")
+            next_pc = "next_pc"
+        elif opcode == 0b0001111 or rd == 0:
+            continue  # FENCE, or an ALU result discarded into x0
+        elif opcode == 0b0110111:
+            assign(rd, f"0x{imm & 0xFFFFFFFF:x}")
+        elif opcode == 0b0010111:
+            assign(rd, f"0x{(pc + imm) & 0xFFFFFFFF:x}")
+        elif opcode == 0b0010011:
+            assign(rd, IMMEDIATE_EXPRS[name].format(
+                a=a, imm=f"0x{imm:x}", shamt=imm & 0x1F, bound=f"0x{imm ^ 0x80000000:x}"))
+        else:
+            assign(rd, REGISTER_EXPRS[name].format(a=a, b=b))
+
+    loads = [f"x{i} = regs[{i}]" for i in sorted(used)]
+    stores = [f"regs[{i}] = x{i}" for i in sorted(written)]
+
+    lines = [f"def {function_name}(regs, memory):",
+             "    read_byte = memory.read_byte",
+             "    read_halfword = memory.read_halfword",
+             "    read_word = memory.read_word",
+             "    write_byte = memory.write_byte",
+             "    write_halfword = memory.write_halfword",
+             "    write_word = memory.write_word",
+             "    def run():"]
+    lines += [f"        {line}" for line in loads]
+    if touches_memory and stores:
+        lines.append("        try:")
+        lines += [f"            {line}" for line in body]
+        lines.append("        except BaseException:")
+        lines += [f"            {line}" for line in stores]
+        lines.append("            raise")
+    else:
+        lines += [f"        {line}" for line in body]
+    lines += [f"        {line}" for line in stores]
+    lines.append(f"        return {next_pc}")
+    lines.append("    return run")
+    return "\n".join(lines) + "\n"
+
+
+def block_code(insns, fallthrough, fusions=None):
+    """
+    Compile the generated source of a block to a code object.
+
+    The code object only depends on the instructions, so it can be kept
+    and instantiated again for another CPU/memory pair.
+
+    Args:
+        insns: Sequence of (pc, decoded) pairs (see generate_block_source)
+        fallthrough: PC after the last instruction
+        fusions: Fused pairs (see generate_block_source)
+
+    Returns:
+        Code object defining make_block(regs, memory)
+    """
+    source = generate_block_source(insns, fallthrough, fusions)
+    return compile(source, f"<block 0x{insns[0][0]:08x}>", 'exec')
+
+
+def instantiate_block(code, regs, memory):
+    """
+    Build the block function from a code object returned by block_code().
+
+    Args:
+        code: Code object from block_code()
+        regs: Register list the function operates on (cpu.regs)
+        memory: Memory instance
+
+    Returns:
+        Callable taking no arguments and returning the next PC
+    """
+    namespace = dict(RUNTIME_NAMES)
+    exec(code, namespace)
+    return namespace['make_block'](regs, memory)
+
+
+def compile_block(insns, fallthrough, regs, memory, fusions=None):
+    """
+    Compile a block to a Python function.
+
+    Args:
+        insns: Sequence of (pc, decoded) pairs (see generate_block_source)
+        fallthrough: PC after the last instruction
+        regs: Register list the function operates on (cpu.regs)
+        memory: Memory instance
+        fusions: Fused pairs (see generate_block_source)
+
+    Returns:
+        Callable taking no arguments and returning the next PC
+    """
+    return instantiate_block(block_code(insns, fallthrough, fusions), regs, memory)
@@ -0,0 +1,878 @@
+"""
+Block Engine - Tiered basic-block execution
+
+An execution engine that sits next to execute.execute_instruction. Guest
+code is split into basic blocks (straight-line code ending at a branch,
+JAL, JALR, or before an ECALL/EBREAK). Blocks link directly to their
+successors so hot loops run block-to-block without going back to the
+block table.
+
+Each block counts its executions and moves up through three tiers:
+
+    0  interpreted: the predecoded execute.py handlers, run in a loop
+    1  closures: one Python closure per instruction with register
+       indices and immediates baked in
+    2  generated source: the whole block compiled as one Python function
+       with registers in locals (block_codegen.py)
+
+so translation effort is only spent on code that actually runs often.
+Blocks of a program translated ahead of time (aot.py, precompiled)
+start in tier 2 with the module's function instead.
+Tiers 1 and 2 execute common instruction pairs (lui+addi, auipc+jalr,
+slt+branch) as fused operations (fusion.py); fusion_stats() reports how
+often each idiom ran fused.
+
+Function returns are indirect jumps, so a block ending in a return
+would need a block-table lookup whenever it returns to a different
+caller than last time. The engine keeps a shadow return-address stack
+instead: a block ending in a call (JAL/JALR with rd=ra) pushes itself,
+and a block ending in a return (jalr x0, 0(ra)) pops it and follows the
+caller's link to the block after the call. A mispredicted return (the
+stack lost track, e.g. after longjmp or a call made outside the engine)
+falls back to the lookup. ras_stats() reports the hit rate.
+
+The engine only covers the fast path. Anything that needs the host
+(ECALL/EBREAK, unsupported or unfetchable instructions, PCs with a
+predecode override such as intercepted libc routines) ends the run so
+the caller can execute that instruction through the reference
+interpreter. Debug features (breakpoints, watchpoints, tracing) are not
+checked inside blocks; callers must use the reference path while any are
+armed.
+
+With skip_idle_polls set the engine also stops in front of a loop spinning
+on the Console UART RX status register while RX is empty (busy_wait.py),
+leaving it to the caller to fast-forward the idle iterations.
+"""
+
+from collections import deque
+
+from exceptions import MemoryAccessFault
+from block_codegen import block_code, instantiate_block
+from busy_wait import match_rx_poll_loop
+from fusion import (IDIOMS, LUI_ADDI, AUIPC_JALR, find_fusions,
+                    lui_addi_values, auipc_jalr_values)
+
+
+MASK32 = 0xFFFFFFFF
+SIGN32 = 0x80000000
+
+# Longest straight-line run translated into one block
+MAX_BLOCK_INSNS = 64
+
+# Default tier thresholds (block executions before promotion)
+WARM_THRESHOLD = 2
+HOT_THRESHOLD = 50
+
+# Entries kept on the shadow return-address stack (oldest dropped first)
+RAS_DEPTH = 64
+
+TIER_INTERP = 0
+TIER_CLOSURE = 1
+TIER_SOURCE = 2
+
+OPCODE_BRANCH = 0b1100011
+OPCODE_JAL = 0b1101111
+OPCODE_JALR = 0b1100111
+OPCODE_SYSTEM = 0b1110011
+
+# TranslatedBlock.ras: how the block's last instruction uses the stack
+RAS_PUSH = 'call'
+RAS_POP = 'return'
+
+
+class TranslatedBlock:
+    """
+    A translated basic block.
+
+    Blocks link directly to their successors so the run loop can follow
+    them without a dict lookup. A link is only a hint: it is followed if
+    the successor is still valid and the block actually exited to the
+    linked PC, otherwise the engine re-resolves and re-links it.
+    """
+
+    __slots__ = ('start', 'end', 'count', 'run', 'valid', 'insns',
+                 'tier', 'hits', 'promote_at',
+                 'taken_pc', 'taken', 'fall_pc', 'fallthrough', 'poll_loop',
+                 'fusions', 'fused_since', 'ras', 'ret', 'code', 'factory')
+
+    def __init__(self, start, end, insns, taken_pc=None, fall_pc=None):
+        self.start = start  # PC of first instruction
+        self.end = end      # PC just past the last instruction
+        self.insns = insns  # Tuple of (pc, handler, decoded) from the predecode cache
+        self.count = len(insns)  # Number of guest instructions
+        self.run = None     # Callable: executes the block, returns next PC
+        self.valid = True   # Cleared when the block is invalidated
+
+        # Tiering: run is rebuilt for the next tier when hits reaches promote_at
+        self.tier = None
+        self.hits = 0
+        self.promote_at = -1
+
+        # Successor links. taken_pc is the branch/JAL target (for JALR the
+        # last target seen); fall_pc is the fall-through PC, None if the
+        # block cannot fall through.
+        self.taken_pc = taken_pc
+        self.taken = UNLINKED
+        self.fall_pc = fall_pc
+        self.fallthrough = UNLINKED
+
+        # busy_wait.PollLoop if the block is an RX status poll loop
+        self.poll_loop = None
+
+        # Fused pairs (index of first instruction -> idiom) and the hit
+        # count at which the block first ran with them fused
+        self.fusions = {}
+        self.fused_since = None
+
+        # RAS_PUSH for a call, RAS_POP for a return, else None; a call
+        # block links to the block its callee returns to in ret
+        self.ras = None
+        self.ret = UNLINKED
+
+        # Code object of the generated-source tier (block_codegen.block_code)
+        self.code = None
+
+        # Generated-source factory from an ahead-of-time module (aot.py)
+        self.factory = None
+
+    def __repr__(self):
+        return (f"TranslatedBlock(0x{self.start:08x}-0x{self.end:08x}, "
+                f"{self.count} insns, tier {self.tier})")
+
+
+class _Unlinked:
+    """Placeholder successor: never valid, so the first use re-links."""
+
+    __slots__ = ()
+    valid = False
+
+
+UNLINKED = _Unlinked()
+
+
+class BlockEngine:
+    """
+    Translates and runs basic blocks for one CPU/memory pair.
+
+    Blocks are built from PredecodeCache entries, so the predecode cache
+    is the authority on which words are code: when it drops an entry
+    (store into a cached word, reset) the blocks covering that word are
+    dropped too.
+    """
+
+    def __init__(self, cpu, memory, predecode, warm_threshold=WARM_THRESHOLD,
+                 hot_threshold=HOT_THRESHOLD, skip_idle_polls=False):
+        """
+        Args:
+            cpu: RV32CPU instance (blocks capture cpu.regs directly)
+            memory: Memory instance
+            predecode: PredecodeCache used to fetch and decode instructions
+            warm_threshold: Executions before a block is translated to
+                            closures (0 = translate immediately)
+            hot_threshold: Executions before a block is compiled from
+                           generated source (None = never)
+            skip_idle_polls: Stop in front of RX status poll loops while RX
+                             is empty (see idle_poll)
+        """
+        self.cpu = cpu
+        self.memory = memory
+        self.predecode = predecode
+        self.warm_threshold = warm_threshold
+        self.hot_threshold = hot_threshold
+        self.blocks = {}       # start pc -> TranslatedBlock
+        self.word_blocks = {}  # instruction word address -> set of block start PCs
+        self.blocks_translated = 0
+        self.skip_idle_polls = skip_idle_polls
+        self.idle_poll = None  # PollLoop the last run() stopped in front of
+        self.in_flight = _not_running  # Instructions retired by the active run()
+        self.fusion_counts = dict.fromkeys(IDIOMS, 0)  # Fused executions of dropped blocks
+        self.return_stack = deque(maxlen=RAS_DEPTH)  # Call blocks awaiting their return
+        self.ras_hits = 0    # Returns that followed the predicted caller link
+        self.ras_misses = 0  # Returns that needed a lookup
+        # start pc -> (end, hits, code) restored from a translation cache;
+        # applied when a block with the same extent is translated
+        self.warm_blocks = {}
+        # start pc -> (instruction words, factory) from an ahead-of-time
+        # module (aot.py); used when a block with the same words is translated
+        self.precompiled = {}
+        self.blocks_precompiled = 0  # Translated blocks that used precompiled code
+        predecode.listeners.append(self)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def run(self, max_steps):
+        """
+        Run translated blocks starting at cpu.pc.
+
+        Stops before an instruction that must go through the reference
+        interpreter, before a block that would exceed max_steps, at a
+        memory fault, or (with skip_idle_polls) in front of an RX status
+        poll loop that would spin; idle_poll is then set to its PollLoop.
+
+        Args:
+            max_steps: Maximum instructions to execute
+
+        Returns:
+            Tuple (executed, fault). fault is the MemoryAccessFault that
+            stopped execution (cpu.pc then points at the faulting
+            instruction), or None.
+        """
+        cpu = self.cpu
+        memory = self.memory
+        pc = cpu.pc
+        executed = 0
+        skip_idle_polls = self.skip_idle_polls
+        return_stack = self.return_stack
+        self.idle_poll = None
+        block = self.lookup(pc)
+        # Exact while a block accesses memory (loads/stores set current_pc)
+        self.in_flight = lambda: executed + ((memory.current_pc - block.start) >> 2)
+        try:
+            while block is not None and executed + block.count <= max_steps:
+                if block.poll_loop is not None and skip_idle_polls and \
+                        block.poll_loop.waiting(cpu.regs, memory):
+                    self.idle_poll = block.poll_loop
+                    break
+                pc = block.run()
+                executed += block.count
+                hits = block.hits + 1
+                block.hits = hits
+                if hits == block.promote_at:
+                    self._build(block)
+
+                ras = block.ras
+                if ras is not None:
+                    if ras is RAS_PUSH:
+                        return_stack.append(block)
+                    elif return_stack and return_stack[-1].end == pc:
+                        # Predicted return: link to the block after the call
+                        caller = return_stack.pop()
+                        successor = caller.ret
+                        if not successor.valid:
+                            successor = self.lookup(pc)
+                            caller.ret = successor or UNLINKED
+                        self.ras_hits += 1
+                        block = successor
+                        continue
+                    else:
+                        self._return_mispredicted(pc)
+
+                # Follow the direct link if it still matches, else re-link
+                if pc == block.taken_pc:
+                    successor = block.taken
+                    if not successor.valid:
+                        successor = self.lookup(pc)
+                        block.taken = successor or UNLINKED
+                elif pc == block.fall_pc:
+                    successor = block.fallthrough
+                    if not successor.valid:
+                        successor = self.lookup(pc)
+                        block.fallthrough = successor or UNLINKED
+                else:
+                    # Indirect jump to a new target: remember it as the link
+                    successor = self.lookup(pc)
+                    if block.fall_pc is None:
+                        block.taken_pc = pc
+                        block.taken = successor or UNLINKED
+                block = successor
+        except MemoryAccessFault as fault:
+            cpu.pc = fault.pc
+            return executed + ((fault.pc - block.start) >> 2), fault
+        finally:
+            self.in_flight = _not_running
+        cpu.pc = pc
+        return executed, None
+
+    def _return_mispredicted(self, pc):
+        """
+        Resynchronize the return stack after a return to pc it did not predict.
+
+        If a deeper entry returns to pc, the calls above it returned
+        without the engine seeing it (e.g. intercepted routines or
+        longjmp) and are discarded together with it; otherwise the return
+        belongs to a call the engine never saw and the stack is kept.
+        """
+        self.ras_misses += 1
+        return_stack = self.return_stack
+        for depth in range(len(return_stack) - 2, -1, -1):
+            if return_stack[depth].end == pc:
+                for _ in range(len(return_stack) - depth):
+                    return_stack.pop()
+                return
+
+    def ras_stats(self):
+        """
+        Return the return-address stack prediction counters.
+
+        Returns:
+            Dict with 'hits' (returns that followed the predicted link),
+            'misses' (returns that needed a lookup) and 'depth' (entries
+            currently on the stack)
+        """
+        return {'hits': self.ras_hits, 'misses': self.ras_misses,
+                'depth': len(self.return_stack)}
+
+    # ------------------------------------------------------------------
+    # Translation
+    # ------------------------------------------------------------------
+
+    def lookup(self, pc):
+        """
+        Return the block starting at pc, translating it if needed.
+
+        Args:
+            pc: Start address
+
+        Returns:
+            TranslatedBlock, or None if no block can start at pc
+        """
+        block = self.blocks.get(pc)
+        if block is None:
+            block = self.translate(pc)
+        return block
+
+    def translate(self, pc):
+        """
+        Translate the basic block starting at pc.
+
+        Args:
+            pc: Start address (must be 4-byte aligned)
+
+        Returns:
+            TranslatedBlock, or None if the first instruction cannot be
+            translated (system instruction, fetch fault, unknown opcode,
+            overridden PC)
+        """
+        if pc & 3:
+            return None
+
+        insns = []
+        taken_pc = None
+        fall_pc = None
+        terminated = False
+        addr = pc
+        overrides = self.predecode.overrides
+        while addr - pc < MAX_BLOCK_INSNS * 4:
+            if addr in overrides:
+                break
+            try:
+                _, handler, decoded = self.predecode.lookup(addr)
+            except (MemoryAccessFault, NotImplementedError):
+                break
+            opcode = decoded.opcode
+            if opcode == OPCODE_SYSTEM:
+                break
+            insns.append((addr, handler, decoded))
+            addr += 4
+            if opcode in (OPCODE_BRANCH, OPCODE_JAL, OPCODE_JALR):
+                terminated = True
+                if opcode != OPCODE_JALR:
+                    taken_pc = (addr - 4 + decoded.imm) & MASK32
+                if opcode == OPCODE_BRANCH:
+                    fall_pc = addr
+                break
+
+        if not insns:
+            return None
+        if not terminated:
+            fall_pc = addr
+
+        fusions = find_fusions([(a, d) for a, _, d in insns])
+        if fusions.get(len(insns) - 2) == AUIPC_JALR:
+            # auipc+jalr jumps to a constant: link it like a JAL
+            auipc_pc, _, auipc = insns[-2]
+            taken_pc = auipc_jalr_values(auipc_pc, auipc, insns[-1][2])[1]
+
+        block = TranslatedBlock(pc, addr, tuple(insns), taken_pc, fall_pc)
+        block.fusions = fusions
+        warm = self.warm_blocks.pop(pc, None)
+        if warm is not None and warm[0] == addr:
+            _, block.hits, block.code = warm
+        precompiled = self.precompiled.get(pc)
+        if precompiled is not None and precompiled[0] == tuple(d.raw for _, _, d in insns):
+            block.factory = precompiled[1]
+            self.blocks_precompiled += 1
+        if terminated:
+            last = insns[-1][2]
+            if last.opcode != OPCODE_BRANCH and last.rd == 1:
+                block.ras = RAS_PUSH
+            elif last.opcode == OPCODE_JALR and last.rd == 0 and last.rs1 == 1:
+                block.ras = RAS_POP
+        if taken_pc == pc:
+            block.poll_loop = match_rx_poll_loop(block.insns)
+        self._build(block)
+        self.blocks[pc] = block
+        for word in range(pc, addr, 4):
+            self.word_blocks.setdefault(word, set()).add(pc)
+        self.blocks_translated += 1
+        return block
+
+    def _build(self, block):
+        """Build block.run for the tier the block's hit count has reached."""
+        hits = block.hits
+        if block.factory is not None and self.hot_threshold is not None:
+            # Compiled ahead of time: no warm-up
+            tier = TIER_SOURCE
+            block.promote_at = -1
+        elif hits < self.warm_threshold:
+            tier = TIER_INTERP
+            block.promote_at = self.warm_threshold
+        elif self.hot_threshold is None or hits < self.hot_threshold:
+            tier = TIER_CLOSURE
+            block.promote_at = -1 if self.hot_threshold is None else self.hot_threshold
+        else:
+            tier = TIER_SOURCE
+            block.promote_at = -1
+        if tier == block.tier:
+            return
+
+        if tier == TIER_INTERP:
+            block.run = _interpreted(self.cpu, self.memory, block.start,
+                                     tuple((h, d) for _, h, d in block.insns))
+        elif tier == TIER_CLOSURE:
+            ops = []
+            terminator = None
+            insns = block.insns
+            index = 0
+            while index < len(insns):
+                pc, _, decoded = insns[index]
+                idiom = block.fusions.get(index)
+                if idiom is not None:
+                    op = self._translate_fused(idiom, pc, decoded, insns[index + 1][2])
+                    if idiom == LUI_ADDI:
+                        ops.append(op)
+                    else:
+                        terminator = op
+                    index += 2
+                    continue
+                if decoded.opcode in (OPCODE_BRANCH, OPCODE_JAL, OPCODE_JALR):
+                    terminator = self._translate_terminator(decoded, pc)
+                else:
+                    op = self._translate_op(decoded, pc)
+                    if op is not None:
+                        ops.append(op)
+                index += 1
+            block.run = _compose(tuple(ops), terminator, block.end)
+        elif block.factory is not None:
+            block.run = block.factory(self.cpu.regs, self.memory)
+        else:
+            if block.code is None:
+                block.code = block_code([(pc, d) for pc, _, d in block.insns],
+                                        block.end, block.fusions)
+            block.run = instantiate_block(block.code, self.cpu.regs, self.memory)
+        if tier != TIER_INTERP and block.fused_since is None:
+            block.fused_since = hits
+        block.tier = tier
+
+    def _translate_op(self, d, pc):
+        """Return a closure for a non-control-flow instruction (None for no-ops)."""
+        regs = self.cpu.regs
+        opcode = d.opcode
+        rd = d.rd
+        rs1 = d.rs1
+        rs2 = d.rs2
+        imm = d.imm
+        name = d.name
+
+        if opcode == 0b0000011:
+            return _load_op(self.memory, regs, name, d.dest, rs1, imm, pc)
+        if opcode == 0b0100011:
+            return _store_op(self.memory, regs, name, rs1, rs2, imm, pc)
+        if opcode == 0b0001111:  # FENCE
+            return None
+
+        # Everything below only writes rd; writes to x0 have no effect
+        if rd == 0:
+            return None
+        if opcode == 0b0110111:  # LUI
+            value = imm & MASK32
+            def op():
+                regs[rd] = value
+            return op
+        if opcode == 0b0010111:  # AUIPC
+            value = (pc + imm) & MASK32
+            def op():
+                regs[rd] = value
+            return op
+        if opcode == 0b0010011:
+            return _immediate_op(regs, name, rd, rs1, imm)
+        return _register_op(regs, name, rd, rs1, rs2)
+
+    def _translate_terminator(self, d, pc):
+        """Return a closure for a control-flow instruction; it returns the next PC."""
+        regs = self.cpu.regs
+        opcode = d.opcode
+        rd = d.rd
+        rs1 = d.rs1
+        rs2 = d.rs2
+        imm = d.imm
+        link = (pc + 4) & MASK32
+
+        if opcode == OPCODE_JAL:
+            target = (pc + imm) & MASK32
+            if rd == 0:
+                return lambda: target
+            def term():
+                regs[rd] = link
+                return target
+            return term
+
+        if opcode == OPCODE_JALR:
+            if rd == 0:
+                return lambda: (regs[rs1] + imm) & 0xFFFFFFFE
+            def term():
+                target = (regs[rs1] + imm) & 0xFFFFFFFE
+                regs[rd] = link
+                return target
+            return term
+
+        return _branch_term(regs, d.name, rs1, rs2, (pc + imm) & MASK32, link)
+
+    def _translate_fused(self, idiom, pc, first, second):
+        """
+        Return the closure for a fused pair starting at pc.
+
+        lui+addi gives an operation; auipc+jalr and slt+branch end the
+        block and give a terminator returning the next PC.
+        """
+        regs = self.cpu.regs
+        rd = first.rd
+        result_rd = second.rd
+
+        if idiom == LUI_ADDI:
+            high, value = lui_addi_values(first, second)
+            if result_rd == rd:
+                def op():
+                    regs[rd] = value
+            elif result_rd == 0:
+                def op():
+                    regs[rd] = high
+            else:
+                def op():
+                    regs[rd] = high
+                    regs[result_rd] = value
+            return op
+
+        if idiom == AUIPC_JALR:
+            base, target, link = auipc_jalr_values(pc, first, second)
+            if result_rd == 0:
+                def term():
+                    regs[rd] = base
+                    return target
+            else:
+                def term():
+                    regs[rd] = base
+                    regs[result_rd] = link
+                    return target
+            return term
+
+        # slt+branch: BNE taken when the comparison holds, BEQ when it fails
+        target = (pc + 4 + second.imm) & MASK32
+        fallthrough = (pc + 8) & MASK32
+        if second.name == 'BEQ':
+            target, fallthrough = fallthrough, target
+        return _slt_branch_term(regs, first.name, rd, first.rs1, first.rs2, first.imm,
+                                target, fallthrough)
+
+    def fusion_stats(self):
+        """
+        Return how many times each idiom executed as a fused pair.
+
+        Returns:
+            Dict mapping idiom name (fusion.IDIOMS) to fused executions,
+            including blocks dropped since
+        """
+        counts = dict(self.fusion_counts)
+        for block in self.blocks.values():
+            _count_fusions(block, counts)
+        return counts
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate_word(self, address):
+        """Drop all blocks containing the instruction word at address."""
+        if self.warm_blocks:
+            for start in [start for start, (end, _, _) in self.warm_blocks.items()
+                          if start <= address < end]:
+                del self.warm_blocks[start]
+        starts = self.word_blocks.pop(address, None)
+        if not starts:
+            return
+        for start in starts:
+            block = self.blocks.pop(start, None)
+            if block is None:
+                continue
+            block.valid = False
+            _count_fusions(block, self.fusion_counts)
+            for word in range(block.start, block.end, 4):
+                if word != address:
+                    owners = self.word_blocks.get(word)
+                    if owners is not None:
+                        owners.discard(start)
+
+    def clear(self):
+        """Drop all translated blocks."""
+        for block in self.blocks.values():
+            block.valid = False
+            _count_fusions(block, self.fusion_counts)
+        self.blocks.clear()
+        self.word_blocks.clear()
+        self.return_stack.clear()
+        self.warm_blocks.clear()
+
+
+def _not_running():
+    """BlockEngine.in_flight outside run()."""
+    return 0
+
+
+def _count_fusions(block, counts):
+    """Add the fused executions of block to counts (idiom -> count)."""
+    if block.fused_since is not None:
+        runs = block.hits - block.fused_since
+        for idiom in block.fusions.values():
+            counts[idiom] += runs
+
+
+def _slt_branch_term(regs, name, rd, rs1, rs2, imm, target, fallthrough):
+    """Fused slt+branch terminator: target if the comparison holds, else fallthrough."""
+    if name == 'SLT':
+        def term():
+            if (regs[rs1] ^ SIGN32) < (regs[rs2] ^ SIGN32):
+                regs[rd] = 1
+                return target
+            regs[rd] = 0
+            return fallthrough
+    elif name == 'SLTU':
+        def term():
+            if regs[rs1] < regs[rs2]:
+                regs[rd] = 1
+                return target
+            regs[rd] = 0
+            return fallthrough
+    elif name == 'SLTI':
+        bound = imm ^ SIGN32
+        def term():
+            if (regs[rs1] ^ SIGN32) < bound:
+                regs[rd] = 1
+                return target
+            regs[rd] = 0
+            return fallthrough
+    else:  # SLTIU
+        def term():
+            if regs[rs1] < imm:
+                regs[rd] = 1
+                return target
+            regs[rd] = 0
+            return fallthrough
+    return term
+
+
+def _interpreted(cpu, memory, start, steps):
+    """Tier 0: run the block through the reference execute.py handlers."""
+    def run():
+        cpu.pc = start
+        for handler, decoded in steps:
+            memory.current_pc = cpu.pc
+            handler(cpu, memory, decoded)
+        return cpu.pc
+    return run
+
+
+def _compose(ops, terminator, fallthrough):
+    """Build the block callable from per-instruction closures."""
+    if terminator is None:
+        def run():
+            for op in ops:
+                op()
+            return fallthrough
+    elif not ops:
+        run = terminator
+    else:
+        def run():
+            for op in ops:
+                op()
+            return terminator()
+    return run
+
+
+def _register_op(regs, name, rd, rs1, rs2):
+    """Closure for R-type ALU and M-extension instructions."""
+    if name == 'ADD':
+        def op():
+            regs[rd] = (regs[rs1] + regs[rs2]) & MASK32
+    elif name == 'SUB':
+        def op():
+            regs[rd] = (regs[rs1] - regs[rs2]) & MASK32
+    elif name == 'SLL':
+        def op():
+            regs[rd] = (regs[rs1] << (regs[rs2] & 0x1F)) & MASK32
+    elif name == 'SLT':
+        def op():
+            regs[rd] = 1 if (regs[rs1] ^ SIGN32) < (regs[rs2] ^ SIGN32) else 0
+    elif name == 'SLTU':
+        def op():
+            regs[rd] = 1 if regs[rs1] < regs[rs2] else 0
+    elif name == 'XOR':
+        def op():
+            regs[rd] = regs[rs1] ^ regs[rs2]
+    elif name == 'SRL':
+        def op():
+            regs[rd] = regs[rs1] >> (regs[rs2] & 0x1F)
+    elif name == 'SRA':
+        def op():
+            value = regs[rs1]
+            regs[rd] = ((value - ((value & SIGN32) << 1)) >> (regs[rs2] & 0x1F)) & MASK32
+    elif name == 'OR':
+        def op():
+            regs[rd] = regs[rs1] | regs[rs2]
+    elif name == 'AND':
+        def op():
+            regs[rd] = regs[rs1] & regs[rs2]
+    else:
+        # M extension: reuse the reference helpers from execute.py
+        import execute
+        helper, signed1, signed2 = {
+            'MUL': (execute.exec_mul, True, True),
+            'MULH': (execute.exec_mulh, True, True),
+            'MULHSU': (execute.exec_mulhsu, True, False),
+            'MULHU': (execute.exec_mulhu, False, False),
+            'DIV': (execute.exec_div, True, True),
+            'DIVU': (execute.exec_divu, False, False),
+            'REM': (execute.exec_rem, True, True),
+            'REMU': (execute.exec_remu, False, False),
+        }[name]
+
+        def op():
+            a = regs[rs1]
+            b = regs[rs2]
+            if signed1:
+                a -= (a & SIGN32) << 1
+            if signed2:
+                b -= (b & SIGN32) << 1
+            regs[rd] = helper(a, b)
+    return op
+
+
+def _immediate_op(regs, name, rd, rs1, imm):
+    """Closure for I-type ALU instructions (imm is the masked 32-bit immediate)."""
+    if name == 'ADDI':
+        if rs1 == 0:
+            def op():
+                regs[rd] = imm
+        else:
+            def op():
+                regs[rd] = (regs[rs1] + imm) & MASK32
+    elif name == 'SLTI':
+        bound = imm ^ SIGN32
+        def op():
+            regs[rd] = 1 if (regs[rs1] ^ SIGN32) < bound else 0
+    elif name == 'SLTIU':
+        def op():
+            regs[rd] = 1 if regs[rs1] < imm else 0
+    elif name == 'XORI':
+        def op():
+            regs[rd] = regs[rs1] ^ imm
+    elif name == 'ORI':
+        def op():
+            regs[rd] = regs[rs1] | imm
+    elif name == 'ANDI':
+        def op():
+            regs[rd] = regs[rs1] & imm
+    elif name == 'SLLI':
+        shamt = imm & 0x1F
+        def op():
+            regs[rd] = (regs[rs1] << shamt) & MASK32
+    elif name == 'SRLI':
+        shamt = imm & 0x1F
+        def op():
+            regs[rd] = regs[rs1] >> shamt
+    else:  # SRAI
+        shamt = imm & 0x1F
+        def op():
+            value = regs[rs1]
+            regs[rd] = ((value - ((value & SIGN32) << 1)) >> shamt) & MASK32
+    return op
+
+
+def _load_op(memory, regs, name, dest, rs1, imm, pc):
+    """
+    Closure for loads. The access is performed even when rd is x0 (MMIO
+    side effects); dest is the decoded dest slot, so the value then goes
+    to the x0 sink.
+    """
+    if name == 'LW':
+        read = memory.read_word
+        def op():
+            memory.current_pc = pc
+            regs[dest] = read((regs[rs1] + imm) & MASK32)
+    elif name == 'LBU':
+        read = memory.read_byte
+        def op():
+            memory.current_pc = pc
+            regs[dest] = read((regs[rs1] + imm) & MASK32)
+    elif name == 'LHU':
+        read = memory.read_halfword
+        def op():
+            memory.current_pc = pc
+            regs[dest] = read((regs[rs1] + imm) & MASK32)
+    elif name == 'LB':
+        read = memory.read_byte
+        def op():
+            memory.current_pc = pc
+            value = read((regs[rs1] + imm) & MASK32)
+            regs[dest] = (value - ((value & 0x80) << 1)) & MASK32
+    else:  # LH
+        read = memory.read_halfword
+        def op():
+            memory.current_pc = pc
+            value = read((regs[rs1] + imm) & MASK32)
+            regs[dest] = (value - ((value & 0x8000) << 1)) & MASK32
+    return op
+
+
+def _store_op(memory, regs, name, rs1, rs2, imm, pc):
+    """Closure for stores."""
+    if name == 'SW':
+        write = memory.write_word
+        def op():
+            memory.current_pc = pc
+            write((regs[rs1] + imm) & MASK32, regs[rs2])
+    elif name == 'SH':
+        write = memory.write_halfword
+        def op():
+            memory.current_pc = pc
+            write((regs[rs1] + imm) & MASK32, regs[rs2] & 0xFFFF)
+    else:  # SB
+        write = memory.write_byte
+        def op():
+            memory.current_pc = pc
+            write((regs[rs1] + imm) & MASK32, regs[rs2] & 0xFF)
+    return op
+
+
+def _branch_term(regs, name, rs1, rs2, target, fallthrough):
+    """Closure for conditional branches; returns the next PC."""
+    if name == 'BEQ':
+        def term():
+            return target if regs[rs1] == regs[rs2] else fallthrough
+    elif name == 'BNE':
+        def term():
+            return target if regs[rs1] != regs[rs2] else fallthrough
+    elif name == 'BLT':
+        def term():
+            return target if (regs[rs1] ^ SIGN32) < (regs[rs2] ^ SIGN32) else fallthrough
+    elif name == 'BGE':
+        def term():
+            return target if (regs[rs1] ^ SIGN32) >= (regs[rs2] ^ SIGN32) else fallthrough
+    elif name == 'BLTU':
+        def term():
+            return target if regs[rs1] < regs[rs2] else fallthrough
+    else:  # BGEU
+        def term():
+            return target if regs[rs1] >= regs[rs2] else fallthrough
+    return term
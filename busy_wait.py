@@ -0,0 +1,103 @@
+"""
+Busy Wait - Recognition of Console UART RX status poll loops
+
+Firmware waits for a keystroke by spinning on the RX status register
+(firmware/syscalls.c, stdin_read):
+
+    while ((*CONSOLE_UART_RX_STATUS & 0x01) == 0) { }
+
+which compiles to a one-block loop such as
+
+    loop: lbu  a5, 8(a4)       # a4 = 0x10001000
+          andi a5, a5, 1
+          beqz a5, loop
+
+While the RX buffer is empty every iteration reads 0 and leaves the
+machine in the same state, so any number of iterations can be replaced by
+their effect: the registers the loop writes hold the values computed from
+a 0 status byte and the PC stays at the loop head.
+
+match_rx_poll_loop() recognizes such loops among translated blocks; the
+block engine stops in front of one when RX is empty so the caller can skip
+the remaining iterations.
+"""
+
+from memory import Memory
+
+
+RX_STATUS_ADDR = Memory.CONSOLE_UART_RX_STATUS
+
+OPCODE_LOAD = 0b0000011
+OPCODE_OP_IMM = 0b0010011
+OPCODE_BRANCH = 0b1100011
+
+
+class PollLoop:
+    """A side-effect-free loop spinning on the RX status register."""
+
+    __slots__ = ('head', 'count', 'base_reg', 'offset', 'written')
+
+    def __init__(self, head, count, base_reg, offset, written):
+        self.head = head          # PC of the status load (loop head)
+        self.count = count        # Instructions per iteration
+        self.base_reg = base_reg  # Address register of the status load
+        self.offset = offset      # Load offset (address = base_reg + offset)
+        self.written = written    # Registers written by an iteration
+
+    def waiting(self, regs, memory):
+        """
+        True if the loop would spin: it polls RX status and RX is empty.
+
+        Reads the status register once, like one real iteration would.
+        """
+        if (regs[self.base_reg] + self.offset) & 0xFFFFFFFF != RX_STATUS_ADDR:
+            return False
+        return memory.read_byte(RX_STATUS_ADDR) == 0
+
+    def settle(self, regs):
+        """Apply the effect of one or more idle iterations to regs."""
+        for reg in self.written:
+            regs[reg] = 0
+
+    def __repr__(self):
+        return f"PollLoop(0x{self.head:08x}, {self.count} insns)"
+
+
+def match_rx_poll_loop(insns):
+    """
+    Recognize a status poll loop in a translated block.
+
+    Accepted shape: a byte load, then ANDIs of the loaded value, then a BEQ
+    back to the load comparing only loaded/masked registers or x0. The
+    loop must not write its address register. The status address itself
+    is only checked at run time (PollLoop.waiting), since it comes from a
+    register.
+
+    Args:
+        insns: Block instructions, a sequence of (pc, handler, decoded)
+
+    Returns:
+        PollLoop, or None if the block is not such a loop
+    """
+    if len(insns) < 2:
+        return None
+    head = insns[0][0]
+    load = insns[0][2]
+    branch_pc, _, branch = insns[-1]
+    if load.opcode != OPCODE_LOAD or load.name not in ('LB', 'LBU'):
+        return None
+    if branch.name != 'BEQ' or (branch_pc + branch.imm) & 0xFFFFFFFF != head:
+        return None
+
+    # Registers holding a value derived from the (zero) status byte
+    zeroed = {0}
+    written = []
+    for _, _, d in insns[:-1]:
+        if d is not load and not (d.opcode == OPCODE_OP_IMM and d.name == 'ANDI' and d.rs1 in zeroed):
+            return None
+        if d.rd:
+            zeroed.add(d.rd)
+            written.append(d.rd)
+    if load.rs1 in written or branch.rs1 not in zeroed or branch.rs2 not in zeroed:
+        return None
+    return PollLoop(head, len(insns), load.rs1, load.imm, tuple(written))
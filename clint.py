@@ -0,0 +1,272 @@
+"""
+CLINT - Machine timer and software interrupt device
+
+A core-local interruptor with the SiFive/QEMU register layout:
+
+    0x02000000  msip      bit 0 raises a machine software interrupt
+    0x02004000  mtimecmp  64-bit compare value (low word, then high word)
+    0x0200BFF8  mtime     64-bit time counter ticking at MTIME_HZ
+
+The machine timer interrupt is pending while mtime >= mtimecmp, so
+firmware sleeps by setting mtimecmp, enabling MTIE in mie and MIE in
+mstatus, and executing WFI. mtimecmp starts at its maximum, so nothing
+is pending after reset.
+
+mtime counts from the same time base as the timer MMIO registers: host
+time since the program was loaded, or Memory.clock (a VirtualClock) if
+one is attached, in which case timer deadlines can also be converted to
+instruction counts (cycles_until_due) and idle waits skipped outright.
+
+The device only reports pending interrupts. Run loops deliver them with
+service_interrupts() between batches of instructions, so batches carry no
+per-instruction checks: a batch ends at the timer deadline (exactly,
+under a virtual clock), after INTERRUPT_CHECK_INTERVAL instructions, or
+after an instruction that may enable an interrupt (CSR writes to
+mstatus/mie, MRET, WFI).
+"""
+
+import time
+
+from cpu import CSR_MSTATUS, CSR_MIE, CSR_MIP, MSTATUS_MIE, MCAUSE_INTERRUPT
+
+
+CLINT_BASE = 0x02000000
+CLINT_MSIP = CLINT_BASE
+CLINT_MTIMECMP = CLINT_BASE + 0x4000
+CLINT_MTIME = CLINT_BASE + 0xBFF8
+CLINT_END = CLINT_BASE + 0xC000  # Exclusive
+
+# mtime ticks per second (10 MHz, as on QEMU's virt machine)
+MTIME_HZ = 10_000_000
+NS_PER_TICK = 1_000_000_000 // MTIME_HZ
+
+MASK64 = (1 << 64) - 1
+
+# mip/mie bits of the interrupts the CLINT raises
+MIP_MSIP = 1 << 3
+MIP_MTIP = 1 << 7
+
+CLINT_INTERRUPTS = MIP_MSIP | MIP_MTIP
+
+# Interrupt causes (mcause without the interrupt bit)
+CAUSE_MACHINE_SOFTWARE = 3
+CAUSE_MACHINE_TIMER = 7
+
+# Longest batch between interrupt checks while interrupts are enabled
+# (bounds the latency of host-time deadlines and mtimecmp changes)
+INTERRUPT_CHECK_INTERVAL = 10_000
+
+
+class CLINT:
+    """msip, mtimecmp and mtime registers of one hart."""
+
+    def __init__(self, memory):
+        """
+        Args:
+            memory: Memory the device is mapped into (supplies the time base)
+        """
+        self.memory = memory
+        self.msip = 0
+        self.mtimecmp = MASK64
+        self._mtime_offset = 0  # Added by guest writes to mtime
+
+    @staticmethod
+    def is_register(address):
+        """True if address is a byte of msip, mtimecmp or mtime."""
+        return (CLINT_MSIP <= address < CLINT_MSIP + 4 or
+                CLINT_MTIMECMP <= address < CLINT_MTIMECMP + 8 or
+                CLINT_MTIME <= address < CLINT_MTIME + 8)
+
+    def _elapsed_ns(self):
+        memory = self.memory
+        if memory.clock is not None:
+            return memory.clock.elapsed_ns()
+        return int((time.time() - memory.timer_start) * 1_000_000_000)
+
+    def mtime(self):
+        """Current 64-bit mtime value."""
+        return (self._elapsed_ns() // NS_PER_TICK + self._mtime_offset) & MASK64
+
+    def read_register(self, register):
+        """
+        Return the 32-bit value of a register word.
+
+        Args:
+            register: Word-aligned address of msip or a mtimecmp/mtime half
+
+        Returns:
+            Register value (32-bit)
+        """
+        if register == CLINT_MSIP:
+            return self.msip
+        if register >= CLINT_MTIME:
+            value = self.mtime()
+            base = CLINT_MTIME
+        else:
+            value = self.mtimecmp
+            base = CLINT_MTIMECMP
+        return (value >> (8 * (register - base))) & 0xFFFFFFFF
+
+    def write_byte(self, address, value):
+        """
+        Store one byte into a register.
+
+        Args:
+            address: Address of a register byte (see is_register)
+            value: Byte value
+        """
+        if address < CLINT_MSIP + 4:
+            if address == CLINT_MSIP:
+                self.msip = value & 1
+            return
+        if address >= CLINT_MTIME:
+            shift = 8 * (address - CLINT_MTIME)
+            current = self.mtime()
+            updated = (current & ~(0xFF << shift)) | (value << shift)
+            self._mtime_offset = (self._mtime_offset + updated - current) & MASK64
+            return
+        shift = 8 * (address - CLINT_MTIMECMP)
+        self.mtimecmp = (self.mtimecmp & ~(0xFF << shift)) | (value << shift)
+
+    def pending(self):
+        """mip bits of the interrupts the device currently raises."""
+        bits = MIP_MSIP if self.msip else 0
+        if self.mtime() >= self.mtimecmp:
+            bits |= MIP_MTIP
+        return bits
+
+    def ticks_until_due(self):
+        """mtime ticks until the timer interrupt is pending, or None if never."""
+        if self.mtimecmp == MASK64:
+            return None
+        return max(0, self.mtimecmp - self.mtime())
+
+    def seconds_until_due(self):
+        """Host seconds until the timer interrupt is pending, or None if never."""
+        ticks = self.ticks_until_due()
+        return None if ticks is None else ticks / MTIME_HZ
+
+    def cycles_until_due(self):
+        """
+        Instructions until the timer interrupt is pending under the virtual clock.
+
+        Returns:
+            Instruction count (0 if already pending), or None if the timer
+            is disarmed or time comes from the host
+        """
+        clock = self.memory.clock
+        ticks = self.ticks_until_due()
+        if clock is None or ticks is None:
+            return None
+        if ticks == 0:
+            return 0
+        return clock.cycles_until((self.mtimecmp - self._mtime_offset) * NS_PER_TICK)
+
+    def skip_to_due(self):
+        """
+        Advance the virtual clock to the timer deadline (idling in WFI).
+
+        Returns:
+            Instructions skipped, or None if there is no deadline to skip to
+        """
+        cycles = self.cycles_until_due()
+        if cycles is not None:
+            self.memory.clock.fast_forward(cycles)
+        return cycles
+
+    def reset(self):
+        self.msip = 0
+        self.mtimecmp = MASK64
+        self._mtime_offset = 0
+
+
+def service_interrupts(cpu, clint, budget):
+    """
+    Take a pending interrupt and size the next batch of instructions.
+    
+    Updates mip from the device. If mstatus.MIE is set and an interrupt
+    enabled in mie is pending, the CPU enters its trap handler (software
+    interrupts before timer interrupts).
+    
+    Args:
+        cpu: RV32CPU
+        clint: CLINT of the CPU's memory
+        budget: Instructions the caller still wants to run
+        
+    Returns:
+        Tuple (cause, window): the mcause taken (None if no trap), and the
+        instructions to run before the next call (at most budget)
+    """
+    csrs = cpu.csrs
+    enabled = csrs[CSR_MIE] & CLINT_INTERRUPTS
+    if not enabled or not csrs[CSR_MSTATUS] & MSTATUS_MIE:
+        return None, budget
+    pending = clint.pending()
+    csrs[CSR_MIP] = (csrs[CSR_MIP] & ~CLINT_INTERRUPTS) | pending
+    pending &= enabled
+    if pending:
+        cause = MCAUSE_INTERRUPT | (CAUSE_MACHINE_SOFTWARE if pending & MIP_MSIP
+                                    else CAUSE_MACHINE_TIMER)
+        cpu.enter_trap(cause)
+        # Interrupts stay disabled until MRET, which ends its batch
+        return cause, budget
+    window = INTERRUPT_CHECK_INTERVAL
+    if enabled & MIP_MTIP:
+        cycles = clint.cycles_until_due()
+        if cycles is not None:
+            window = min(window, cycles)
+    return None, min(budget, window)
+
+
+def cycles_until_interrupt(cpu, clint):
+    """
+    Instructions until an enabled interrupt traps, under the virtual clock.
+    
+    Args:
+        cpu: RV32CPU
+        clint: CLINT of the CPU's memory
+        
+    Returns:
+        0 if one is pending, the instructions until the armed timer
+        deadline, or None if no interrupt can trap (or time comes from
+        the host)
+    """
+    csrs = cpu.csrs
+    enabled = csrs[CSR_MIE] & CLINT_INTERRUPTS
+    if not enabled or not csrs[CSR_MSTATUS] & MSTATUS_MIE:
+        return None
+    if clint.pending() & enabled:
+        return 0
+    if enabled & MIP_MTIP:
+        return clint.cycles_until_due()
+    return None
+
+
+def wfi_wakes(cpu, clint):
+    """
+    Check whether an interrupt ends a WFI now.
+    
+    A WFI completes once an interrupt enabled in mie is pending, whether or
+    not mstatus.MIE lets it trap. Under a virtual clock, waiting for the
+    armed timer is skipped: time jumps to its deadline.
+    
+    Args:
+        cpu: RV32CPU
+        clint: CLINT of the CPU's memory
+        
+    Returns:
+        True if the WFI can complete
+    """
+    enabled = cpu.csrs[CSR_MIE] & CLINT_INTERRUPTS
+    if not enabled:
+        return False
+    if clint.pending() & enabled:
+        return True
+    return bool(enabled & MIP_MTIP) and clint.skip_to_due() is not None
+
+
+def seconds_until_wake(cpu, clint):
+    """Host seconds until the timer ends a WFI, or None if it never will."""
+    if not cpu.csrs[CSR_MIE] & MIP_MTIP:
+        return None
+    return clint.seconds_until_due()
@@ -0,0 +1,85 @@
+"""
+Clock - Deterministic virtual time for the timer MMIO registers
+
+By default the timer registers read host time:
+
+    0x10000004  milliseconds since the program was loaded
+    0x10000008  Unix time (seconds)
+    0x1000000C  nanoseconds within the current second
+
+so two runs of the same program see different values. A VirtualClock
+derives all three from the number of retired instructions instead, as if
+the guest ran at a fixed clock rate retiring one instruction per cycle:
+
+    elapsed_ns = instructions * 1000 / mhz
+
+Guest delay loops then take the same number of instructions on every run
+regardless of host speed, and benchmark runs are reproducible. Time the
+simulator skips without executing (idle RX polls elided by the block
+engine) is added with fast_forward(), so virtual time still advances as
+if those instructions had run.
+"""
+
+import math
+from fractions import Fraction
+
+
+# Unix time at instruction 0 (2000-01-01T00:00:00Z)
+DEFAULT_EPOCH = 946684800
+
+
+class VirtualClock:
+    """Timer register values computed from a retired instruction count."""
+
+    def __init__(self, mhz, retired, epoch=DEFAULT_EPOCH):
+        """
+        Args:
+            mhz: Simulated clock rate in MHz (instructions per microsecond)
+            retired: Callable returning the instructions retired so far
+            epoch: Unix time (seconds) at instruction 0
+        """
+        if mhz <= 0:
+            raise ValueError(f"Clock rate must be positive, got {mhz} MHz")
+        self.mhz = mhz
+        self._mhz = Fraction(str(mhz))  # Exact rate, so 0.001 MHz is 1 ms per cycle
+        self.retired = retired
+        self.epoch = epoch
+        self.skipped = 0  # Instructions fast-forwarded without executing
+
+    def cycles(self):
+        """Elapsed cycles: retired plus fast-forwarded instructions."""
+        return self.retired() + self.skipped
+
+    def elapsed_ns(self):
+        """Virtual nanoseconds since instruction 0."""
+        return int(self.cycles() * 1000 / self._mhz)
+
+    def cycles_until(self, ns):
+        """Cycles from now until elapsed_ns() reaches ns (0 if it has)."""
+        return max(0, math.ceil(ns * self._mhz / 1000) - self.cycles())
+
+    def fast_forward(self, instructions):
+        """Advance time by instructions that were skipped, not executed."""
+        self.skipped += instructions
+
+    def read_register(self, address):
+        """
+        Return the 32-bit value of a timer register.
+
+        Args:
+            address: Memory.TIMER_ADDR, CLOCK_TIME_ADDR or CLOCK_NSEC_ADDR
+
+        Returns:
+            Register value (32-bit)
+        """
+        ns = self.elapsed_ns()
+        if address == 0x10000004:
+            value = ns // 1_000_000
+        elif address == 0x10000008:
+            value = self.epoch + ns // 1_000_000_000
+        else:
+            value = ns % 1_000_000_000
+        return value & 0xFFFFFFFF
+
+    def __repr__(self):
+        return f"VirtualClock({self.mhz} MHz, {self.cycles()} cycles)"
@@ -0,0 +1,74 @@
+"""
+Counters - cycle, time and instret CSRs (Zicntr)
+
+Guest code reads them with rdcycle/rdtime/rdinstret (CSRRS rd, csr, x0)
+to time its own functions without going through the timer MMIO:
+
+    instret   instructions retired before the reading instruction
+    cycle     elapsed cycles: under a VirtualClock (one instruction per
+              cycle) its cycles(), which also counts time skipped in
+              idle waits; with host time, the same as instret
+    time      the CLINT's mtime (MTIME_HZ ticks per second)
+
+Each counter is 64 bits wide: cycleh/timeh/instreth (csr + 0x80) read
+the high word. mcycle/minstret read the same values as cycle/instret.
+All of them are read-only here; writes are ignored.
+"""
+
+from cpu import (CSR_CYCLE, CSR_TIME, CSR_INSTRET, CSR_MCYCLE, CSR_MINSTRET,
+                 COUNTER_HIGH)
+
+
+class HardwareCounters:
+    """Counter CSR values of one hart, computed when they are read."""
+
+    def __init__(self, retired, memory):
+        """
+        Args:
+            retired: Callable returning the instructions retired so far
+                     (exact in the middle of a run)
+            memory: Memory whose clock and CLINT supply cycle and time
+        """
+        self.retired = retired
+        self.memory = memory
+
+    def cycles(self):
+        """64-bit cycle count."""
+        clock = self.memory.clock
+        if clock is not None:
+            return clock.cycles()
+        return self.retired()
+
+    def value(self, csr):
+        """
+        Full 64-bit value of a counter.
+
+        Args:
+            csr: Address of the counter or of its high word
+
+        Returns:
+            Counter value (64-bit)
+        """
+        base = csr & ~COUNTER_HIGH
+        if base == CSR_TIME:
+            return self.memory.clint.mtime()
+        if base in (CSR_CYCLE, CSR_MCYCLE):
+            return self.cycles()
+        if base in (CSR_INSTRET, CSR_MINSTRET):
+            return self.retired()
+        raise ValueError(f"CSR 0x{csr:03x} is not a counter")
+
+    def read(self, csr):
+        """
+        Return the 32-bit value of a counter CSR (see cpu.COUNTER_CSRS).
+
+        Args:
+            csr: Counter CSR address
+
+        Returns:
+            Low word of the counter, or its high word for the *h CSRs
+        """
+        value = self.value(csr)
+        if csr & COUNTER_HIGH:
+            value >>= 32
+        return value & 0xFFFFFFFF
@@ -8,6 +8,42 @@ Contains the RV32CPU class which manages:
 """
 
 
+# Index of the write-only slot that absorbs writes to x0. The register
+# list has one slot past x31, so an instruction can store its result at
+# "rd, or X0_SINK for x0" without testing rd at run time; regs[0] itself
+# is never written and always reads 0.
+X0_SINK = 32
+
+# Machine-mode CSR addresses
+CSR_MSTATUS = 0x300
+CSR_MIE = 0x304
+CSR_MTVEC = 0x305
+CSR_MEPC = 0x341
+CSR_MCAUSE = 0x342
+CSR_MIP = 0x344
+
+# mstatus fields
+MSTATUS_MIE = 1 << 3    # Machine interrupts enabled
+MSTATUS_MPIE = 1 << 7   # MIE before the last trap
+MSTATUS_MPP = 3 << 11   # Privilege before the last trap (always machine)
+
+# mcause bit marking interrupts (as opposed to exceptions)
+MCAUSE_INTERRUPT = 0x80000000
+
+# Zicntr counters: user read-only views and their machine-mode aliases.
+# Each is 64 bits; the CSR at +0x80 holds the high word.
+CSR_CYCLE = 0xC00
+CSR_TIME = 0xC01
+CSR_INSTRET = 0xC02
+CSR_MCYCLE = 0xB00
+CSR_MINSTRET = 0xB02
+COUNTER_HIGH = 0x80
+
+COUNTER_CSRS = frozenset(base + high
+                         for base in (CSR_CYCLE, CSR_TIME, CSR_INSTRET, CSR_MCYCLE, CSR_MINSTRET)
+                         for high in (0, COUNTER_HIGH))
+
+
 class RV32CPU:
     """
     RISC-V RV32IMC CPU Simulator
@@ -19,9 +55,9 @@ class RV32CPU:
     """
     
     def __init__(self):
-        # General purpose registers x0-x31
+        # General purpose registers x0-x31, plus the x0 write sink
         # Using a list for simplicity - direct indexing with register number
-        self.regs = [0] * 32
+        self.regs = [0] * (X0_SINK + 1)
         
         # Program counter
         self.pc = 0
@@ -36,6 +72,10 @@ class RV32CPU:
             0x304: 0,  # mie - Machine interrupt-enable
             0x344: 0,  # mip - Machine interrupt-pending
         }
+        
+        # Source of the cycle/time/instret CSRs (counters.HardwareCounters);
+        # without one they read 0
+        self.counters = None
     
     def read_reg(self, index):
         """
@@ -61,11 +101,11 @@ class RV32CPU:
             index: Register number (0-31)
             value: Value to write
             
-        Note: Writes to x0 are ignored
+        Note: Writes to x0 are ignored. Values from any source are accepted
+        and masked to 32 bits; instruction handlers store already-masked
+        results into regs directly.
         """
-        if index != 0:
-            # Mask to 32 bits to simulate hardware behavior
-            self.regs[index] = value & 0xFFFFFFFF
+        self.regs[index or X0_SINK] = value & 0xFFFFFFFF
     
     def read_csr(self, address):
         """
@@ -79,6 +119,8 @@ class RV32CPU:
         """
         if address in self.csrs:
             return self.csrs[address] & 0xFFFFFFFF
+        if address in COUNTER_CSRS and self.counters is not None:
+            return self.counters.read(address)
         # Unimplemented CSRs return 0
         return 0
     
@@ -89,16 +131,50 @@ class RV32CPU:
         Args:
             address: CSR address
             value: Value to write
+        
+        Note: The counters are read-only; writes to them are ignored.
         """
         if address in self.csrs:
             self.csrs[address] = value & 0xFFFFFFFF
     
+    def enter_trap(self, cause):
+        """
+        Take a trap: save PC and cause, disable interrupts, jump to mtvec.
+        
+        Vectored mode (mtvec bit 0 set) sends interrupts to
+        base + 4 * cause; exceptions and direct mode go to base.
+        
+        Args:
+            cause: mcause value (MCAUSE_INTERRUPT set for interrupts)
+        """
+        csrs = self.csrs
+        csrs[CSR_MEPC] = self.pc
+        csrs[CSR_MCAUSE] = cause
+        status = csrs[CSR_MSTATUS]
+        previous = MSTATUS_MPIE if status & MSTATUS_MIE else 0
+        csrs[CSR_MSTATUS] = (status & ~(MSTATUS_MIE | MSTATUS_MPIE)) | previous | MSTATUS_MPP
+        mtvec = csrs[CSR_MTVEC]
+        base = mtvec & ~3
+        if mtvec & 1 and cause & MCAUSE_INTERRUPT:
+            base += 4 * (cause & ~MCAUSE_INTERRUPT)
+        self.pc = base & 0xFFFFFFFF
+    
+    def trap_return(self):
+        """
+        Return from a trap (MRET): restore MIE from MPIE and jump to mepc.
+        """
+        csrs = self.csrs
+        status = csrs[CSR_MSTATUS]
+        restored = MSTATUS_MIE if status & MSTATUS_MPIE else 0
+        csrs[CSR_MSTATUS] = (status & ~MSTATUS_MIE) | restored | MSTATUS_MPIE | MSTATUS_MPP
+        self.pc = csrs[CSR_MEPC] & 0xFFFFFFFE
+    
     def reset(self):
         """
         Reset the CPU to initial state.
         """
         # Clear all general purpose registers
-        for i in range(32):
+        for i in range(len(self.regs)):
             self.regs[i] = 0
         
         # Reset program counter (typically starts at 0x80000000 for RISC-V)
@@ -11,7 +11,7 @@ class TraceEntry:
     def __init__(self, step, pc, regs, insn):
         self.step = step  # Instruction number
         self.pc = pc
-        self.regs = regs.copy()  # Copy of all 32 registers
+        self.regs = regs.copy()  # Copy of all registers (x0-x31 and the x0 sink)
         self.insn = insn  # The instruction that was executed
         self.index = 0  # Monotonic index, set by TraceBuffer.add()
     
@@ -381,6 +381,18 @@ class Debugger:
         
         return False, None
     
+    def armed(self):
+        """
+        True if any debug feature needs per-instruction hooks.
+        
+        Breakpoints (address or register), step mode and trace capture all
+        have to observe every instruction; while none of them is armed an
+        engine may skip should_break() and TraceBuffer.add() entirely.
+        """
+        bp_manager = self.bp_manager
+        return bool(bp_manager.breakpoints or bp_manager.register_breakpoints or
+                    self.step_mode or self.trace_buffer.enabled)
+    
     def set_step_mode(self, enabled, count=1):
         """Enable/disable step mode with optional step count"""
         self.step_mode = enabled
@@ -15,6 +15,13 @@ RV32I Base (40 instructions) - COMPLETE:
   ✓ FENCE (I-type format)
   ✓ ECALL/EBREAK (I-type format, distinguished by imm field)
 
+Privileged:
+  ✓ WFI (I-type format, imm=0x105; waits for console input or an interrupt)
+  ✓ MRET (I-type format, imm=0x302)
+
+Zicsr:
+  ✓ CSRRW, CSRRS, CSRRC, CSRRWI, CSRRSI, CSRRCI (I-type format, csr in imm)
+
 RV32M Extension (8 instructions) - COMPLETE:
   ✓ R-type (funct7=1): MUL, MULH, MULHSU, MULHU, DIV, DIVU, REM, REMU
 
@@ -23,20 +30,168 @@ RV32C Compressed Extension - NOT IMPLEMENTED:
   ✗ Missing 9 compressed formats: CR, CI, CSS, CIW, CL, CS, CA, CB, CJ
   See docs/refs/rv_c.txt, rv32_c.txt, rv32_instruction_formats.txt
 
-Note: CSR instructions (Zicsr) and FENCE.I (Zifencei) are separate extensions,
-      not part of base RV32I.
+Note: FENCE.I (Zifencei) is a separate extension, not part of base RV32I.
 """
 
 
+from functools import lru_cache
+
+from cpu import X0_SINK
+
+
+# Bits of an instruction word selecting the operation: funct7 | funct3 | opcode
+DISPATCH_MASK = 0xFE00707F
+
+# Distinct instruction words kept by decode_instruction()'s memo
+DECODE_CACHE_SIZE = 65536
+
+
+class DecodedInsn:
+    """
+    Decoded fields of one instruction word.
+    
+    A fixed-layout record (no per-instance dict). Fields are read as
+    attributes on hot paths (d.rd, d.imm) and by key for compatibility
+    with code written against the old dict representation (d['rd']).
+    
+    Instances are shared between every decode of the same word, so they
+    must be treated as read-only.
+    """
+    
+    FIELDS = ('opcode', 'rd', 'funct3', 'rs1', 'rs2', 'funct7', 'imm', 'format', 'raw', 'name')
+    
+    # dest: the register slot results are stored in, rd or cpu.X0_SINK
+    __slots__ = FIELDS + ('dest',)
+    
+    def __init__(self, opcode, rd, funct3, rs1, rs2, funct7, imm, fmt, raw, name=None):
+        self.opcode = opcode
+        self.rd = rd
+        self.funct3 = funct3
+        self.rs1 = rs1
+        self.rs2 = rs2
+        self.funct7 = funct7
+        self.imm = imm
+        self.format = fmt
+        self.raw = raw
+        self.name = name
+        self.dest = rd or X0_SINK
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+    
+    def __contains__(self, key):
+        return key in self.FIELDS
+    
+    def get(self, key, default=None):
+        """Field value by name, or default if there is no such field."""
+        return getattr(self, key, default) if key in self.FIELDS else default
+    
+    def keys(self):
+        """Field names, in the order of the old dict representation."""
+        return list(self.FIELDS)
+    
+    def to_dict(self):
+        """Return the fields as a plain dict."""
+        return {key: getattr(self, key) for key in self.FIELDS}
+    
+    def __repr__(self):
+        return f"DecodedInsn({self.name}, raw=0x{self.raw:08x})"
+
+
+def dispatch_key(opcode, funct3, funct7):
+    """
+    Build the (opcode, funct3, funct7) table key used by INSTRUCTION_NAMES
+    and execute.DISPATCH_TABLE.
+    
+    The key equals insn & DISPATCH_MASK, so it can be computed straight
+    from an instruction word without extracting the fields.
+    """
+    return opcode | (funct3 << 12) | (funct7 << 25)
+
+
+# Instruction format by opcode
+OPCODE_FORMATS = {
+    0b0110011: 'R',  # Register ALU (incl. M extension)
+    0b0111011: 'R',  # RV64 *W ops - format known, no instructions implemented
+    0b0010011: 'I',  # Immediate ALU
+    0b0000011: 'I',  # Loads
+    0b1100111: 'I',  # JALR
+    0b0001111: 'I',  # FENCE
+    0b1110011: 'I',  # ECALL/EBREAK/WFI/MRET, Zicsr
+    0b0100011: 'S',  # Stores
+    0b1100011: 'B',  # Branches
+    0b0110111: 'U',  # LUI
+    0b0010111: 'U',  # AUIPC
+    0b1101111: 'J',  # JAL
+}
+
+
+def _imm_i(insn):
+    """I-type: imm[11:0] = insn[31:20], sign-extended"""
+    imm = (insn >> 20) & 0xFFF
+    if imm & 0x800:
+        imm |= 0xFFFFF000
+    return imm
+
+
+def _imm_s(insn):
+    """S-type: imm[11:5] = insn[31:25], imm[4:0] = insn[11:7], sign-extended"""
+    imm = ((insn >> 20) & 0xFE0) | ((insn >> 7) & 0x1F)
+    if imm & 0x800:
+        imm |= 0xFFFFF000
+    return imm
+
+
+def _imm_b(insn):
+    """B-type: imm[12|10:5] = insn[31:25], imm[4:1|11] = insn[11:7], sign-extended"""
+    imm = (((insn >> 19) & 0x1000) | ((insn << 4) & 0x800) |
+           ((insn >> 20) & 0x7E0) | ((insn >> 7) & 0x1E))
+    if imm & 0x1000:
+        imm |= 0xFFFFE000
+    return imm
+
+
+def _imm_u(insn):
+    """U-type: upper 20 bits already in position (sign bit extended past bit 31)"""
+    imm = insn & 0xFFFFF000
+    if imm & 0x80000000:
+        imm |= 0xFFFFFFFF00000000
+    return imm
+
+
+def _imm_j(insn):
+    """J-type: imm[20|10:1|11|19:12] = insn[31:12], sign-extended"""
+    imm = (((insn >> 11) & 0x100000) | (insn & 0xFF000) |
+           ((insn >> 9) & 0x800) | ((insn >> 20) & 0x7FE))
+    if imm & 0x100000:
+        imm |= 0xFFE00000
+    return imm
+
+
+IMMEDIATE_DECODERS = {
+    'I': _imm_i,
+    'S': _imm_s,
+    'B': _imm_b,
+    'U': _imm_u,
+    'J': _imm_j,
+}
+
+
 def decode_instruction(insn):
     """
     Decode a 32-bit RISC-V instruction.
     
+    Decodes are memoized per instruction word (LRU, DECODE_CACHE_SIZE
+    words), so repeated decodes of the same word return the same object.
+    
     Args:
         insn: 32-bit instruction word
         
     Returns:
-        Dictionary with decoded fields:
+        DecodedInsn with fields (also readable as decoded['field']):
         - opcode: 7-bit opcode
         - rd: Destination register (0-31)
         - funct3: 3-bit function code
@@ -45,98 +200,38 @@ def decode_instruction(insn):
         - funct7: 7-bit function code
         - imm: Immediate value (sign-extended for relevant types)
         - format: Instruction format (R, I, S, B, U, J)
+        - raw: The instruction word
         - name: Human-readable instruction name (added for execute.py)
+        
+    Raises:
+        NotImplementedError: If the instruction is not supported
     """
-    insn = insn & 0xFFFFFFFF
-    
-    # Common fields
+    return _decode_word(insn & 0xFFFFFFFF)
+
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_word(insn):
+    """Uncached decode of a masked instruction word (see decode_instruction)."""
     opcode = insn & 0x7F
-    rd = (insn >> 7) & 0x1F
-    funct3 = (insn >> 12) & 0x7
-    rs1 = (insn >> 15) & 0x1F
-    rs2 = (insn >> 20) & 0x1F
-    funct7 = (insn >> 25) & 0x7F
-    
-    # Determine format and decode immediate (order: R, I, S, B, U, J)
-    fmt = None
-    imm = 0
-    
-    # R-type: Register ALU operations
-    if opcode in [0b0110011, 0b0111011]:
-        fmt = 'R'
-        imm = 0  # No immediate
-    
-    # I-type: Immediate ALU, loads, JALR, FENCE, ECALL/EBREAK
-    elif opcode in [0b0010011, 0b0000011, 0b1100111, 0b0001111, 0b1110011]:
-        fmt = 'I'
-        imm = (insn >> 20) & 0xFFF
-        # Sign extend from bit 11
-        if imm & 0x800:
-            imm |= 0xFFFFFFFFFFFFF000
-        imm = sign_extend_32(imm)
-    
-    # S-type: Store instructions
-    elif opcode == 0b0100011:
-        fmt = 'S'
-        imm_11_5 = (insn >> 25) & 0x7F
-        imm_4_0 = (insn >> 7) & 0x1F
-        imm = (imm_11_5 << 5) | imm_4_0
-        # Sign extend from bit 11
-        if imm & 0x800:
-            imm |= 0xFFFFFFFFFFFFF000
-        imm = sign_extend_32(imm)
-    
-    # B-type: Branch instructions
-    elif opcode == 0b1100011:
-        fmt = 'B'
-        imm_12 = (insn >> 31) & 0x1
-        imm_10_5 = (insn >> 25) & 0x3F
-        imm_4_1 = (insn >> 8) & 0xF
-        imm_11 = (insn >> 7) & 0x1
-        imm = (imm_12 << 12) | (imm_11 << 11) | (imm_10_5 << 5) | (imm_4_1 << 1)
-        # Sign extend from bit 12
-        if imm & 0x1000:
-            imm |= 0xFFFFFFFFFFFFE000
-        imm = sign_extend_32(imm)
-    
-    # U-type: LUI, AUIPC
-    elif opcode in [0b0110111, 0b0010111]:
-        fmt = 'U'
-        imm = insn & 0xFFFFF000  # Upper 20 bits already in position
-        # Sign extend from bit 31
-        if imm & 0x80000000:
-            imm |= 0xFFFFFFFF00000000
-    
-    # J-type: JAL
-    elif opcode == 0b1101111:
-        fmt = 'J'
-        imm_20 = (insn >> 31) & 0x1
-        imm_10_1 = (insn >> 21) & 0x3FF
-        imm_11 = (insn >> 20) & 0x1
-        imm_19_12 = (insn >> 12) & 0xFF
-        imm = (imm_20 << 20) | (imm_19_12 << 12) | (imm_11 << 11) | (imm_10_1 << 1)
-        # Sign extend from bit 20
-        if imm & 0x100000:
-            imm |= 0xFFFFFFFFFFE00000
-        imm = sign_extend_32(imm)
-    
-    else:
-        fmt = 'Unknown'
-    
-    decoded = {
-        'opcode': opcode,
-        'rd': rd,
-        'funct3': funct3,
-        'rs1': rs1,
-        'rs2': rs2,
-        'funct7': funct7,
-        'imm': imm,
-        'format': fmt,
-        'raw': insn
-    }
+    
+    # Format and immediate are looked up by opcode (R-type has no immediate)
+    fmt = OPCODE_FORMATS.get(opcode, 'Unknown')
+    imm_decoder = IMMEDIATE_DECODERS.get(fmt)
+    
+    decoded = DecodedInsn(
+        opcode,
+        (insn >> 7) & 0x1F,
+        (insn >> 12) & 0x7,
+        (insn >> 15) & 0x1F,
+        (insn >> 20) & 0x1F,
+        insn >> 25,
+        imm_decoder(insn) if imm_decoder else 0,
+        fmt,
+        insn
+    )
     
     # Add instruction name to avoid re-decoding in execute.py
-    decoded['name'] = get_instruction_name(decoded)
+    decoded.name = INSTRUCTION_NAMES.get(insn & DISPATCH_MASK) or get_instruction_name(decoded)
     
     return decoded
 
@@ -156,12 +251,85 @@ def sign_extend_32(value):
     return value & 0xFFFFFFFF
 
 
+def _build_instruction_names():
+    """
+    Build the (opcode, funct3, funct7) -> name table for RV32IM.
+    
+    Fields an instruction does not use are expanded to every value, so a
+    single dict lookup on insn & DISPATCH_MASK names any instruction.
+    ECALL/EBREAK share a key and are resolved by get_instruction_name().
+    """
+    names = {}
+    all_funct3 = range(8)
+    all_funct7 = range(128)
+    
+    def add(opcode, name, funct3s, funct7s=all_funct7):
+        for funct3 in funct3s:
+            for funct7 in funct7s:
+                names[dispatch_key(opcode, funct3, funct7)] = name
+    
+    # R-type - Register ALU (M extension is funct7=1; any other non-zero
+    # funct7 selects the alternate SUB/SRA encoding)
+    m_ext = ['MUL', 'MULH', 'MULHSU', 'MULHU', 'DIV', 'DIVU', 'REM', 'REMU']
+    base = ['ADD', 'SLL', 'SLT', 'SLTU', 'XOR', 'SRL', 'OR', 'AND']
+    for funct3 in all_funct3:
+        for funct7 in all_funct7:
+            if funct7 == 1:
+                name = m_ext[funct3]
+            elif funct7 != 0 and funct3 == 0b000:
+                name = 'SUB'
+            elif funct7 != 0 and funct3 == 0b101:
+                name = 'SRA'
+            else:
+                name = base[funct3]
+            add(0b0110011, name, [funct3], [funct7])
+    
+    # I-type - Immediate ALU (SRLI/SRAI distinguished by imm[11:5])
+    for funct3, name in enumerate(['ADDI', 'SLLI', 'SLTI', 'SLTIU', 'XORI', None, 'ORI', 'ANDI']):
+        if name:
+            add(0b0010011, name, [funct3])
+    add(0b0010011, 'SRLI', [0b101], [0])
+    add(0b0010011, 'SRAI', [0b101], range(1, 128))
+    
+    # I-type - Loads
+    for funct3, name in [(0b000, 'LB'), (0b001, 'LH'), (0b010, 'LW'), (0b100, 'LBU'), (0b101, 'LHU')]:
+        add(0b0000011, name, [funct3])
+    
+    # I-type - JALR, FENCE (FENCE.I would be funct3=0b001, Zifencei extension)
+    add(0b1100111, 'JALR', all_funct3)
+    add(0b0001111, 'FENCE', [0b000])
+    
+    # S-type - Stores
+    for funct3, name in enumerate(['SB', 'SH', 'SW']):
+        add(0b0100011, name, [funct3])
+    
+    # B-type - Branches
+    for funct3, name in [(0b000, 'BEQ'), (0b001, 'BNE'), (0b100, 'BLT'),
+                         (0b101, 'BGE'), (0b110, 'BLTU'), (0b111, 'BGEU')]:
+        add(0b1100011, name, [funct3])
+    
+    # I-type - Zicsr (csr address in imm, so funct7 is any value)
+    for funct3, name in [(0b001, 'CSRRW'), (0b010, 'CSRRS'), (0b011, 'CSRRC'),
+                         (0b101, 'CSRRWI'), (0b110, 'CSRRSI'), (0b111, 'CSRRCI')]:
+        add(0b1110011, name, [funct3])
+    
+    # U-type and J-type - no funct fields
+    add(0b0110111, 'LUI', all_funct3)
+    add(0b0010111, 'AUIPC', all_funct3)
+    add(0b1101111, 'JAL', all_funct3)
+    
+    return names
+
+
+INSTRUCTION_NAMES = _build_instruction_names()
+
+
 def get_instruction_name(decoded):
     """
     Get a human-readable name for an instruction.
     
     Args:
-        decoded: Decoded instruction dict from decode_instruction()
+        decoded: DecodedInsn from decode_instruction() (or an equivalent dict)
         
     Returns:
         String name of instruction (e.g., "LUI", "ADDI", "SB")
@@ -174,130 +342,22 @@ def get_instruction_name(decoded):
     funct3 = decoded['funct3']
     funct7 = decoded['funct7']
     
-    # R-type - Register ALU (includes M extension via funct7=1)
-    if opcode == 0b0110011:
-        if funct7 == 1:  # M extension
-            if funct3 == 0b000:
-                return "MUL"
-            elif funct3 == 0b001:
-                return "MULH"
-            elif funct3 == 0b010:
-                return "MULHSU"
-            elif funct3 == 0b011:
-                return "MULHU"
-            elif funct3 == 0b100:
-                return "DIV"
-            elif funct3 == 0b101:
-                return "DIVU"
-            elif funct3 == 0b110:
-                return "REM"
-            elif funct3 == 0b111:
-                return "REMU"
-        elif funct3 == 0b000:
-            return "ADD" if funct7 == 0 else "SUB"
-        elif funct3 == 0b001:
-            return "SLL"
-        elif funct3 == 0b010:
-            return "SLT"
-        elif funct3 == 0b011:
-            return "SLTU"
-        elif funct3 == 0b100:
-            return "XOR"
-        elif funct3 == 0b101:
-            return "SRL" if funct7 == 0 else "SRA"
-        elif funct3 == 0b110:
-            return "OR"
-        elif funct3 == 0b111:
-            return "AND"
-    
-    # I-type - Immediate ALU
-    elif opcode == 0b0010011:
-        if funct3 == 0b000:
-            return "ADDI"
-        elif funct3 == 0b010:
-            return "SLTI"
-        elif funct3 == 0b011:
-            return "SLTIU"
-        elif funct3 == 0b100:
-            return "XORI"
-        elif funct3 == 0b110:
-            return "ORI"
-        elif funct3 == 0b111:
-            return "ANDI"
-        elif funct3 == 0b001:
-            return "SLLI"
-        elif funct3 == 0b101:
-            return "SRLI" if funct7 == 0 else "SRAI"
+    name = INSTRUCTION_NAMES.get(dispatch_key(opcode, funct3, funct7))
+    if name:
+        return name
     
-    # I-type - Loads
-    elif opcode == 0b0000011:
-        if funct3 == 0b000:
-            return "LB"
-        elif funct3 == 0b001:
-            return "LH"
-        elif funct3 == 0b010:
-            return "LW"
-        elif funct3 == 0b100:
-            return "LBU"
-        elif funct3 == 0b101:
-            return "LHU"
-    
-    # I-type - JALR
-    elif opcode == 0b1100111:
-        return "JALR"
-    
-    # I-type - FENCE
-    elif opcode == 0b0001111:
-        if funct3 == 0b000:
-            return "FENCE"
-        # Note: FENCE.I would be funct3=0b001 but that's in Zifencei extension
-    
-    # I-type - System instructions (ECALL, EBREAK)
-    elif opcode == 0b1110011:
-        if funct3 == 0b000:
-            imm = decoded['imm']
-            if imm == 0x000:
-                return "ECALL"
-            elif imm == 0x001:
-                return "EBREAK"
-        # Note: CSR instructions (CSRRW, CSRRS, etc.) would be other funct3 values
-        # but those are in Zicsr extension, not base RV32I
-    
-    # S-type - Stores
-    elif opcode == 0b0100011:
-        if funct3 == 0b000:
-            return "SB"
-        elif funct3 == 0b001:
-            return "SH"
-        elif funct3 == 0b010:
-            return "SW"
-    
-    # B-type - Branches
-    elif opcode == 0b1100011:
-        if funct3 == 0b000:
-            return "BEQ"
-        elif funct3 == 0b001:
-            return "BNE"
-        elif funct3 == 0b100:
-            return "BLT"
-        elif funct3 == 0b101:
-            return "BGE"
-        elif funct3 == 0b110:
-            return "BLTU"
-        elif funct3 == 0b111:
-            return "BGEU"
-    
-    # U-type - LUI
-    elif opcode == 0b0110111:
-        return "LUI"
-    
-    # U-type - AUIPC
-    elif opcode == 0b0010111:
-        return "AUIPC"
-    
-    # J-type - JAL
-    elif opcode == 0b1101111:
-        return "JAL"
+    # I-type - System instructions (ECALL, EBREAK, WFI, MRET), distinguished
+    # by imm (CSR instructions use the other funct3 values)
+    if opcode == 0b1110011 and funct3 == 0b000:
+        imm = decoded['imm']
+        if imm == 0x000:
+            return "ECALL"
+        elif imm == 0x001:
+            return "EBREAK"
+        elif imm == 0x105:
+            return "WFI"
+        elif imm == 0x302:
+            return "MRET"
     
     # RV32C - 16-bit compressed instructions not implemented
     # Unknown instruction - raise exception to make it obvious
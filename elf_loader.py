@@ -1,7 +1,9 @@
 """Shared helpers for loading RISC-V ELF images into simulator memory."""
 from __future__ import annotations
 
+import hashlib
 import io
+import struct
 from dataclasses import dataclass
 from typing import BinaryIO, Dict, List, Tuple, Union
 
@@ -25,6 +27,7 @@ class ElfLoadResult:
     segments: List[ElfSegment]
     symbols: Dict[str, int]
     reverse_symbols: Dict[int, str]
+    image_digest: str = ""  # SHA-256 of the PT_LOAD segments (addresses, sizes, data)
 
 
 ElfSource = Union[str, bytes, bytearray, BinaryIO]
@@ -38,6 +41,7 @@ def load_elf_image(memory, source: ElfSource, *, require_riscv32: bool = True) -
         entry_point = elf.header['e_entry']
         bytes_loaded = 0
         segments: List[ElfSegment] = []
+        digest = hashlib.sha256()
 
         for segment in elf.iter_segments():
             if segment['p_type'] != 'PT_LOAD':
@@ -45,8 +49,11 @@ def load_elf_image(memory, source: ElfSource, *, require_riscv32: bool = True) -
             vaddr = segment['p_vaddr']
             filesz = segment['p_filesz']
             memsz = segment['p_memsz']
+            data = segment.data() if filesz else b''
+            digest.update(struct.pack('<III', vaddr, filesz, memsz))
+            digest.update(data)
             if filesz:
-                memory.load_program(vaddr, segment.data())
+                memory.load_program(vaddr, data)
             if memsz > filesz:
                 memory.load_program(vaddr + filesz, bytes(memsz - filesz))
             bytes_loaded += memsz
@@ -62,6 +69,7 @@ def load_elf_image(memory, source: ElfSource, *, require_riscv32: bool = True) -
             segments=segments,
             symbols=symbols,
             reverse_symbols=reverse_symbols,
+            image_digest=digest.hexdigest(),
         )
     finally:
         if should_close:
@@ -5,9 +5,9 @@ RV32 Exceptions - Custom exceptions for RISC-V execution
 
 class EBreakException(Exception):
     """Raised when EBREAK instruction is executed - used for normal program termination"""
-    def __init__(self, pc):
+    def __init__(self, pc, message=None):
         self.pc = pc
-        super().__init__(f"EBREAK at PC=0x{pc:08x}")
+        super().__init__(message or f"EBREAK at PC=0x{pc:08x}")
 
 
 class ECallException(Exception):
@@ -27,3 +27,10 @@ class MemoryAccessFault(Exception):
             f"Memory Access Fault: {access_type} at address 0x{address:08x} "
             f"(PC=0x{pc:08x})"
         )
+
+
+class LockstepDivergence(AssertionError):
+    """Raised when an engine under lockstep validation disagrees with the reference"""
+    def __init__(self, divergence):
+        self.divergence = divergence  # lockstep.Divergence
+        super().__init__(divergence.report())
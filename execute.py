@@ -4,8 +4,25 @@ Instruction Execution - Execute decoded RV32I instructions
 Implements the execution logic for RV32I base instruction set.
 """
 
-from decoder import decode_instruction, get_instruction_name, sign_extend_32
+from decoder import (decode_instruction, get_instruction_name, sign_extend_32,
+                     dispatch_key, DISPATCH_MASK, INSTRUCTION_NAMES)
 from exceptions import EBreakException, ECallException
+from cpu import CSR_MSTATUS, CSR_MIE, CSR_MIP
+from clint import MIP_MSIP, MIP_MTIP
+
+
+# Handler status codes. Handlers return True after executing an instruction
+# (cpu.pc already advanced) or one of these to ask the caller for a host
+# service; cpu.pc then still points at the instruction.
+STATUS_ECALL = 2   # Environment call: service it, then advance PC by 4
+STATUS_EBREAK = 3  # Breakpoint: program termination
+STATUS_WFI = 4     # Wait for interrupt: idle until input or an interrupt, then advance PC by 4
+# Executed (PC advanced), but interrupt enables changed: callers that batch
+# interrupt checks (clint.service_interrupts) should check before going on
+STATUS_INTERRUPTS = 5
+
+# CSRs whose writes can enable a pending interrupt
+INTERRUPT_CSRS = (CSR_MSTATUS, CSR_MIE, CSR_MIP)
 
 
 def execute_instruction(cpu, memory, insn):
@@ -19,58 +36,65 @@ def execute_instruction(cpu, memory, insn):
         
     Returns:
         True if execution should continue, False if program should halt
+        
+    Raises:
+        ECallException: For ECALL (the caller services it and advances PC)
+        EBreakException: For EBREAK
     """
     # Update memory's current PC for fault reporting
     memory.current_pc = cpu.pc
     
     decoded = decode_instruction(insn)
-    fmt = decoded['format']
-    opcode = decoded['opcode']
-    
-    # Dispatch based on format and opcode
-    if fmt == 'R':
-        return exec_register_alu(cpu, decoded)
-    
-    elif fmt == 'I':
-        if opcode == 0b0010011:  # Immediate ALU
-            return exec_immediate_alu(cpu, decoded)
-        elif opcode == 0b0000011:  # Loads
-            return exec_load(cpu, memory, decoded)
-        elif opcode == 0b1100111:  # JALR
-            return exec_jalr(cpu, decoded)
-        elif opcode == 0b0001111:  # FENCE
-            # FENCE is a no-op in single-core without DMA or reordering
-            cpu.pc += 4
-            return True
-        elif opcode == 0b1110011:  # ECALL/EBREAK
-            if decoded['name'] == 'EBREAK':
-                raise EBreakException(cpu.pc)
-            elif decoded['name'] == 'ECALL':
-                raise ECallException(cpu.pc)
-            else:
-                raise NotImplementedError(
-                    f"System instruction not implemented: {decoded['name']}, insn=0x{insn:08x}"
-                )
-    
-    elif fmt == 'S':
-        return exec_store(cpu, memory, decoded)
-    
-    elif fmt == 'B':
-        return exec_branch(cpu, decoded)
-    
-    elif fmt == 'U':
-        if opcode == 0b0110111:  # LUI
-            return exec_lui(cpu, decoded)
-        elif opcode == 0b0010111:  # AUIPC
-            return exec_auipc(cpu, decoded)
-    
-    elif fmt == 'J':
-        return exec_jal(cpu, decoded)
+    handler = select_handler(decoded)
+    status = handler(cpu, memory, decoded)
+    if status is True:
+        return True
+    if status == STATUS_ECALL:
+        raise ECallException(cpu.pc)
+    if status == STATUS_EBREAK:
+        raise EBreakException(cpu.pc)
+    if status == STATUS_WFI:
+        # No interrupt sources here: WFI completes at once, like a NOP
+        cpu.pc += 4
+        return True
+    if status == STATUS_INTERRUPTS:
+        return True
+    return status
+
+
+def select_handler(decoded):
+    """
+    Select the execution handler for a decoded instruction.
+    
+    All handlers share the signature handler(cpu, memory, decoded), so the
+    result can be cached alongside the decoded fields and invoked later
+    without repeating this dispatch (see predecode.py). Handlers return
+    True, or STATUS_ECALL/STATUS_EBREAK/STATUS_WFI/STATUS_INTERRUPTS for
+    system instructions.
+    
+    Args:
+        decoded: DecodedInsn from decode_instruction()
+        
+    Returns:
+        Handler function for the instruction
+        
+    Raises:
+        NotImplementedError: If the format/opcode has no handler
+    """
+    handler = DISPATCH_TABLE.get(decoded.raw & DISPATCH_MASK)
+    if handler is not None and (handler is not exec_system or
+                                decoded.name in ('ECALL', 'EBREAK', 'WFI')):
+        return handler
+    
+    if decoded.opcode == 0b1110011:
+        raise NotImplementedError(
+            f"System instruction not implemented: {decoded.name}, insn=0x{decoded.raw:08x}"
+        )
     
     # Unknown instruction format or opcode
     raise NotImplementedError(
-        f"Unknown instruction: {decoded['name']}, format={decoded['format']}, "
-        f"opcode=0x{decoded['opcode']:07b}, insn=0x{insn:08x}"
+        f"Unknown instruction: {decoded.name}, format={decoded.format}, "
+        f"opcode=0x{decoded.opcode:07b}, insn=0x{decoded.raw:08x}"
     )
 
 
@@ -398,7 +422,7 @@ def exec_remu(rs1_val, rs2_val):
     return remainder & 0xFFFFFFFF
 
 
-def exec_register_alu(cpu, decoded):
+def exec_register_alu(cpu, memory, decoded):
     """
     Execute R-type ALU operations (ADD, SUB, SLL, SLT, SLTU, XOR, SRL, SRA, OR, AND, MUL, etc.)
     
@@ -464,85 +488,15 @@ def exec_register_alu(cpu, decoded):
         Section 2.4: Integer Computational Instructions
         RV32M Standard Extension, Version 2.0
     """
-    funct3 = decoded['funct3']
-    funct7 = decoded['funct7']
-    rs1_val = cpu.read_reg(decoded['rs1'])
-    rs2_val = cpu.read_reg(decoded['rs2'])
-    
-    # Convert to signed for comparisons
-    rs1_signed = rs1_val if rs1_val < 0x80000000 else rs1_val - 0x100000000
-    rs2_signed = rs2_val if rs2_val < 0x80000000 else rs2_val - 0x100000000
-    
-    result = 0
-    
-    if funct3 == 0b000:
-        if funct7 == 0b0000000:  # ADD
-            result = (rs1_val + rs2_val) & 0xFFFFFFFF
-        elif funct7 == 0b0100000:  # SUB
-            result = (rs1_val - rs2_val) & 0xFFFFFFFF
-        elif funct7 == 0b0000001:  # MUL - M extension
-            result = exec_mul(rs1_signed, rs2_signed)
-    
-    elif funct3 == 0b001:
-        if funct7 == 0b0000000:  # SLL - Shift Left Logical
-            shamt = rs2_val & 0x1F
-            result = (rs1_val << shamt) & 0xFFFFFFFF
-        elif funct7 == 0b0000001:  # MULH - M extension
-            result = exec_mulh(rs1_signed, rs2_signed)
-    
-    elif funct3 == 0b010:
-        if funct7 == 0b0000000:  # SLT - Set Less Than (signed)
-            result = 1 if rs1_signed < rs2_signed else 0
-        elif funct7 == 0b0000001:  # MULHSU - M extension
-            result = exec_mulhsu(rs1_signed, rs2_val)
-    
-    elif funct3 == 0b011:  # MULHU or SLTU
-        if funct7 == 0b0000001:  # MULHU - M extension
-            result = exec_mulhu(rs1_val, rs2_val)
-        else:  # SLTU - Set Less Than Unsigned
-            result = 1 if rs1_val < rs2_val else 0
-    
-    elif funct3 == 0b100:  # DIV or XOR
-        if funct7 == 0b0000001:  # DIV - M extension
-            result = exec_div(rs1_signed, rs2_signed)
-        else:  # XOR
-            result = (rs1_val ^ rs2_val) & 0xFFFFFFFF
-    
-    elif funct3 == 0b101:
-        shamt = rs2_val & 0x1F
-        if funct7 == 0b0000000:  # SRL - Shift Right Logical
-            result = (rs1_val >> shamt) & 0xFFFFFFFF
-        elif funct7 == 0b0100000:  # SRA - Shift Right Arithmetic
-            if rs1_val & 0x80000000:
-                result = (rs1_val >> shamt) | (0xFFFFFFFF << (32 - shamt))
-            else:
-                result = (rs1_val >> shamt) & 0xFFFFFFFF
-            result &= 0xFFFFFFFF
-        elif funct7 == 0b0000001:  # DIVU - M extension
-            result = exec_divu(rs1_val, rs2_val)
-    
-    elif funct3 == 0b110:  # REM or OR
-        if funct7 == 0b0000001:  # REM - M extension
-            result = exec_rem(rs1_signed, rs2_signed)
-        else:  # OR
-            result = (rs1_val | rs2_val) & 0xFFFFFFFF
-    
-    elif funct3 == 0b111:  # REMU or AND
-        if funct7 == 0b0000001:  # REMU - M extension
-            result = exec_remu(rs1_val, rs2_val)
-        else:  # AND
-            result = (rs1_val & rs2_val) & 0xFFFFFFFF
-    
-    cpu.write_reg(decoded['rd'], result)
-    cpu.pc += 4
-    return True
+    # Each instruction has its own handler in DISPATCH_TABLE
+    return DISPATCH_TABLE[decoded.raw & DISPATCH_MASK](cpu, memory, decoded)
 
 
 # ============================================================================
 # I-Type Instructions - Immediate Operations, Loads, JALR
 # ============================================================================
 
-def exec_immediate_alu(cpu, decoded):
+def exec_immediate_alu(cpu, memory, decoded):
     """
     Execute I-type ALU operations (ADDI, SLTI, SLTIU, XORI, ORI, ANDI, SLLI, SRLI, SRAI)
     
@@ -603,53 +557,8 @@ def exec_immediate_alu(cpu, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.4: Integer Computational Instructions
     """
-    funct3 = decoded['funct3']
-    rs1_val = cpu.read_reg(decoded['rs1'])
-    imm = decoded['imm']
-    
-    # Convert to signed for comparisons
-    rs1_signed = rs1_val if rs1_val < 0x80000000 else rs1_val - 0x100000000
-    imm_signed = imm if imm < 0x80000000 else imm - 0x100000000
-    
-    result = 0
-    
-    if funct3 == 0b000:  # ADDI
-        result = (rs1_val + imm) & 0xFFFFFFFF
-    
-    elif funct3 == 0b010:  # SLTI - Set Less Than Immediate (signed)
-        result = 1 if rs1_signed < imm_signed else 0
-    
-    elif funct3 == 0b011:  # SLTIU - Set Less Than Immediate Unsigned
-        result = 1 if rs1_val < (imm & 0xFFFFFFFF) else 0
-    
-    elif funct3 == 0b100:  # XORI
-        result = (rs1_val ^ imm) & 0xFFFFFFFF
-    
-    elif funct3 == 0b110:  # ORI
-        result = (rs1_val | imm) & 0xFFFFFFFF
-    
-    elif funct3 == 0b111:  # ANDI
-        result = (rs1_val & imm) & 0xFFFFFFFF
-    
-    elif funct3 == 0b001:  # SLLI - Shift Left Logical Immediate
-        shamt = imm & 0x1F  # Only lower 5 bits
-        result = (rs1_val << shamt) & 0xFFFFFFFF
-    
-    elif funct3 == 0b101:  # SRLI / SRAI - Shift Right Logical/Arithmetic Immediate
-        shamt = imm & 0x1F
-        if decoded['funct7'] == 0b0000000:  # SRLI
-            result = (rs1_val >> shamt) & 0xFFFFFFFF
-        else:  # SRAI
-            # Arithmetic shift - preserve sign bit
-            if rs1_val & 0x80000000:
-                result = (rs1_val >> shamt) | (0xFFFFFFFF << (32 - shamt))
-            else:
-                result = rs1_val >> shamt
-            result &= 0xFFFFFFFF
-    
-    cpu.write_reg(decoded['rd'], result)
-    cpu.pc += 4
-    return True
+    # Each instruction has its own handler in DISPATCH_TABLE
+    return DISPATCH_TABLE[decoded.raw & DISPATCH_MASK](cpu, memory, decoded)
 
 
 def exec_load(cpu, memory, decoded):
@@ -703,37 +612,11 @@ def exec_load(cpu, memory, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.6: Load and Store Instructions
     """
-    funct3 = decoded['funct3']
-    rs1_val = cpu.read_reg(decoded['rs1'])
-    address = (rs1_val + decoded['imm']) & 0xFFFFFFFF
-    
-    result = 0
-    
-    if funct3 == 0b000:  # LB - Load Byte (sign-extended)
-        byte_val = memory.read_byte(address)
-        result = byte_val if byte_val < 128 else (byte_val - 256)
-        result &= 0xFFFFFFFF
-    
-    elif funct3 == 0b001:  # LH - Load Halfword (sign-extended)
-        half_val = memory.read_halfword(address)
-        result = half_val if half_val < 32768 else (half_val - 65536)
-        result &= 0xFFFFFFFF
-    
-    elif funct3 == 0b010:  # LW - Load Word
-        result = memory.read_word(address)
-    
-    elif funct3 == 0b100:  # LBU - Load Byte Unsigned
-        result = memory.read_byte(address)
-    
-    elif funct3 == 0b101:  # LHU - Load Halfword Unsigned
-        result = memory.read_halfword(address)
-    
-    cpu.write_reg(decoded['rd'], result)
-    cpu.pc += 4
-    return True
+    # Each instruction has its own handler in DISPATCH_TABLE
+    return DISPATCH_TABLE[decoded.raw & DISPATCH_MASK](cpu, memory, decoded)
 
 
-def exec_jalr(cpu, decoded):
+def exec_jalr(cpu, memory, decoded):
     """
     JALR - Jump and Link Register
     
@@ -779,9 +662,9 @@ def exec_jalr(cpu, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.5: Control Transfer Instructions
     """
-    rs1_val = cpu.read_reg(decoded['rs1'])
-    target = (rs1_val + decoded['imm']) & 0xFFFFFFFE  # Clear bit 0
-    cpu.write_reg(decoded['rd'], (cpu.pc + 4) & 0xFFFFFFFF)
+    regs = cpu.regs
+    target = (regs[decoded.rs1] + decoded.imm) & 0xFFFFFFFE  # Clear bit 0
+    regs[decoded.dest] = (cpu.pc + 4) & 0xFFFFFFFF
     cpu.pc = target
     return True
 
@@ -830,29 +713,15 @@ def exec_store(cpu, memory, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.6: Load and Store Instructions
     """
-    funct3 = decoded['funct3']
-    rs1_val = cpu.read_reg(decoded['rs1'])
-    rs2_val = cpu.read_reg(decoded['rs2'])
-    address = (rs1_val + decoded['imm']) & 0xFFFFFFFF
-    
-    if funct3 == 0b000:  # SB - Store Byte
-        memory.write_byte(address, rs2_val & 0xFF)
-    
-    elif funct3 == 0b001:  # SH - Store Halfword
-        memory.write_halfword(address, rs2_val & 0xFFFF)
-    
-    elif funct3 == 0b010:  # SW - Store Word
-        memory.write_word(address, rs2_val)
-    
-    cpu.pc += 4
-    return True
+    # Each instruction has its own handler in DISPATCH_TABLE
+    return DISPATCH_TABLE[decoded.raw & DISPATCH_MASK](cpu, memory, decoded)
 
 
 # ============================================================================
 # B-Type Instructions - Branches
 # ============================================================================
 
-def exec_branch(cpu, decoded):
+def exec_branch(cpu, memory, decoded):
     """
     Execute B-type branch instructions (BEQ, BNE, BLT, BGE, BLTU, BGEU)
     
@@ -909,42 +778,15 @@ def exec_branch(cpu, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.5: Control Transfer Instructions
     """
-    funct3 = decoded['funct3']
-    rs1_val = cpu.read_reg(decoded['rs1'])
-    rs2_val = cpu.read_reg(decoded['rs2'])
-    
-    # Convert to signed for signed comparisons
-    rs1_signed = rs1_val if rs1_val < 0x80000000 else rs1_val - 0x100000000
-    rs2_signed = rs2_val if rs2_val < 0x80000000 else rs2_val - 0x100000000
-    
-    branch_taken = False
-    
-    if funct3 == 0b000:  # BEQ
-        branch_taken = (rs1_val == rs2_val)
-    elif funct3 == 0b001:  # BNE
-        branch_taken = (rs1_val != rs2_val)
-    elif funct3 == 0b100:  # BLT
-        branch_taken = (rs1_signed < rs2_signed)
-    elif funct3 == 0b101:  # BGE
-        branch_taken = (rs1_signed >= rs2_signed)
-    elif funct3 == 0b110:  # BLTU
-        branch_taken = (rs1_val < rs2_val)
-    elif funct3 == 0b111:  # BGEU
-        branch_taken = (rs1_val >= rs2_val)
-    
-    if branch_taken:
-        cpu.pc = (cpu.pc + decoded['imm']) & 0xFFFFFFFF
-    else:
-        cpu.pc += 4
-    
-    return True
+    # Each instruction has its own handler in DISPATCH_TABLE
+    return DISPATCH_TABLE[decoded.raw & DISPATCH_MASK](cpu, memory, decoded)
 
 
 # ============================================================================
 # U-Type Instructions - Upper Immediate
 # ============================================================================
 
-def exec_lui(cpu, decoded):
+def exec_lui(cpu, memory, decoded):
     """
     LUI - Load Upper Immediate
     
@@ -991,12 +833,12 @@ def exec_lui(cpu, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.4: Integer Computational Instructions
     """
-    cpu.write_reg(decoded['rd'], decoded['imm'] & 0xFFFFFFFF)
+    cpu.regs[decoded.dest] = decoded.imm & 0xFFFFFFFF
     cpu.pc += 4
     return True
 
 
-def exec_auipc(cpu, decoded):
+def exec_auipc(cpu, memory, decoded):
     """
     AUIPC - Add Upper Immediate to PC
     
@@ -1041,8 +883,7 @@ def exec_auipc(cpu, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.4: Integer Computational Instructions
     """
-    result = (cpu.pc + decoded['imm']) & 0xFFFFFFFF
-    cpu.write_reg(decoded['rd'], result)
+    cpu.regs[decoded.dest] = (cpu.pc + decoded.imm) & 0xFFFFFFFF
     cpu.pc += 4
     return True
 
@@ -1051,7 +892,7 @@ def exec_auipc(cpu, decoded):
 # J-Type Instructions - Jumps
 # ============================================================================
 
-def exec_jal(cpu, decoded):
+def exec_jal(cpu, memory, decoded):
     """
     JAL - Jump and Link
     
@@ -1089,6 +930,403 @@ def exec_jal(cpu, decoded):
         RV32I Base Integer Instruction Set, Version 2.1
         Section 2.5: Control Transfer Instructions
     """
-    cpu.write_reg(decoded['rd'], (cpu.pc + 4) & 0xFFFFFFFF)
-    cpu.pc = (cpu.pc + decoded['imm']) & 0xFFFFFFFF
+    cpu.regs[decoded.dest] = (cpu.pc + 4) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + decoded.imm) & 0xFFFFFFFF
     return True
+
+
+# ============================================================================
+# FENCE and System Instructions
+# ============================================================================
+
+def exec_fence(cpu, memory, decoded):
+    """
+    FENCE - Memory ordering fence
+    
+    FENCE is a no-op in single-core without DMA or reordering.
+    """
+    cpu.pc += 4
+    return True
+
+
+def exec_system(cpu, memory, decoded):
+    """
+    Execute system instructions (ECALL, EBREAK, WFI)
+    
+    ECALL (imm=0x000):
+        Returns STATUS_ECALL; the caller services the syscall and advances PC.
+    
+    EBREAK (imm=0x001):
+        Returns STATUS_EBREAK; used for normal program termination.
+    
+    WFI (imm=0x105):
+        Returns STATUS_WFI; the caller completes it (advances PC) once
+        console input is available, idling the host until then.
+    
+    None of them changes any state. execute_instruction() turns the status into
+    ECallException/EBreakException for callers of the public API.
+    """
+    if decoded.name == 'EBREAK':
+        return STATUS_EBREAK
+    if decoded.name == 'WFI':
+        return STATUS_WFI
+    return STATUS_ECALL
+
+
+def exec_mret(cpu, memory, decoded):
+    """
+    MRET - Return from machine-mode trap
+    
+    Restores mstatus.MIE from MPIE and jumps to mepc (RV32CPU.trap_return).
+    Returns STATUS_INTERRUPTS, as interrupts may be enabled again.
+    """
+    cpu.trap_return()
+    return STATUS_INTERRUPTS
+
+
+def exec_csr(cpu, memory, decoded):
+    """
+    Execute Zicsr instructions (CSRRW, CSRRS, CSRRC, CSRRWI, CSRRSI, CSRRCI)
+    
+    Format: I-type, csr = imm[11:0], funct3 selects the operation
+    Syntax: csrrw rd, csr, rs1 / csrrwi rd, csr, uimm
+    
+    Operation:
+        t = CSR[csr]; rd = t
+        CSRRW:  CSR[csr] = src
+        CSRRS:  CSR[csr] = t | src   (no write if the rs1 field is 0)
+        CSRRC:  CSR[csr] = t & ~src  (no write if the rs1 field is 0)
+    
+    src is x[rs1], or for the *I forms the 5-bit zero-extended rs1 field.
+    CSRs live in cpu.csrs, except the read-only counters (rdcycle, rdtime,
+    rdinstret), which cpu.counters computes; unimplemented CSRs read 0
+    and ignore writes.
+    The CLINT bits of mip are read from the device. Writes to mstatus, mie
+    and mip return STATUS_INTERRUPTS.
+    """
+    csr = decoded.imm & 0xFFF
+    funct3 = decoded.funct3
+    source = decoded.rs1 if funct3 & 0b100 else cpu.regs[decoded.rs1]
+    if csr == CSR_MIP and memory.clint is not None:
+        cpu.csrs[CSR_MIP] = (cpu.csrs[CSR_MIP] & ~(MIP_MSIP | MIP_MTIP)) | memory.clint.pending()
+    old = cpu.read_csr(csr)
+    operation = funct3 & 0b011
+    written = operation == 0b01 or decoded.rs1 != 0
+    if operation == 0b01:
+        cpu.write_csr(csr, source)
+    elif written:
+        cpu.write_csr(csr, old | source if operation == 0b10 else old & ~source)
+    cpu.regs[decoded.dest] = old
+    cpu.pc += 4
+    if written and csr in INTERRUPT_CSRS:
+        return STATUS_INTERRUPTS
+    return True
+
+
+# ============================================================================
+# Specialized Handlers and Dispatch Table
+# ============================================================================
+#
+# One small handler per instruction, selected through DISPATCH_TABLE by
+# (opcode, funct3, funct7) so no handler branches on funct fields at run
+# time. They index cpu.regs directly: register values are always stored
+# masked to 32 bits, so only results that can overflow are masked, and
+# results go to regs[d.dest], which is the X0_SINK slot for rd=x0.
+
+def _exec_add(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = (regs[d.rs1] + regs[d.rs2]) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_sub(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = (regs[d.rs1] - regs[d.rs2]) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_sll(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = (regs[d.rs1] << (regs[d.rs2] & 0x1F)) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_slt(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = 1 if (regs[d.rs1] ^ 0x80000000) < (regs[d.rs2] ^ 0x80000000) else 0
+    cpu.pc += 4
+    return True
+
+
+def _exec_sltu(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = 1 if regs[d.rs1] < regs[d.rs2] else 0
+    cpu.pc += 4
+    return True
+
+
+def _exec_xor(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] ^ regs[d.rs2]
+    cpu.pc += 4
+    return True
+
+
+def _exec_srl(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] >> (regs[d.rs2] & 0x1F)
+    cpu.pc += 4
+    return True
+
+
+def _exec_sra(cpu, memory, d):
+    regs = cpu.regs
+    value = regs[d.rs1]
+    regs[d.dest] = ((value - ((value & 0x80000000) << 1)) >> (regs[d.rs2] & 0x1F)) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_or(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] | regs[d.rs2]
+    cpu.pc += 4
+    return True
+
+
+def _exec_and(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] & regs[d.rs2]
+    cpu.pc += 4
+    return True
+
+
+def _m_handler(helper, signed1, signed2):
+    """Build the handler for an M-extension instruction around its exec_* helper."""
+    def handler(cpu, memory, d):
+        regs = cpu.regs
+        a = regs[d.rs1]
+        b = regs[d.rs2]
+        if signed1:
+            a -= (a & 0x80000000) << 1
+        if signed2:
+            b -= (b & 0x80000000) << 1
+        regs[d.dest] = helper(a, b)
+        cpu.pc += 4
+        return True
+    handler.__name__ = f"_exec_{helper.__name__[5:]}"
+    return handler
+
+
+def _exec_addi(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = (regs[d.rs1] + d.imm) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_slti(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = 1 if (regs[d.rs1] ^ 0x80000000) < (d.imm ^ 0x80000000) else 0
+    cpu.pc += 4
+    return True
+
+
+def _exec_sltiu(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = 1 if regs[d.rs1] < d.imm else 0
+    cpu.pc += 4
+    return True
+
+
+def _exec_xori(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] ^ d.imm
+    cpu.pc += 4
+    return True
+
+
+def _exec_ori(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] | d.imm
+    cpu.pc += 4
+    return True
+
+
+def _exec_andi(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] & d.imm
+    cpu.pc += 4
+    return True
+
+
+def _exec_slli(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = (regs[d.rs1] << (d.imm & 0x1F)) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_srli(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = regs[d.rs1] >> (d.imm & 0x1F)
+    cpu.pc += 4
+    return True
+
+
+def _exec_srai(cpu, memory, d):
+    regs = cpu.regs
+    value = regs[d.rs1]
+    regs[d.dest] = ((value - ((value & 0x80000000) << 1)) >> (d.imm & 0x1F)) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_lb(cpu, memory, d):
+    regs = cpu.regs
+    value = memory.read_byte((regs[d.rs1] + d.imm) & 0xFFFFFFFF)
+    regs[d.dest] = (value - ((value & 0x80) << 1)) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_lh(cpu, memory, d):
+    regs = cpu.regs
+    value = memory.read_halfword((regs[d.rs1] + d.imm) & 0xFFFFFFFF)
+    regs[d.dest] = (value - ((value & 0x8000) << 1)) & 0xFFFFFFFF
+    cpu.pc += 4
+    return True
+
+
+def _exec_lw(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = memory.read_word((regs[d.rs1] + d.imm) & 0xFFFFFFFF)
+    cpu.pc += 4
+    return True
+
+
+def _exec_lbu(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = memory.read_byte((regs[d.rs1] + d.imm) & 0xFFFFFFFF)
+    cpu.pc += 4
+    return True
+
+
+def _exec_lhu(cpu, memory, d):
+    regs = cpu.regs
+    regs[d.dest] = memory.read_halfword((regs[d.rs1] + d.imm) & 0xFFFFFFFF)
+    cpu.pc += 4
+    return True
+
+
+def _exec_sb(cpu, memory, d):
+    regs = cpu.regs
+    memory.write_byte((regs[d.rs1] + d.imm) & 0xFFFFFFFF, regs[d.rs2] & 0xFF)
+    cpu.pc += 4
+    return True
+
+
+def _exec_sh(cpu, memory, d):
+    regs = cpu.regs
+    memory.write_halfword((regs[d.rs1] + d.imm) & 0xFFFFFFFF, regs[d.rs2] & 0xFFFF)
+    cpu.pc += 4
+    return True
+
+
+def _exec_sw(cpu, memory, d):
+    regs = cpu.regs
+    memory.write_word((regs[d.rs1] + d.imm) & 0xFFFFFFFF, regs[d.rs2])
+    cpu.pc += 4
+    return True
+
+
+def _exec_beq(cpu, memory, d):
+    regs = cpu.regs
+    if regs[d.rs1] == regs[d.rs2]:
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc += 4
+    return True
+
+
+def _exec_bne(cpu, memory, d):
+    regs = cpu.regs
+    if regs[d.rs1] != regs[d.rs2]:
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc += 4
+    return True
+
+
+def _exec_blt(cpu, memory, d):
+    regs = cpu.regs
+    if (regs[d.rs1] ^ 0x80000000) < (regs[d.rs2] ^ 0x80000000):
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc += 4
+    return True
+
+
+def _exec_bge(cpu, memory, d):
+    regs = cpu.regs
+    if (regs[d.rs1] ^ 0x80000000) >= (regs[d.rs2] ^ 0x80000000):
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc += 4
+    return True
+
+
+def _exec_bltu(cpu, memory, d):
+    regs = cpu.regs
+    if regs[d.rs1] < regs[d.rs2]:
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc += 4
+    return True
+
+
+def _exec_bgeu(cpu, memory, d):
+    regs = cpu.regs
+    if regs[d.rs1] >= regs[d.rs2]:
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc += 4
+    return True
+
+
+# Instruction name -> specialized handler
+HANDLERS_BY_NAME = {
+    'ADD': _exec_add, 'SUB': _exec_sub, 'SLL': _exec_sll, 'SLT': _exec_slt,
+    'SLTU': _exec_sltu, 'XOR': _exec_xor, 'SRL': _exec_srl, 'SRA': _exec_sra,
+    'OR': _exec_or, 'AND': _exec_and,
+    'MUL': _m_handler(exec_mul, True, True),
+    'MULH': _m_handler(exec_mulh, True, True),
+    'MULHSU': _m_handler(exec_mulhsu, True, False),
+    'MULHU': _m_handler(exec_mulhu, False, False),
+    'DIV': _m_handler(exec_div, True, True),
+    'DIVU': _m_handler(exec_divu, False, False),
+    'REM': _m_handler(exec_rem, True, True),
+    'REMU': _m_handler(exec_remu, False, False),
+    'ADDI': _exec_addi, 'SLTI': _exec_slti, 'SLTIU': _exec_sltiu, 'XORI': _exec_xori,
+    'ORI': _exec_ori, 'ANDI': _exec_andi, 'SLLI': _exec_slli, 'SRLI': _exec_srli,
+    'SRAI': _exec_srai,
+    'LB': _exec_lb, 'LH': _exec_lh, 'LW': _exec_lw, 'LBU': _exec_lbu, 'LHU': _exec_lhu,
+    'SB': _exec_sb, 'SH': _exec_sh, 'SW': _exec_sw,
+    'BEQ': _exec_beq, 'BNE': _exec_bne, 'BLT': _exec_blt, 'BGE': _exec_bge,
+    'BLTU': _exec_bltu, 'BGEU': _exec_bgeu,
+    'JALR': exec_jalr, 'JAL': exec_jal, 'LUI': exec_lui, 'AUIPC': exec_auipc,
+    'FENCE': exec_fence,
+    'CSRRW': exec_csr, 'CSRRS': exec_csr, 'CSRRC': exec_csr,
+    'CSRRWI': exec_csr, 'CSRRSI': exec_csr, 'CSRRCI': exec_csr,
+}
+
+# (opcode, funct3, funct7) key (see decoder.dispatch_key) -> handler.
+# ECALL and EBREAK share a key; exec_system tells them apart. WFI's key
+# (imm=0x105) is shared with SRET, which does not decode.
+DISPATCH_TABLE = {key: HANDLERS_BY_NAME[name] for key, name in INSTRUCTION_NAMES.items()}
+DISPATCH_TABLE[dispatch_key(0b1110011, 0b000, 0)] = exec_system
+DISPATCH_TABLE[dispatch_key(0b1110011, 0b000, 0x105 >> 5)] = exec_system
+DISPATCH_TABLE[dispatch_key(0b1110011, 0b000, 0x302 >> 5)] = exec_mret
@@ -115,6 +115,17 @@ struct passwd {
 #define STDOUT_FILENO 1
 #define STDERR_FILENO 2
 
+/*
+ * Idle while stdin has no data. Built with -DPYRV32_STDIN_WFI (make
+ * STDIN_WFI=1), the wait executes WFI: the simulator then sleeps until
+ * console input arrives instead of spinning on the RX status register.
+ */
+#ifdef PYRV32_STDIN_WFI
+#define WAIT_FOR_RX() __asm__ volatile ("wfi")
+#else
+#define WAIT_FOR_RX() do { } while (0)
+#endif
+
 /* Buffered I/O implementations for stdin/stdout/stderr */
 
 /* Read from stdin (Console UART RX) - Non-blocking after first byte */
@@ -130,7 +141,7 @@ static ssize_t stdin_read(int fd, void *buf, size_t count) {
     
     /* Block waiting for first byte (ensures we don't return 0 immediately) */
     while ((*CONSOLE_UART_RX_STATUS & 0x01) == 0) {
-        /* Wait for first byte */
+        WAIT_FOR_RX();
     }
     ch = *CONSOLE_UART_RX;
     if (ch == '\r') {
@@ -0,0 +1,98 @@
+/*
+ * Test program for CLINT timer interrupts
+ *
+ * Sleeps with WFI until mtimecmp instead of polling the timer MMIO:
+ * the simulator idles (or, with a virtual clock, skips straight to the
+ * deadline) and a machine timer interrupt ends each sleep.
+ */
+
+#define UART_TX           ((volatile char *)0x10000000)
+#define CLINT_MTIMECMP_LO ((volatile unsigned int *)0x02004000)
+#define CLINT_MTIMECMP_HI ((volatile unsigned int *)0x02004004)
+#define CLINT_MTIME_LO    ((volatile unsigned int *)0x0200BFF8)
+#define CLINT_MTIME_HI    ((volatile unsigned int *)0x0200BFFC)
+
+#define MTIME_HZ   10000000u   /* mtime ticks per second */
+#define MIE_MTIE   (1u << 7)   /* mie: machine timer interrupt enable */
+#define MSTATUS_MIE 8          /* mstatus: machine interrupts enabled */
+
+static volatile unsigned int timer_interrupts;
+
+void uart_print(const char *s) {
+    while (*s) {
+        *UART_TX = *s++;
+    }
+}
+
+void uart_print_int(unsigned int val) {
+    char buf[12];
+    int i = 0;
+
+    if (val == 0) {
+        buf[i++] = '0';
+    } else {
+        while (val > 0) {
+            buf[i++] = '0' + (val % 10);
+            val /= 10;
+        }
+    }
+    while (i > 0) {
+        *UART_TX = buf[--i];
+    }
+}
+
+/* 64-bit mtime read (retry if the low word wrapped between the halves) */
+static unsigned long long read_mtime(void) {
+    unsigned int hi, lo;
+    do {
+        hi = *CLINT_MTIME_HI;
+        lo = *CLINT_MTIME_LO;
+    } while (hi != *CLINT_MTIME_HI);
+    return ((unsigned long long)hi << 32) | lo;
+}
+
+/* Set mtimecmp without passing through a smaller value on the way */
+static void set_mtimecmp(unsigned long long when) {
+    *CLINT_MTIMECMP_HI = 0xFFFFFFFF;
+    *CLINT_MTIMECMP_LO = (unsigned int)when;
+    *CLINT_MTIMECMP_HI = (unsigned int)(when >> 32);
+}
+
+/* Only the timer interrupt is enabled: count it and disarm the timer */
+__attribute__((interrupt("machine"), aligned(4)))
+static void trap_handler(void) {
+    *CLINT_MTIMECMP_HI = 0xFFFFFFFF;
+    timer_interrupts++;
+}
+
+static void sleep_ms(unsigned int ms) {
+    unsigned int seen = timer_interrupts;
+    set_mtimecmp(read_mtime() + (unsigned long long)ms * (MTIME_HZ / 1000));
+    while (timer_interrupts == seen) {
+        __asm__ volatile ("wfi");
+    }
+}
+
+int main(void) {
+    uart_print("=== CLINT Timer Interrupt Test ===\n\n");
+
+    __asm__ volatile ("csrw mtvec, %0" :: "r"(trap_handler));
+    __asm__ volatile ("csrs mie, %0" :: "r"(MIE_MTIE));
+    __asm__ volatile ("csrsi mstatus, %0" :: "i"(MSTATUS_MIE));
+
+    for (int i = 1; i <= 5; i++) {
+        unsigned long long start = read_mtime();
+        sleep_ms(100);
+        unsigned int slept = (unsigned int)((read_mtime() - start) / (MTIME_HZ / 1000));
+        uart_print("  Sleep ");
+        uart_print_int(i);
+        uart_print(": ");
+        uart_print_int(slept);
+        uart_print(" ms\n");
+    }
+
+    uart_print("\nTimer interrupts: ");
+    uart_print_int(timer_interrupts);
+    uart_print(timer_interrupts == 5 ? "\n✓ PASS\n" : "\n✗ FAIL\n");
+    return 0;
+}
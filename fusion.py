@@ -0,0 +1,94 @@
+"""
+Fusion - Macro-op fusion of common RV32IM instruction pairs
+
+GCC output is full of instruction pairs that only make sense together:
+
+    lui   a5, %hi(sym)         auipc ra, %pcrel_hi(f)     slt  a5, a0, a1
+    addi  a5, a5, %lo(sym)     jalr  ra, %pcrel_lo(f)(ra) bnez a5, target
+
+The block engine translates each recognized pair as one operation:
+
+    lui+addi     a constant build: both results are known at translation
+                 time, so the pair becomes one or two constant stores
+    auipc+jalr   a far call/jump: the target is a constant, so the block
+                 gets a static successor link like a JAL
+    slt+branch   a compare feeding a branch: the comparison is evaluated
+                 once for both the result register and the branch
+
+A fused pair writes every register the two instructions would write, so
+the architectural state after the pair is exact. Pairs are only fused
+inside one translated block: code that jumps to the second instruction
+enters a different block, and while a breakpoint (e.g. on the second
+instruction) is armed blocks are not used at all.
+"""
+
+MASK32 = 0xFFFFFFFF
+
+LUI_ADDI = 'lui+addi'
+AUIPC_JALR = 'auipc+jalr'
+SLT_BRANCH = 'slt+branch'
+
+IDIOMS = (LUI_ADDI, AUIPC_JALR, SLT_BRANCH)
+
+SET_LESS_THAN = ('SLT', 'SLTU', 'SLTI', 'SLTIU')
+
+
+def match_pair(first, second):
+    """
+    Return the idiom fusing two consecutive instructions, or None.
+
+    Args:
+        first: DecodedInsn of the first instruction
+        second: DecodedInsn of the instruction after it
+
+    Returns:
+        One of IDIOMS, or None
+    """
+    rd = first.rd
+    if rd == 0:
+        return None
+    name = first.name
+    if name == 'LUI':
+        if second.name == 'ADDI' and second.rs1 == rd:
+            return LUI_ADDI
+    elif name == 'AUIPC':
+        if second.name == 'JALR' and second.rs1 == rd:
+            return AUIPC_JALR
+    elif name in SET_LESS_THAN:
+        if second.name in ('BEQ', 'BNE') and {second.rs1, second.rs2} == {rd, 0}:
+            return SLT_BRANCH
+    return None
+
+
+def find_fusions(insns):
+    """
+    Find the fusible pairs in a block, scanning greedily from the start.
+
+    Args:
+        insns: Sequence of (pc, decoded) pairs in program order
+
+    Returns:
+        Dict mapping the index of each pair's first instruction to its idiom
+    """
+    fusions = {}
+    index = 0
+    while index + 1 < len(insns):
+        idiom = match_pair(insns[index][1], insns[index + 1][1])
+        if idiom is None:
+            index += 1
+        else:
+            fusions[index] = idiom
+            index += 2
+    return fusions
+
+
+def lui_addi_values(lui, addi):
+    """Return (lui result, addi result) of a lui+addi pair."""
+    high = lui.imm & MASK32
+    return high, (high + addi.imm) & MASK32
+
+
+def auipc_jalr_values(auipc_pc, auipc, jalr):
+    """Return (auipc result, jump target, link value) of an auipc+jalr pair."""
+    base = (auipc_pc + auipc.imm) & MASK32
+    return base, (base + jalr.imm) & 0xFFFFFFFE, (auipc_pc + 8) & MASK32
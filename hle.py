@@ -0,0 +1,217 @@
+"""
+HLE - High-level emulation of hot libc routines
+
+The picolibc string and memory routines run a handful of instructions per
+byte, and programs like NetHack spend much of their time in them. With HLE
+enabled, calls to these routines (found by ELF symbol) are done in Python
+with bulk memory operations instead:
+
+    memcpy(dst, src, n)     memset(dst, c, n)     strlen(s)
+    strcmp(s1, s2)          strncpy(dst, src, n)
+
+The entry instruction of each routine gets a predecode override
+(PredecodeCache.override), so every engine reaches it through the
+reference interpreter: the override performs the whole call, sets a0 to
+the return value and returns to ra. A call counts as one instruction.
+
+The memory effects and return value are the routine's; caller-saved
+registers other than a0 keep their values instead of the routine's
+scratch values, which the calling convention leaves undefined anyway.
+strcmp returns the difference of the first mismatching bytes (unsigned),
+like the C implementation; callers may only rely on its sign. A call
+whose buffer leaves RAM raises the MemoryAccessFault the real routine
+would hit, without writing anything.
+
+Verification mode runs the real routine through the interpreter on every
+call and checks that the emulation predicts the same return value and
+memory contents, recording any mismatch. Execution continues with the
+real routine's results.
+"""
+
+from execute import select_handler
+from exceptions import MemoryAccessFault
+
+
+HLE_FUNCTIONS = ('memcpy', 'memset', 'strlen', 'strcmp', 'strncpy')
+
+# Instruction limit for one verified call of the real routine
+VERIFY_MAX_STEPS = 10_000_000
+
+MASK32 = 0xFFFFFFFF
+
+
+def _check_ram(memory, address, n, access_type):
+    """
+    Fault like the real routine if address..address+n-1 leaves RAM.
+
+    Checked before any buffer is built, so a garbage length cannot
+    allocate more than RAM holds.
+
+    Raises:
+        MemoryAccessFault: At the first byte outside RAM
+    """
+    if not n:
+        return
+    if not memory.RAM_BASE <= address <= memory.RAM_END:
+        raise MemoryAccessFault(address, access_type, memory.current_pc)
+    if address + n - 1 > memory.RAM_END:
+        raise MemoryAccessFault(memory.RAM_END + 1, access_type, memory.current_pc)
+
+
+def _memcpy(memory, dst, src, n):
+    _check_ram(memory, src, n, 'load')
+    _check_ram(memory, dst, n, 'store')
+    return dst, [(dst, memory.read_bytes(src, n))]
+
+
+def _memset(memory, dst, c, n):
+    _check_ram(memory, dst, n, 'store')
+    return dst, [(dst, bytes((c & 0xFF,)) * n)]
+
+
+def _strlen(memory, s, _a1, _a2):
+    return len(memory.read_cstring(s)), []
+
+
+def _strcmp(memory, s1, s2, _a2):
+    first = memory.read_cstring(s1) + b'\0'
+    second = memory.read_cstring(s2, len(first) - 1) + b'\0'
+    for a, b in zip(first, second):
+        if a != b:
+            return (a - b) & MASK32, []
+    return 0, []
+
+
+def _strncpy(memory, dst, src, n):
+    _check_ram(memory, dst, n, 'store')
+    data = memory.read_cstring(src, n)
+    return dst, [(dst, data + bytes(n - len(data)))]
+
+
+# name -> plan(memory, a0, a1, a2) returning (a0 result, [(address, bytes)])
+PLANS = {
+    'memcpy': _memcpy,
+    'memset': _memset,
+    'strlen': _strlen,
+    'strcmp': _strcmp,
+    'strncpy': _strncpy,
+}
+
+
+class LibcHLE:
+    """Intercepts libc routine entry points through the predecode cache."""
+
+    def __init__(self, predecode, verify=False):
+        """
+        Args:
+            predecode: PredecodeCache the overrides are installed in
+            verify: Cross-check every call against the real routine
+        """
+        self.predecode = predecode
+        self.memory = predecode.memory
+        self.verify = verify
+        self.installed = {}   # name -> entry address
+        self.calls = {name: 0 for name in HLE_FUNCTIONS}
+        self.mismatches = []  # (name, args, problems) found in verify mode
+
+    def install(self, symbols, functions=None):
+        """
+        Intercept routines at their symbol addresses.
+
+        Args:
+            symbols: Dict mapping symbol name to address (ELF symbol table)
+            functions: Names to intercept (None = all of HLE_FUNCTIONS)
+
+        Returns:
+            Dict mapping each intercepted name to its entry address
+            (routines missing from symbols are skipped)
+
+        Raises:
+            ValueError: For a name not in HLE_FUNCTIONS
+        """
+        names = HLE_FUNCTIONS if functions is None else tuple(functions)
+        for name in names:
+            if name not in PLANS:
+                raise ValueError(f"No HLE for '{name}' (expected one of {', '.join(HLE_FUNCTIONS)})")
+        for name in names:
+            address = symbols.get(name)
+            if address is None or address & 3:
+                continue
+            self.uninstall([name])
+            self.predecode.override(address, self._handler(name))
+            self.installed[name] = address
+        return dict(self.installed)
+
+    def uninstall(self, functions=None):
+        """Remove the interception of functions (None = all installed)."""
+        names = list(self.installed) if functions is None else functions
+        for name in names:
+            address = self.installed.pop(name, None)
+            if address is not None:
+                self.predecode.override(address, None)
+
+    def _handler(self, name):
+        """Build the override handler for one routine."""
+        plan = PLANS[name]
+        calls = self.calls
+
+        def handler(cpu, memory, decoded):
+            regs = cpu.regs
+            if self.verify:
+                self._verify_call(name, plan, cpu, memory, decoded)
+            else:
+                result, writes = plan(memory, regs[10], regs[11], regs[12])
+                for address, data in writes:
+                    memory.write_bytes(address, data)
+                regs[10] = result
+                cpu.pc = regs[1] & 0xFFFFFFFE
+            calls[name] += 1
+            return True
+        handler.__name__ = f"_hle_{name}"
+        return handler
+
+    def _verify_call(self, name, plan, cpu, memory, decoded):
+        """Run the real routine (decoded: its entry instruction) and compare."""
+        regs = cpu.regs
+        args = (regs[10], regs[11], regs[12])
+        result, writes = plan(memory, *args)
+        ra, sp = regs[1] & 0xFFFFFFFE, regs[2]
+
+        handler = select_handler(decoded)
+        lookup = self.predecode.lookup
+        for _ in range(VERIFY_MAX_STEPS):
+            memory.current_pc = cpu.pc
+            if handler(cpu, memory, decoded) is not True:
+                raise RuntimeError(f"HLE verify: {name} executed a system instruction at 0x{cpu.pc:08x}")
+            if cpu.pc == ra and regs[2] == sp:
+                break
+            _, handler, decoded = lookup(cpu.pc)
+        else:
+            raise RuntimeError(f"HLE verify: {name} did not return within {VERIFY_MAX_STEPS} instructions")
+
+        problems = []
+        actual = regs[10]
+        if name == 'strcmp':
+            # Only the sign is specified
+            signs = [(value > 0) - (value < 0) for value in
+                     (actual - ((actual & 0x80000000) << 1), result - ((result & 0x80000000) << 1))]
+            if signs[0] != signs[1]:
+                problems.append(f"a0=0x{actual:08x}, emulated 0x{result:08x}")
+        elif actual != result:
+            problems.append(f"a0=0x{actual:08x}, emulated 0x{result:08x}")
+        for address, data in writes:
+            real = memory.read_bytes(address, len(data))
+            if real != data:
+                offset = next(i for i, (a, b) in enumerate(zip(real, data)) if a != b)
+                problems.append(f"memory at 0x{(address + offset) & MASK32:08x} differs")
+        if problems:
+            self.mismatches.append((name, args, problems))
+
+    def stats(self):
+        """Dict with installed entry points, per-routine call counts and mismatches."""
+        return {
+            'installed': dict(self.installed),
+            'calls': dict(self.calls),
+            'verify': self.verify,
+            'mismatches': list(self.mismatches),
+        }
@@ -0,0 +1,594 @@
+"""
+Lockstep - Differential validation of fast engines against the reference
+
+Every fast path (the predecoded run loop, the block engine and its tiers,
+fusion) must behave exactly like execute.execute_instruction. Lockstep
+runs a system on its own engine and a shadow CPU/memory pair on the
+reference interpreter side by side:
+
+    system (engine under test)     run(interval) -> n instructions
+    reference (execute_instruction)               n instructions
+    compare                        pc, x1-x31, every byte either side wrote
+
+and stops at the first checkpoint where they disagree. With interval=1
+(instructions) the checkpoint is the differing instruction itself; with
+unit='blocks' the system runs one translated block per step, so a bad
+translation shows up at the block that produced it.
+
+Only the system talks to the outside world. Its MMIO loads and stores are
+logged and the reference replays them in order (reading the same timer
+and UART values, checking it stores the same bytes), and each syscall the
+system services is recorded with its register and memory effects and
+applied to the reference at its ECALL instead of being executed twice.
+Counter CSR reads
+(rdcycle, rdtime, rdinstret) are logged and replayed like MMIO loads.
+Interrupts the system takes are replayed the same way: the reference
+enters the trap after the same number of instructions.
+Calls intercepted by HLE (hle.py) are recorded the same way and the
+reference applies their register and memory effects when it reaches the
+routine's entry, as one instruction, instead of running the real routine.
+Idle poll-loop elision is off while lockstep runs.
+"""
+
+from collections import deque
+
+from cpu import RV32CPU, CSR_MIP
+from memory import Memory
+from decoder import decode_instruction, get_instruction_name
+from execute import execute_instruction
+from exceptions import (ECallException, EBreakException, MemoryAccessFault,
+                        LockstepDivergence)
+
+
+MASK32 = 0xFFFFFFFF
+RAM_BASE = Memory.RAM_BASE
+RAM_END = Memory.RAM_END
+
+UNITS = ('instructions', 'blocks')
+
+# Reference instructions kept for divergence reports
+TRACE_LENGTH = 32
+
+# Differing memory bytes listed in a divergence report
+MAX_REPORTED_BYTES = 8
+
+OPCODE_STORE = 0b0100011
+OPCODE_BRANCH = 0b1100011
+OPCODE_JAL = 0b1101111
+OPCODE_JALR = 0b1100111
+
+
+class _Mismatch(Exception):
+    """The reference side did something the system did not (or vice versa)."""
+
+
+class Divergence:
+    """First disagreement between the system and the reference."""
+
+    def __init__(self, start, count, differences, first, trace):
+        # Instruction counts (since lockstep started) of the last matching
+        # checkpoint and of the checkpoint that disagreed
+        self.start = start
+        self.count = count
+        self.differences = differences  # List of (location, reference, system) strings
+        # (count, pc, insn) of the first differing instruction: exact with
+        # interval=1, otherwise the earliest traced instruction of the
+        # interval that writes a differing location
+        self.first = first
+        self.trace = trace              # Recent reference (count, pc, insn), oldest first
+
+    def report(self):
+        """Multi-line description: differences, first differing instruction, trace."""
+        lines = [f"Divergence between instructions {self.start} and {self.count}:"]
+        for location, reference, system in self.differences:
+            lines.append(f"  {location}: reference {reference}, system {system}")
+        if self.first is not None:
+            lines.append(f"First differing instruction: {_describe(*self.first)}")
+        if self.trace:
+            lines.append("Recent reference trace:")
+            lines += [f"  {_describe(*entry)}" for entry in self.trace]
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"Divergence({len(self.differences)} differences at instruction {self.count})"
+
+
+def _describe(count, pc, insn):
+    """One trace line: '#count 0xpc: word NAME'."""
+    try:
+        name = get_instruction_name(decode_instruction(insn))
+    except Exception:
+        name = '???'
+    return f"#{count} 0x{pc:08x}: {insn:08x} {name}"
+
+
+class ReferenceMemory(Memory):
+    """
+    RAM copy for the reference side; MMIO is replayed from the system's log.
+
+    Memory.__init__ is not called: the reference has no devices of its own.
+    """
+
+    def __init__(self, ram, mmio):
+        """
+        Args:
+            ram: Initial RAM contents (address -> byte), copied
+            mmio: Deque of ('load'|'store'|'csr', address, value) the system performed
+        """
+        self.mem = dict(ram)
+        self.mmio = mmio
+        self.dirty = set()  # RAM addresses written since the last checkpoint
+        self.pending_watchpoints = []
+        self.read_watchpoints = set()
+        self.write_watchpoints = set()
+        self.timer_start = 0
+        self.clock = None
+        self.clint = None  # mip reads see the value replayed with each trap
+        self._clock_latch = None
+        self.current_pc = 0
+        self.predecode_cache = None
+        self.code_pages = set()
+
+    def _replay(self, kind, address, value=None):
+        """Consume the next logged MMIO access, which must match this one."""
+        if not self.mmio:
+            raise _Mismatch(f"reference {kind} at 0x{address:08x} (PC=0x{self.current_pc:08x}) "
+                            f"that the system did not perform")
+        logged = self.mmio.popleft()
+        if logged[:2] != (kind, address) or (value is not None and logged[2] != value):
+            raise _Mismatch(f"reference {kind} 0x{address:08x}"
+                            f"{'' if value is None else f' = 0x{value:02x}'} "
+                            f"(PC=0x{self.current_pc:08x}), system {logged[0]} "
+                            f"0x{logged[1]:08x} = 0x{logged[2]:02x}")
+        return logged[2]
+
+    def read_byte(self, address):
+        address &= MASK32
+        if RAM_BASE <= address <= RAM_END:
+            return self.mem.get(address, 0)
+        if not self.is_valid_address(address):
+            raise MemoryAccessFault(address, 'load', self.current_pc)
+        return self._replay('load', address)
+
+    def write_byte(self, address, value):
+        address &= MASK32
+        value &= 0xFF
+        if RAM_BASE <= address <= RAM_END:
+            self.mem[address] = value
+            self.dirty.add(address)
+            return
+        if not self.is_valid_address(address):
+            raise MemoryAccessFault(address, 'store', self.current_pc)
+        self._replay('store', address, value)
+
+    # Stores go byte by byte (not through Memory's RAM fast path) so every
+    # written address lands in dirty
+
+    def write_halfword(self, address, value):
+        self.write_byte(address, value)
+        self.write_byte(address + 1, value >> 8)
+
+    def write_word(self, address, value):
+        for i in range(4):
+            self.write_byte(address + i, value >> (8 * i))
+
+    def write_bytes(self, address, data):
+        for i, byte in enumerate(data):
+            self.write_byte(address + i, byte)
+
+
+class ReplayedCounters:
+    """Counter CSRs of the reference side, read from the system's MMIO log."""
+
+    def __init__(self, memory):
+        """
+        Args:
+            memory: ReferenceMemory replaying the log
+        """
+        self.memory = memory
+
+    def read(self, csr):
+        return self.memory._replay('csr', csr)
+
+
+class Lockstep:
+    """Runs a system and a reference CPU/memory pair side by side."""
+
+    def __init__(self, system, trace_length=TRACE_LENGTH):
+        """
+        Start from the system's current state.
+
+        Args:
+            system: RV32System under test (its engine is what is validated)
+            trace_length: Reference instructions kept for reports
+        """
+        self.system = system
+        self.mmio = deque()      # MMIO accesses and counter reads, replayed by the reference
+        self.syscalls = deque()  # (regs, writes, continued) per ECALL the system serviced
+        self.intercepts = deque()  # (regs, pc, writes) per HLE call, None if it faulted
+        self.intercepted = set()   # Entry PCs of the HLE-intercepted routines
+        self.traps = deque()     # (reference count, cause, mip) per interrupt the system took
+        self.dirty = set()       # RAM addresses the system wrote since the last checkpoint
+        self._host_writes = None
+        self._overrides = {}
+
+        self.cpu = RV32CPU()
+        self.cpu.regs[:32] = system.cpu.regs[:32]
+        self.cpu.pc = system.cpu.pc
+        self.cpu.csrs.update(system.cpu.csrs)
+        self.base = system.retired_instructions()
+        self.memory = ReferenceMemory(system.memory.mem, self.mmio)
+        self.cpu.counters = ReplayedCounters(self.memory)
+        self.count = 0  # Instructions the reference executed
+        self.trace = deque(maxlen=trace_length)
+        self.divergence = None
+
+    # ------------------------------------------------------------------
+    # System-side probes
+    # ------------------------------------------------------------------
+
+    def _attach(self):
+        """Route the system's memory writes, MMIO and syscalls through the probes."""
+        system = self.system
+        memory = system.memory
+        read_byte = memory.read_byte
+        write_byte = memory.write_byte
+        write_halfword = memory.write_halfword
+        write_word = memory.write_word
+        write_bytes = memory.write_bytes
+        service = system.syscall_handler.service
+        enter_trap = system.cpu.enter_trap
+        counters = system.cpu.counters
+        mmio = self.mmio
+        dirty = self.dirty
+
+        def probe_read_byte(address):
+            value = read_byte(address)
+            address &= MASK32
+            if not RAM_BASE <= address <= RAM_END:
+                mmio.append(('load', address, value))
+            return value
+
+        def probe_write_byte(address, value):
+            write_byte(address, value)
+            address &= MASK32
+            if RAM_BASE <= address <= RAM_END:
+                dirty.add(address)
+                if self._host_writes is not None:
+                    self._host_writes.add(address)
+            else:
+                mmio.append(('store', address, value & 0xFF))
+
+        def stored(address, size):
+            # RAM stores of the multi-byte fast paths, which skip write_byte
+            address &= MASK32
+            if RAM_BASE <= address and address + size - 1 <= RAM_END:
+                written = range(address, address + size)
+                dirty.update(written)
+                if self._host_writes is not None:
+                    self._host_writes.update(written)
+
+        def probe_write_halfword(address, value):
+            write_halfword(address, value)
+            stored(address, 2)
+
+        def probe_write_word(address, value):
+            write_word(address, value)
+            stored(address, 4)
+
+        def probe_write_bytes(address, data):
+            write_bytes(address, data)
+            stored(address, len(data))
+
+        def probe_service(cpu, mem):
+            self._host_writes = set()
+            try:
+                continued = service(cpu, mem)
+            finally:
+                writes, self._host_writes = self._host_writes, None
+            values = memory.mem
+            self.syscalls.append((cpu.regs[:32], {a: values.get(a, 0) for a in writes}, continued))
+            return continued
+
+        def probe_override(handler):
+            def probe(cpu, mem, decoded):
+                self._host_writes = set()
+                try:
+                    status = handler(cpu, mem, decoded)
+                except MemoryAccessFault:
+                    self.intercepts.append(None)
+                    raise
+                finally:
+                    writes, self._host_writes = self._host_writes, None
+                values = memory.mem
+                self.intercepts.append((cpu.regs[:32], cpu.pc, {a: values.get(a, 0) for a in writes}))
+                return status
+            return probe
+
+        def probe_read_counter(csr):
+            value = read_counter(csr)
+            mmio.append(('csr', csr, value))
+            return value
+
+        def probe_enter_trap(cause):
+            self.traps.append((system.retired_instructions() - self.base, cause,
+                               system.cpu.csrs[CSR_MIP]))
+            enter_trap(cause)
+
+        memory.read_byte = probe_read_byte
+        memory.write_byte = probe_write_byte
+        memory.write_halfword = probe_write_halfword
+        memory.write_word = probe_write_word
+        memory.write_bytes = probe_write_bytes
+        system.syscall_handler.service = probe_service
+        system.cpu.enter_trap = probe_enter_trap
+        if counters is not None:
+            read_counter = counters.read
+            counters.read = probe_read_counter
+        predecode = system.predecode
+        self._overrides = dict(predecode.overrides)
+        self.intercepted = set(self._overrides)
+        for pc, handler in self._overrides.items():
+            predecode.override(pc, probe_override(handler))
+        self._skip_idle_polls = system.block_engine.skip_idle_polls
+        system.block_engine.skip_idle_polls = False
+        # Translated code holds bound methods of the memory: rebuild it
+        predecode.clear()
+
+    def _detach(self):
+        """Remove the probes."""
+        system = self.system
+        for name in ('read_byte', 'write_byte', 'write_halfword', 'write_word', 'write_bytes'):
+            vars(system.memory).pop(name, None)
+        vars(system.syscall_handler).pop('service', None)
+        vars(system.cpu).pop('enter_trap', None)
+        if system.cpu.counters is not None:
+            vars(system.cpu.counters).pop('read', None)
+        for pc, handler in self._overrides.items():
+            system.predecode.override(pc, handler)
+        system.block_engine.skip_idle_polls = self._skip_idle_polls
+        system.predecode.clear()
+
+    # ------------------------------------------------------------------
+    # Reference side
+    # ------------------------------------------------------------------
+
+    def _step_reference(self):
+        """
+        Execute one instruction on the reference side.
+
+        Returns:
+            None, or the status it stopped with ('halted' or 'error')
+            without completing the instruction
+        """
+        cpu = self.cpu
+        memory = self.memory
+        self._take_traps()
+        pc = cpu.pc
+        if pc in self.intercepted:
+            return self._replay_intercept(pc)
+        try:
+            memory.current_pc = pc
+            insn = memory.read_word(pc)
+            self.trace.append((self.count, pc, insn))
+            execute_instruction(cpu, memory, insn)
+        except ECallException:
+            if not self.syscalls:
+                raise _Mismatch(f"reference ECALL at 0x{pc:08x} that the system did not service")
+            regs, writes, continued = self.syscalls.popleft()
+            memory.mem.update(writes)
+            memory.dirty.update(writes)
+            cpu.regs[:32] = regs
+            if not continued:
+                return 'halted'
+            cpu.pc = (pc + 4) & MASK32
+        except EBreakException:
+            return 'halted'
+        except _Mismatch:
+            raise
+        except Exception:
+            return 'error'
+        self.count += 1
+        return None
+
+    def _replay_intercept(self, pc):
+        """Apply the effects of an HLE call the system made at pc (one instruction)."""
+        if not self.intercepts:
+            raise _Mismatch(f"reference call to intercepted 0x{pc:08x} that the system did not make")
+        self.trace.append((self.count, pc, self.memory.read_word(pc)))
+        call = self.intercepts.popleft()
+        if call is None:
+            return 'error'
+        regs, next_pc, writes = call
+        self.memory.mem.update(writes)
+        self.memory.dirty.update(writes)
+        self.cpu.regs[:32] = regs
+        self.cpu.pc = next_pc
+        self.count += 1
+        return None
+
+    def _take_traps(self):
+        """Enter the traps the system took at the reference's current count."""
+        traps = self.traps
+        while traps and traps[0][0] == self.count:
+            _, cause, mip = traps.popleft()
+            self.cpu.csrs[CSR_MIP] = mip
+            self.cpu.enter_trap(cause)
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def run(self, max_steps, interval=1, unit='instructions'):
+        """
+        Run the system and the reference in lockstep.
+
+        Args:
+            max_steps: Maximum instructions to execute
+            interval: Instructions (or blocks) between checkpoints
+            unit: 'instructions', or 'blocks' (block engine only: the
+                  system runs one translated block or host instruction
+                  at a time)
+
+        Returns:
+            ExecutionResult of the system; status 'diverged' (and
+            self.divergence set) if the two sides disagreed
+        """
+        from pyrv32_system import ExecutionResult
+
+        if unit not in UNITS:
+            raise ValueError(f"Unknown lockstep unit '{unit}' (expected one of {', '.join(UNITS)})")
+        if unit == 'blocks' and self.system.engine != 'block':
+            raise ValueError("Block intervals need the block engine")
+        if interval < 1:
+            raise ValueError(f"Lockstep interval must be positive, got {interval}")
+
+        system = self.system
+        executed = 0
+        result = None
+        self._attach()
+        try:
+            while executed < max_steps:
+                start = self.count
+                result = self._run_system(max_steps - executed, interval, unit)
+                executed += result.instruction_count
+                differences = self._follow(result)
+                if differences:
+                    self.divergence = self._divergence(start, differences)
+                    system.halted = True
+                    return ExecutionResult('diverged', executed, error=self.divergence.report(),
+                                           pc=system.cpu.pc)
+                if result.status not in ('max_steps', 'running'):
+                    return ExecutionResult(result.status, executed, result.error, result.pc)
+        finally:
+            self._detach()
+        return ExecutionResult('max_steps', executed, pc=system.cpu.pc)
+
+    def _run_system(self, budget, interval, unit):
+        """Advance the system by one checkpoint interval."""
+        from pyrv32_system import ExecutionResult
+
+        system = self.system
+        if unit == 'instructions':
+            return system.run(max_steps=min(interval, budget))
+
+        executed = 0
+        result = ExecutionResult('max_steps', 0, pc=system.cpu.pc)
+        for _ in range(interval):
+            if executed >= budget:
+                break
+            block = system.block_engine.lookup(system.cpu.pc)
+            size = block.count if block is not None and not system.debug_armed() else 1
+            result = system.run(max_steps=min(size, budget - executed))
+            executed += result.instruction_count
+            if result.status != 'max_steps':
+                break
+        return ExecutionResult(result.status, executed, result.error, result.pc)
+
+    def _follow(self, result):
+        """
+        Run the reference through the instructions the system just executed.
+
+        Returns:
+            List of differences (empty if both sides agree)
+        """
+        target = self.count + result.instruction_count
+        try:
+            while self.count < target:
+                stopped = self._step_reference()
+                if stopped is not None:
+                    return [('status', f"{stopped} at instruction {self.count}",
+                             f"{result.status}, {result.instruction_count} instructions")]
+            if result.status in ('halted', 'error'):
+                # The system stopped in front of an instruction: so must the reference
+                stopped = self._step_reference()
+                if stopped != result.status:
+                    return [('status', stopped or 'executed the next instruction', result.status)]
+        except _Mismatch as mismatch:
+            return [('mmio/syscall', str(mismatch), 'see reference')]
+        self._take_traps()
+        return self._compare()
+
+    def _compare(self):
+        """Compare the architectural state at a checkpoint and clear the dirty sets."""
+        system = self.system
+        differences = []
+        if system.cpu.pc != self.cpu.pc:
+            differences.append(('pc', f"0x{self.cpu.pc:08x}", f"0x{system.cpu.pc:08x}"))
+        reference_regs = self.cpu.regs
+        system_regs = system.cpu.regs
+        for index in range(1, 32):
+            if reference_regs[index] != system_regs[index]:
+                differences.append((f"x{index}", f"0x{reference_regs[index]:08x}",
+                                    f"0x{system_regs[index]:08x}"))
+
+        reference_mem = self.memory.mem
+        system_mem = system.memory.mem
+        bad = sorted(address for address in self.dirty | self.memory.dirty
+                     if reference_mem.get(address, 0) != system_mem.get(address, 0))
+        for address in bad[:MAX_REPORTED_BYTES]:
+            differences.append((f"mem[0x{address:08x}]", f"0x{reference_mem.get(address, 0):02x}",
+                                f"0x{system_mem.get(address, 0):02x}"))
+        if len(bad) > MAX_REPORTED_BYTES:
+            differences.append(("memory", f"{len(bad)} bytes differ", "(first listed)"))
+        if self.mmio or self.syscalls or self.traps:
+            differences.append(('mmio/syscall', "all replayed",
+                                f"{len(self.mmio)} MMIO accesses, {len(self.syscalls)} syscalls, "
+                                f"{len(self.traps)} traps left"))
+        self.dirty.clear()
+        self.memory.dirty.clear()
+        return differences
+
+    def _divergence(self, start, differences):
+        """Build the Divergence for a checkpoint interval that disagreed."""
+        registers = {int(location[1:]) for location, _, _ in differences
+                     if location.startswith('x')}
+        memory = any(location.startswith('mem') for location, _, _ in differences)
+        pc = any(location == 'pc' for location, _, _ in differences)
+        interval = [entry for entry in self.trace if entry[0] >= start]
+
+        # The earliest instruction that writes a differing location
+        first = interval[0] if interval else None
+        for entry in interval:
+            decoded = decode_instruction(entry[2])
+            if (decoded.opcode not in (OPCODE_STORE, OPCODE_BRANCH) and decoded.rd in registers) or \
+                    (memory and decoded.opcode == OPCODE_STORE) or \
+                    (pc and decoded.opcode in (OPCODE_BRANCH, OPCODE_JAL, OPCODE_JALR)):
+                first = entry
+                break
+        return Divergence(start, self.count, differences, first, list(self.trace))
+
+
+def check_lockstep(elf_path, max_steps=1000000, interval=1, unit='instructions',
+                   argv=None, **options):
+    """
+    Load an ELF and run it in lockstep; raise if the engine diverges.
+
+    Convenient from pytest:
+
+        @pytest.mark.parametrize('elf', glob.glob('firmware/*.elf'))
+        def test_engine_matches_reference(elf):
+            check_lockstep(elf, max_steps=200000, unit='blocks')
+
+    Args:
+        elf_path: ELF to load
+        max_steps: Maximum instructions to execute
+        interval: Instructions (or blocks) between checkpoints
+        unit: 'instructions' or 'blocks'
+        argv: Program arguments (see RV32System.load_elf)
+        **options: RV32System constructor options (engine, fs_root, ...)
+
+    Returns:
+        ExecutionResult of the run
+
+    Raises:
+        LockstepDivergence: With the divergence report as message
+    """
+    from pyrv32_system import RV32System
+
+    system = RV32System(**options)
+    system.load_elf(elf_path, argv=argv)
+    result = system.run_lockstep(max_steps, interval, unit)
+    if result.status == 'diverged':
+        raise LockstepDivergence(system.divergence)
+    return result
@@ -5,20 +5,36 @@ Features:
 - Byte-addressable memory (sparse dict-based)
 - Debug UART at 0x10000000 (TX only, for diagnostics)
 - Console UART at 0x10001000-0x10001008 (TX/RX for user I/O)
-- Memory-mapped millisecond timer at 0x10000004
+- Memory-mapped millisecond timer at 0x10000004 (host or virtual time)
+- CLINT machine timer (mtime/mtimecmp) at 0x02000000 (see clint.py)
 - Little-endian byte ordering
 - Memory access fault detection
 """
 
 import time
+from itertools import repeat
 from uart import (
     UART, ConsoleUART,
     DEBUG_UART_TX_ADDR,
     CONSOLE_UART_TX_ADDR, CONSOLE_UART_RX_ADDR, CONSOLE_UART_RX_STATUS_ADDR
 )
+from clint import CLINT, CLINT_BASE, CLINT_END
 from exceptions import MemoryAccessFault
 
 
+# Code tracking granularity: stores only consult the predecode cache for
+# pages (1 << CODE_PAGE_SHIFT bytes) that hold cached instructions
+CODE_PAGE_SHIFT = 12
+
+# RAM window. Accesses that lie entirely inside it (and no watchpoint is
+# set) take a fast path straight to the byte store; everything else goes
+# through the address checks, MMIO dispatch and fault logic of read_byte()
+# and write_byte().
+RAM_BASE = 0x80000000
+RAM_SIZE = 8 * 1024 * 1024  # 8MB
+RAM_END = RAM_BASE + RAM_SIZE - 1  # Inclusive
+
+
 class WatchpointHit:
     """Marker for when a watchpoint is hit during memory access"""
     def __init__(self, address, access_type):
@@ -33,6 +49,9 @@ class Memory:
     
     Memory Map:
     - 0x80000000 - 0x807FFFFF: RAM (8MB)
+    - 0x02000000: CLINT msip (machine software interrupt)
+    - 0x02004000: CLINT mtimecmp (64-bit)
+    - 0x0200BFF8: CLINT mtime (64-bit)
     - 0x10000000: Debug UART TX (write-only)
     - 0x10000004: Millisecond timer (read-only, 32-bit)
     - 0x10000008: Unix time - seconds since epoch (read-only, 32-bit)
@@ -43,9 +62,9 @@ class Memory:
     """
     
     # Memory map constants
-    RAM_BASE = 0x80000000
-    RAM_SIZE = 8 * 1024 * 1024  # 8MB
-    RAM_END = RAM_BASE + RAM_SIZE - 1
+    RAM_BASE = RAM_BASE
+    RAM_SIZE = RAM_SIZE
+    RAM_END = RAM_END
     
     # Debug UART
     DEBUG_UART_TX = DEBUG_UART_TX_ADDR
@@ -87,11 +106,29 @@ class Memory:
         self.read_watchpoints = set()   # Addresses to watch for reads
         self.write_watchpoints = set()  # Addresses to watch for writes
         
-        # Timer - records start time when first instruction executes
-        self.timer_start = None
+        # Timer epoch (host time): restarted by load_program(), so the ms
+        # timer and CLINT mtime count from when the program was loaded
+        self.timer_start = time.time()
+        
+        # clock.VirtualClock for deterministic timer registers, or None
+        # for host time
+        self.clock = None
+        
+        # Machine timer/software interrupt device (same time base)
+        self.clint = CLINT(self)
+        
+        # Timer register values sampled by the current word/halfword read
+        # (register address -> value), so multi-byte reads are not torn
+        self._clock_latch = None
         
         # Current PC for fault reporting (set by CPU before each access)
         self.current_pc = 0
+        
+        # Predecoded instruction cache (PredecodeCache registers itself here)
+        self.predecode_cache = None
+        
+        # Page numbers (address >> CODE_PAGE_SHIFT) holding cached instructions
+        self.code_pages = set()
     
     def is_valid_address(self, address):
         """Check if address is in a valid memory region."""
@@ -121,6 +158,10 @@ class Memory:
         if address in (self.CONSOLE_UART_TX, self.CONSOLE_UART_RX, self.CONSOLE_UART_RX_STATUS):
             return True
         
+        # CLINT registers
+        if CLINT_BASE <= address < CLINT_END:
+            return CLINT.is_register(address)
+        
         return False
     
     def read_byte(self, address):
@@ -136,6 +177,8 @@ class Memory:
         Raises:
             MemoryAccessFault: If address is outside valid memory regions
         """
+        if RAM_BASE <= address <= RAM_END and not self.read_watchpoints:
+            return self.mem.get(address, 0)
         address = address & 0xFFFFFFFF
         
         # Check if address is valid
@@ -154,38 +197,20 @@ class Memory:
                 if screen_text:
                     print(f"[SCREEN DUMP] Captured screen at RX status read")
         
-        # Initialize timer on first access
-        if self.timer_start is None:
-            self.timer_start = time.time()
-        
         # Debug UART read returns 0 (no RX)
         if address == self.DEBUG_UART_TX:
             return 0
         
-        # Timer read (0x10000004-0x10000007) - milliseconds since start
-        if 0x10000004 <= address <= 0x10000007:
-            elapsed_ms = int((time.time() - self.timer_start) * 1000)
-            elapsed_ms = elapsed_ms & 0xFFFFFFFF  # Keep as 32-bit
+        # Timer (ms since start), Unix time (s) and nanosecond registers
+        if 0x10000004 <= address <= 0x1000000F:
+            register = address & ~3
             # Return appropriate byte (little-endian)
-            byte_offset = address - 0x10000004
-            return (elapsed_ms >> (byte_offset * 8)) & 0xFF
+            return (self._clock_register(register) >> ((address - register) * 8)) & 0xFF
         
-        # Unix time read (0x10000008-0x1000000B) - seconds since epoch
-        if 0x10000008 <= address <= 0x1000000B:
-            unix_time = int(time.time())
-            unix_time = unix_time & 0xFFFFFFFF  # Keep as 32-bit
-            # Return appropriate byte (little-endian)
-            byte_offset = address - 0x10000008
-            return (unix_time >> (byte_offset * 8)) & 0xFF
-        
-        # Nanosecond read (0x1000000C-0x1000000F) - nanoseconds within current second
-        if 0x1000000C <= address <= 0x1000000F:
-            current_time = time.time()
-            nanoseconds = int((current_time - int(current_time)) * 1_000_000_000)
-            nanoseconds = nanoseconds & 0xFFFFFFFF  # Keep as 32-bit
-            # Return appropriate byte (little-endian)
-            byte_offset = address - 0x1000000C
-            return (nanoseconds >> (byte_offset * 8)) & 0xFF
+        # CLINT msip, mtimecmp and mtime
+        if CLINT_BASE <= address < CLINT_END:
+            register = address & ~3
+            return (self._clock_register(register) >> ((address - register) * 8)) & 0xFF
         
         # Console UART TX read returns 0 (write-only)
         if address == self.CONSOLE_UART_TX:
@@ -213,6 +238,11 @@ class Memory:
         Raises:
             MemoryAccessFault: If address is outside valid memory regions
         """
+        if RAM_BASE <= address <= RAM_END and not self.write_watchpoints:
+            self.mem[address] = value & 0xFF
+            if address >> CODE_PAGE_SHIFT in self.code_pages:
+                self.predecode_cache.invalidate(address)
+            return
         address = address & 0xFFFFFFFF
         value = value & 0xFF
         
@@ -226,10 +256,6 @@ class Memory:
             self.pending_watchpoints.append(wp_hit)
             print(f"\n[WRITE WATCHPOINT] Write to {address:#x} = {value:#04x} (PC={self.current_pc:#x})")
         
-        # Initialize timer on first access
-        if self.timer_start is None:
-            self.timer_start = time.time()
-        
         # Debug UART TX - transmit byte
         if address == self.DEBUG_UART_TX:
             self.uart.tx_byte(value)
@@ -247,6 +273,11 @@ class Memory:
         if 0x1000000C <= address <= 0x1000000F:
             return
         
+        # CLINT registers
+        if CLINT_BASE <= address < CLINT_END:
+            self.clint.write_byte(address, value)
+            return
+        
         # Console UART TX - transmit byte
         if address == self.CONSOLE_UART_TX:
             self.console_uart.tx_byte(value)
@@ -262,6 +293,49 @@ class Memory:
         
         # Normal memory write
         self.mem[address] = value
+        
+        # Stores into cached instruction words force a re-decode; pages
+        # without cached code skip the cache entirely
+        if address >> CODE_PAGE_SHIFT in self.code_pages:
+            self.predecode_cache.invalidate(address)
+    
+    def _clock_register(self, register):
+        """
+        Sample a timer or CLINT register (32-bit value).
+        
+        Values come from self.clock if set, otherwise from host time. Within
+        one latched read each register is sampled once.
+        """
+        latch = self._clock_latch
+        if latch is not None and register in latch:
+            return latch[register]
+        
+        if register < CLINT_END:
+            value = self.clint.read_register(register)
+        elif self.clock is not None:
+            value = self.clock.read_register(register)
+        elif register == self.TIMER_ADDR:
+            value = int((time.time() - self.timer_start) * 1000) & 0xFFFFFFFF
+        elif register == self.CLOCK_TIME_ADDR:
+            value = int(time.time()) & 0xFFFFFFFF
+        else:
+            current_time = time.time()
+            value = int((current_time - int(current_time)) * 1_000_000_000) & 0xFFFFFFFF
+        
+        if latch is not None:
+            latch[register] = value
+        return value
+    
+    def _read_latched(self, address, size):
+        """Multi-byte read of the timer registers from one sample per register."""
+        self._clock_latch = {}
+        try:
+            value = 0
+            for i in range(size):
+                value |= self.read_byte(address + i) << (i * 8)
+            return value
+        finally:
+            self._clock_latch = None
     
     def read_halfword(self, address):
         """
@@ -273,6 +347,11 @@ class Memory:
         Returns:
             16-bit value
         """
+        if RAM_BASE <= address < RAM_END and not self.read_watchpoints:
+            get = self.mem.get
+            return get(address, 0) | (get(address + 1, 0) << 8)
+        if 0x10000004 <= address <= 0x1000000F or CLINT_BASE <= address < CLINT_END:
+            return self._read_latched(address, 2)
         b0 = self.read_byte(address)
         b1 = self.read_byte(address + 1)
         return b0 | (b1 << 8)
@@ -285,6 +364,14 @@ class Memory:
             address: Memory address (should be 2-byte aligned)
             value: 16-bit value to write
         """
+        if RAM_BASE <= address < RAM_END and not self.write_watchpoints:
+            mem = self.mem
+            mem[address] = value & 0xFF
+            mem[address + 1] = (value >> 8) & 0xFF
+            code_pages = self.code_pages
+            if address >> CODE_PAGE_SHIFT in code_pages or (address + 1) >> CODE_PAGE_SHIFT in code_pages:
+                self.invalidate_code(address, address + 2)
+            return
         value = value & 0xFFFF
         self.write_byte(address, value & 0xFF)
         self.write_byte(address + 1, (value >> 8) & 0xFF)
@@ -299,6 +386,12 @@ class Memory:
         Returns:
             32-bit value
         """
+        if RAM_BASE <= address <= RAM_END - 3 and not self.read_watchpoints:
+            get = self.mem.get
+            return (get(address, 0) | (get(address + 1, 0) << 8) |
+                    (get(address + 2, 0) << 16) | (get(address + 3, 0) << 24))
+        if 0x10000004 <= address <= 0x1000000F or CLINT_BASE <= address < CLINT_END:
+            return self._read_latched(address, 4)
         b0 = self.read_byte(address)
         b1 = self.read_byte(address + 1)
         b2 = self.read_byte(address + 2)
@@ -313,22 +406,134 @@ class Memory:
             address: Memory address (should be 4-byte aligned)
             value: 32-bit value to write
         """
+        if RAM_BASE <= address <= RAM_END - 3 and not self.write_watchpoints:
+            mem = self.mem
+            mem[address] = value & 0xFF
+            mem[address + 1] = (value >> 8) & 0xFF
+            mem[address + 2] = (value >> 16) & 0xFF
+            mem[address + 3] = (value >> 24) & 0xFF
+            code_pages = self.code_pages
+            if address >> CODE_PAGE_SHIFT in code_pages or (address + 3) >> CODE_PAGE_SHIFT in code_pages:
+                self.invalidate_code(address, address + 4)
+            return
         value = value & 0xFFFFFFFF
         self.write_byte(address, value & 0xFF)
         self.write_byte(address + 1, (value >> 8) & 0xFF)
         self.write_byte(address + 2, (value >> 16) & 0xFF)
         self.write_byte(address + 3, (value >> 24) & 0xFF)
     
+    def write_bytes(self, address, data):
+        """
+        Write a run of bytes to memory.
+        
+        Same effect as write_byte() for each byte. Runs entirely inside RAM
+        with no write watchpoints set are stored in one update, and cached
+        instructions are invalidated only in the code pages the run covers.
+        
+        Args:
+            address: Starting address
+            data: Bytes or list of byte values
+            
+        Raises:
+            MemoryAccessFault: If an address is outside valid memory regions
+        """
+        address = address & 0xFFFFFFFF
+        end = address + len(data)
+        if (not isinstance(data, (bytes, bytearray)) or self.write_watchpoints or
+                address < self.RAM_BASE or end - 1 > self.RAM_END):
+            for i, byte in enumerate(data):
+                self.write_byte(address + i, byte)
+            return
+        
+        if not data:
+            return
+        self.mem.update(zip(range(address, end), data))
+        self.invalidate_code(address, end)
+    
+    def read_bytes(self, address, length):
+        """
+        Read a run of bytes from memory.
+        
+        Same result as read_byte() for each byte; runs entirely inside RAM
+        with no read watchpoints set are read straight from the store.
+        
+        Args:
+            address: Starting address
+            length: Number of bytes
+            
+        Returns:
+            bytes
+            
+        Raises:
+            MemoryAccessFault: If an address is outside valid memory regions
+        """
+        address = address & 0xFFFFFFFF
+        end = address + length
+        if self.read_watchpoints or address < self.RAM_BASE or end - 1 > self.RAM_END:
+            return bytes(self.read_byte(address + i) for i in range(length))
+        return bytes(map(self.mem.get, range(address, end), repeat(0, length)))
+    
+    def read_cstring(self, address, limit=None):
+        """
+        Read bytes up to, not including, a NUL terminator.
+        
+        Args:
+            address: Starting address
+            limit: Maximum number of bytes to read (None = no limit)
+            
+        Returns:
+            bytes (limit bytes if no NUL was found within limit)
+            
+        Raises:
+            MemoryAccessFault: If the string runs into invalid memory
+        """
+        address = address & 0xFFFFFFFF
+        out = bytearray()
+        if not self.read_watchpoints and self.RAM_BASE <= address <= self.RAM_END:
+            get = self.mem.get
+            stop = self.RAM_END + 1
+            if limit is not None:
+                stop = min(stop, address + limit)
+            for addr in range(address, stop):
+                byte = get(addr, 0)
+                if not byte:
+                    return bytes(out)
+                out.append(byte)
+            address = stop
+        # Outside RAM, watched, or past the end of RAM (read_byte faults)
+        while limit is None or len(out) < limit:
+            byte = self.read_byte(address)
+            if not byte:
+                break
+            out.append(byte)
+            address += 1
+        return bytes(out)
+    
+    def invalidate_code(self, start, end):
+        """
+        Drop cached instructions overlapping [start, end).
+        
+        Only pages marked in code_pages are visited.
+        """
+        if not self.code_pages:
+            return
+        for page in range(start >> CODE_PAGE_SHIFT, ((end - 1) >> CODE_PAGE_SHIFT) + 1):
+            if page in self.code_pages:
+                page_start = max(start, page << CODE_PAGE_SHIFT) & 0xFFFFFFFC
+                page_end = min(end, (page + 1) << CODE_PAGE_SHIFT)
+                for word in range(page_start, page_end, 4):
+                    self.predecode_cache.invalidate(word)
+    
     def load_program(self, address, data):
         """
-        Load program data into memory.
+        Load program data into memory and restart the timer epoch.
         
         Args:
             address: Starting address
             data: Bytes or list of bytes to load
         """
-        for i, byte in enumerate(data):
-            self.write_byte(address + i, byte)
+        self.write_bytes(address, data)
+        self.timer_start = time.time()
     
     def get_uart_output(self):
         """
@@ -359,7 +564,10 @@ class Memory:
         Reset memory (clear all).
         """
         self.mem.clear()
+        if self.predecode_cache is not None:
+            self.predecode_cache.clear()
         self.uart.reset()
+        self.clint.reset()
         # Note: Don't reset console_uart - it maintains its PTY connection
     
     def add_read_watchpoint(self, address):
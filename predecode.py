@@ -0,0 +1,123 @@
+"""
+Predecode Cache - Per-PC cache of decoded instructions
+
+Fetching an instruction costs four Memory.read_byte calls plus a decode
+and handler lookup, even for loop bodies executed millions of times.
+PredecodeCache does both once per PC and keeps the result as a
+ready-to-run (insn, handler, decoded) tuple:
+
+    insn, handler, decoded = cache.lookup(cpu.pc)
+    memory.current_pc = cpu.pc
+    handler(cpu, memory, decoded)
+
+Entries are built lazily on first execution and dropped by Memory when a
+store hits a cached instruction word, so self-modifying code and freshly
+loaded programs are always re-decoded. The cache marks every page it holds
+an entry for in memory.code_pages; stores to other pages never reach it.
+
+override() replaces the handler at a PC with a host implementation (see
+hle.py); the override is applied whenever that entry is (re)built.
+"""
+
+from decoder import decode_instruction
+from execute import select_handler
+from memory import CODE_PAGE_SHIFT
+
+
+class PredecodeCache:
+    """
+    Decoded-instruction cache keyed by PC.
+
+    Only 4-byte aligned PCs are cached; misaligned fetches are decoded on
+    every execution (they cannot be invalidated by word address).
+    """
+
+    def __init__(self, memory):
+        """
+        Create a cache bound to a Memory instance.
+
+        Args:
+            memory: Memory instance used for instruction fetch. The cache
+                    registers itself so stores can invalidate entries.
+        """
+        self.memory = memory
+        self.entries = {}  # pc -> (insn, handler, decoded)
+        self.overrides = {}  # pc -> handler run instead of the instruction's own
+        self.listeners = []  # Caches built on our entries (invalidate_word/clear)
+        self.code_pages = memory.code_pages
+        memory.predecode_cache = self
+
+    def lookup(self, pc):
+        """
+        Return the predecoded entry for the instruction at pc.
+
+        Args:
+            pc: Program counter
+
+        Returns:
+            Tuple (insn, handler, decoded)
+
+        Raises:
+            MemoryAccessFault: If pc is outside valid memory (on a miss)
+            NotImplementedError: If the instruction is not supported
+        """
+        entry = self.entries.get(pc)
+        if entry is None:
+            insn = self.memory.read_word(pc)
+            decoded = decode_instruction(insn)
+            entry = (insn, self.overrides.get(pc) or select_handler(decoded), decoded)
+            if not pc & 3:
+                self.entries[pc] = entry
+                self.code_pages.add(pc >> CODE_PAGE_SHIFT)
+        return entry
+
+    def insert(self, pc, insn, decoded):
+        """
+        Add an entry decoded elsewhere (e.g. restored from a translation cache).
+
+        The caller guarantees that insn is the word currently at pc and
+        decoded its decoding; the handler is selected here.
+
+        Args:
+            pc: 4-byte aligned instruction address
+            insn: 32-bit instruction word
+            decoded: DecodedInsn of insn
+        """
+        self.entries[pc] = (insn, self.overrides.get(pc) or select_handler(decoded), decoded)
+        self.code_pages.add(pc >> CODE_PAGE_SHIFT)
+
+    def override(self, pc, handler):
+        """
+        Execute handler instead of the instruction at pc.
+        
+        The entry keeps the real insn and decoded fields (for traces and
+        the debugger). Overrides survive invalidation and clear(); the
+        block engine ends blocks in front of overridden PCs.
+        
+        Args:
+            pc: 4-byte aligned instruction address
+            handler: Handler with the usual (cpu, memory, decoded)
+                     signature, or None to remove the override
+        """
+        if handler is None:
+            self.overrides.pop(pc, None)
+        else:
+            self.overrides[pc] = handler
+        self.invalidate(pc)
+    
+    def invalidate(self, address):
+        """Drop the entry for the instruction word containing address."""
+        word = address & 0xFFFFFFFC
+        if self.entries.pop(word, None) is not None:
+            for listener in self.listeners:
+                listener.invalidate_word(word)
+
+    def clear(self):
+        """Drop all entries."""
+        self.entries.clear()
+        self.code_pages.clear()
+        for listener in self.listeners:
+            listener.clear()
+
+    def __len__(self):
+        return len(self.entries)
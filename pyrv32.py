@@ -19,14 +19,20 @@ import time
 from cpu import RV32CPU
 from memory import Memory
 from decoder import decode_instruction, get_instruction_name
-from execute import execute_instruction
-from exceptions import EBreakException, ECallException, MemoryAccessFault
+from execute import STATUS_ECALL, STATUS_EBREAK, STATUS_WFI
+from clint import service_interrupts, wfi_wakes, seconds_until_wake
+from predecode import PredecodeCache
+from block_engine import BlockEngine
+from exceptions import EBreakException, MemoryAccessFault
 from tests import run_all_tests
 import os
 from pathlib import Path
 from debugger import Debugger
 from syscalls import SyscallHandler
 from elf_loader import load_elf_image
+from clock import VirtualClock
+from counters import HardwareCounters
+from aot import install_precompiled
 
 
 def load_elf_program(memory, elf_bytes):
@@ -43,7 +49,8 @@ def load_elf_program(memory, elf_bytes):
         'bytes_loaded': result.bytes_loaded,
         'segments': segments,
         'symbols': result.symbols,
-        'reverse_symbols': result.reverse_symbols
+        'reverse_symbols': result.reverse_symbols,
+        'image_digest': result.image_digest
     }
 
 
@@ -367,7 +374,7 @@ Debugger Commands:
 def run_binary(binary_path, verbose=False, start_addr=0x80000000, pc_trace_interval=0, 
                step_mode=False, breakpoints=None, reg_trace_interval=0, reg_trace_file=None,
                reg_trace_nonzero=False, trace_buffer_size=10000, write_watchpoints=None,
-               argv=None, envp=None):
+               argv=None, envp=None, engine='block', clock_mhz=None, aot=False):
     """
     Load and run a binary file.
     
@@ -385,6 +392,14 @@ def run_binary(binary_path, verbose=False, start_addr=0x80000000, pc_trace_inter
         write_watchpoints: List of memory addresses to watch for writes
         argv: List of additional arguments to pass to program
         envp: List of environment variables in "VAR=VALUE" format
+        engine: 'interp' (reference interpreter) or 'block' (translated basic
+                blocks; used only while no debug option needs per-instruction
+                checks, re-evaluated whenever the interactive debugger returns)
+        clock_mhz: If set, the timer registers count virtual time from the
+                   instructions executed at this clock rate (reproducible
+                   runs); otherwise they read host time
+        aot: Import the ahead-of-time module next to the ELF (aot.py) and
+             run its blocks with the block engine
     """
     print("=" * 60)
     print(f"Loading binary: {binary_path}")
@@ -393,6 +408,7 @@ def run_binary(binary_path, verbose=False, start_addr=0x80000000, pc_trace_inter
     
     cpu = RV32CPU()
     mem = Memory(use_console_pty=True)
+    predecode = PredecodeCache(mem)
     cpu.pc = start_addr
     
     # Initialize syscall handler with filesystem root
@@ -400,6 +416,10 @@ def run_binary(binary_path, verbose=False, start_addr=0x80000000, pc_trace_inter
     
     # Initialize debugger
     debugger = Debugger(trace_buffer_size=trace_buffer_size)
+    if not (step_mode or breakpoints):
+        # The trace is only read from the interactive debugger, which can
+        # only be entered through step mode or a breakpoint
+        debugger.trace_buffer.disable()
     if step_mode:
         debugger.set_step_mode(True, count=1)
         print("\nStarting in step mode (interactive debugger)")
@@ -542,59 +562,94 @@ def run_binary(binary_path, verbose=False, start_addr=0x80000000, pc_trace_inter
     step = 0
     max_steps = 10000000  # Safety limit (10M instructions for benchmarks)
     
+    # Translated blocks skip the per-instruction debug hooks, so only use
+    # them when none of those hooks can fire
+    def blocks_allowed():
+        return (engine == 'block' and not (verbose or pc_trace_interval > 0 or reg_trace_interval > 0 or
+                                           debugger.armed() or mem.write_watchpoints))
+    use_blocks = blocks_allowed()
+    block_engine = BlockEngine(cpu, mem, predecode) if engine == 'block' else None
+    if aot and block_engine is not None and elf_info is not None:
+        precompiled = install_precompiled(binary_path, elf_info['image_digest'], block_engine)
+        if precompiled:
+            print(f"Using {precompiled} ahead-of-time translated blocks")
+    if clock_mhz is not None:
+        # step lags behind while a block runs; the engine reports the rest
+        mem.clock = VirtualClock(clock_mhz,
+                                 lambda: step + (block_engine.in_flight() if block_engine else 0))
+    # Counter CSRs are read outside blocks, where step is exact
+    cpu.counters = HardwareCounters(lambda: step, mem)
+    
     start_time = time.time()
     
     try:
         while step < max_steps:
-            try:
-                # Fetch instruction
-                insn = mem.read_word(cpu.pc)
-                
-                # Record in trace buffer BEFORE executing
-                debugger.trace_buffer.add(step, cpu.pc, cpu.regs, insn)
-                
-                # Check for breakpoint or step mode BEFORE executing
-                should_break, break_msg = debugger.should_break(cpu.pc, step, cpu.regs)
-                if should_break:
-                    if break_msg:
-                        print(f"\n{break_msg}")
-                    decoded = decode_instruction(insn)
-                    name = get_instruction_name(decoded)
-                    print(f"0x{cpu.pc:08x}: {name:10s} (0x{insn:08x})")
-                    print(debugger.format_registers(cpu.regs, cpu.pc, compact=True, show_nonzero_only=True))
-                    
-                    # Enter interactive debugger
-                    if not interactive_debugger_cli(cpu, mem, debugger, insn, step):
-                        print("\nExecution stopped by user")
-                        break
-                
-                # PC trace at intervals
-                if pc_trace_interval > 0 and (step % pc_trace_interval) == 0:
-                    print(f"[{step:8d}] PC=0x{cpu.pc:08x}", flush=True)
-                
-                # Register trace at intervals
-                if reg_trace_interval > 0:
-                    debugger.trace_registers(step, cpu.pc, cpu.regs)
-                
-                # Decode and display if verbose
-                if verbose:
-                    decoded = decode_instruction(insn)
-                    name = get_instruction_name(decoded)
-                    print(f"  [{step:6d}] PC=0x{cpu.pc:08x}: {name:6s} (0x{insn:08x})")
-                
-                # Execute
-                continue_exec = execute_instruction(cpu, mem, insn)
+            # Take a pending interrupt; window bounds the batch before the next check
+            _, window = service_interrupts(cpu, mem.clint, max_steps - step)
+            if use_blocks:
+                # Run translated code up to the next instruction needing the host
+                count, fault = block_engine.run(window)
+                step += count
+                if fault is not None:
+                    raise fault
+                if count >= window:
+                    continue
+            
+            # Fetch and decode (cached per PC after first execution)
+            insn, handler, decoded = predecode.lookup(cpu.pc)
+            
+            # Record in trace buffer BEFORE executing
+            debugger.trace_buffer.add(step, cpu.pc, cpu.regs, insn)
+            
+            # Check for breakpoint or step mode BEFORE executing
+            should_break, break_msg = debugger.should_break(cpu.pc, step, cpu.regs)
+            if should_break:
+                if break_msg:
+                    print(f"\n{break_msg}")
+                name = decoded['name']
+                print(f"0x{cpu.pc:08x}: {name:10s} (0x{insn:08x})")
+                print(debugger.format_registers(cpu.regs, cpu.pc, compact=True, show_nonzero_only=True))
                 
-                if not continue_exec:
-                    if verbose:
-                        print(f"  Execution stopped at step {step}")
+                # Enter interactive debugger
+                if not interactive_debugger_cli(cpu, mem, debugger, insn, step):
+                    print("\nExecution stopped by user")
                     break
+                # The debugger may have changed breakpoints or step mode
+                use_blocks = blocks_allowed()
+            
+            # PC trace at intervals
+            if pc_trace_interval > 0 and (step % pc_trace_interval) == 0:
+                print(f"[{step:8d}] PC=0x{cpu.pc:08x}", flush=True)
+            
+            # Register trace at intervals
+            if reg_trace_interval > 0:
+                debugger.trace_registers(step, cpu.pc, cpu.regs)
+            
+            # Decode and display if verbose
+            if verbose:
+                name = decoded['name']
+                print(f"  [{step:6d}] PC=0x{cpu.pc:08x}: {name:6s} (0x{insn:08x})")
             
-            except ECallException as e:
+            # Execute
+            mem.current_pc = cpu.pc
+            status = handler(cpu, mem, decoded)
+            
+            if status == STATUS_ECALL:
                 # Handle syscall and continue execution
                 syscall_handler.handle_syscall(cpu, mem)
                 cpu.pc += 4
-            
+            elif status == STATUS_EBREAK:
+                raise EBreakException(cpu.pc)
+            elif status == STATUS_WFI:
+                # Sleep until console input or an enabled interrupt, then continue
+                if not wfi_wakes(cpu, mem.clint):
+                    mem.console_uart.wait_for_input(seconds_until_wake(cpu, mem.clint))
+                cpu.pc += 4
+            elif not status:
+                if verbose:
+                    print(f"  Execution stopped at step {step}")
+                break
+        
             step += 1
     
     except EBreakException as e:
@@ -722,6 +777,15 @@ Examples:
                         help='Only show non-zero registers in trace')
     parser.add_argument('--trace-size', type=int, default=10000, metavar='N',
                         help='Execution trace buffer size (default: 10000)')
+    parser.add_argument('--engine', choices=['interp', 'block'], default='block',
+                        help='Execution engine: interp (reference interpreter) or block '
+                             '(translated basic blocks, default: block)')
+    parser.add_argument('--clock-mhz', type=float, metavar='MHZ',
+                        help='Deterministic virtual time: timer registers advance with the '
+                             'instruction count at MHZ (default: host time)')
+    parser.add_argument('--aot', action='store_true',
+                        help='Run blocks from the ahead-of-time module next to the ELF '
+                             '(ELF.aot.py, written by aot.py); it is imported as Python code')
     
     # Program arguments
     parser.add_argument('--argv', type=str, action='append', metavar='ARG',
@@ -772,7 +836,10 @@ Examples:
                    trace_buffer_size=args.trace_size,
                    write_watchpoints=args.write_watchpoints,
                    argv=args.argv,
-                   envp=args.envp)
+                   envp=args.envp,
+                   engine=args.engine,
+                   clock_mhz=args.clock_mhz,
+                   aot=args.aot)
 
 
 if __name__ == "__main__":
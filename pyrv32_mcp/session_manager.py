@@ -10,13 +10,30 @@ import os
 import uuid
 from typing import Dict, Optional
 from pyrv32_system import RV32System
+from translation_cache import TranslationCache
+from scheduler import QuantumScheduler
 
 
 class SessionManager:
     """Manages multiple RV32System simulator sessions."""
     
-    def __init__(self):
+    def __init__(self, translation_cache: Optional[TranslationCache] = None,
+                 scheduler: Optional[QuantumScheduler] = None,
+                 aot: bool = False):
+        """
+        Args:
+            translation_cache: Cache shared by all sessions so that loading
+                               an ELF a previous session ran starts warm
+                               (default: TranslationCache at CACHE_ROOT)
+            scheduler: Time slicer for the sessions' long runs
+                       (default: QuantumScheduler with the default quantum)
+            aot: Let sessions import the ahead-of-time module next to a
+                 loaded ELF (aot.py); off unless the modules are trusted
+        """
         self.sessions: Dict[str, RV32System] = {}
+        self.translation_cache = translation_cache or TranslationCache()
+        self.scheduler = scheduler or QuantumScheduler()
+        self.aot = aot
     
     def create_session(self, start_addr: int = 0x80000000, 
                       fs_root: str = "/home/dev/git/pyrv32/pyrv32_sim_fs", 
@@ -39,7 +56,9 @@ class SessionManager:
         self.sessions[session_id] = RV32System(
             start_addr=start_addr,
             fs_root=fs_root,
-            trace_buffer_size=trace_buffer_size
+            trace_buffer_size=trace_buffer_size,
+            translation_cache=self.translation_cache,
+            aot=self.aot
         )
         with open("/tmp/mcp_debug.log", "a") as f:
             f.write(f"[DEBUG] Created session {session_id}, total sessions: {len(self.sessions)}, manager_id={id(self)}\n")
@@ -113,16 +132,26 @@ class SessionManager:
         """
         Destroy a simulator session.
         
+        An unfinished run job of the session is cancelled. The session's
+        translation state is saved first, so the next session loading the
+        same ELF starts warm.
+        
         Args:
             session_id: Session identifier
         
         Returns:
             True if session existed and was destroyed, False otherwise
         """
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            return True
-        return False
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self.scheduler.cancel_system(session)
+        try:
+            session.save_translation_cache()
+        except OSError as exc:
+            with open("/tmp/mcp_debug.log", "a") as f:
+                f.write(f"[WARN] Failed to save translation cache of {session_id}: {exc}\n")
+        return True
     
     def list_sessions(self) -> list[str]:
         """
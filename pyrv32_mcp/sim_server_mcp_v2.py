@@ -21,12 +21,23 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from session_manager import SessionManager
 
 
+# Tools that execute or replace a session's program; refused while the
+# session has an unfinished run job
+JOB_EXCLUSIVE_TOOLS = {
+    "sim_load_elf", "sim_reset", "sim_step", "sim_run_until_output",
+    "sim_run_until_console_status_read", "sim_run_until_input_consumed",
+    "sim_run_until_idle", "sim_send_input_and_run", "sim_interactive_step",
+}
+
+
 class MCPSimulatorServer:
     """MCP simulator server with JSON-RPC over TCP."""
     
     def __init__(self):
         self.session_manager = SessionManager()
         print(f"Session manager initialized: {id(self.session_manager)}")
+        # Task running scheduler slices while run jobs are pending
+        self._scheduler_task = None
         
         # Create log file for this server run
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -40,6 +51,38 @@ class MCPSimulatorServer:
         self.log_fp.write(message)
         self.log_fp.flush()
     
+    def _ensure_scheduler_running(self):
+        """Start the slice-running task on this event loop if it is not running."""
+        loop = asyncio.get_running_loop()
+        task = self._scheduler_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._scheduler_task = loop.create_task(self._drive_scheduler())
+    
+    async def _drive_scheduler(self):
+        """Run job slices, yielding to other requests between slices."""
+        scheduler = self.session_manager.scheduler
+        while scheduler.run_slice() is not None:
+            await asyncio.sleep(0)
+    
+    async def _wait_for_job(self, job):
+        """Wait until job finishes and return its ExecutionResult."""
+        future = asyncio.get_running_loop().create_future()
+        job.add_done_callback(lambda done: future.done() or future.set_result(done.result))
+        self._ensure_scheduler_running()
+        return await future
+    
+    @staticmethod
+    def _format_job(job) -> str:
+        """Describe a run job's progress and, once finished, its result."""
+        info = job.status()
+        text = f"Job: {info['id']}\nSession: {info['label']}\nState: {info['state']}\n"
+        text += f"Instructions: {info['executed']} of {info['max_steps']}\nSlices: {info['slices']}"
+        if job.done:
+            text += f"\nStatus: {info['status']}\nPC: 0x{info['pc']:08x}"
+            if info['error']:
+                text += f"\nError: {info['error']}"
+        return text
+    
     async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         """Handle a single client connection using JSON-RPC over TCP."""
         addr = writer.get_extra_info('peername')
@@ -223,17 +266,37 @@ class MCPSimulatorServer:
             },
             {
                 "name": "sim_run",
-                "description": "Run until halt, breakpoint, or max steps. Optionally include screen state.",
+                "description": "Run until halt, breakpoint, or max steps. Optionally include screen state. The run is time-sliced with other sessions' runs; with wait=false it continues as a background job (see sim_job_status).",
                 "inputSchema": {
                     "type": "object",
                     "properties": {
                         "session_id": {"type": "string", "description": "Session identifier"},
                         "max_steps": {"type": "integer", "description": "Maximum instructions (default: 1000000)", "default": 1000000},
-                        "include_screen": {"type": "boolean", "description": "Include VT100 screen in response (default: false)", "default": False}
+                        "include_screen": {"type": "boolean", "description": "Include VT100 screen in response (default: false)", "default": False},
+                        "wait": {"type": "boolean", "description": "Wait for the run to finish (default: true); false returns a job ID at once", "default": True},
+                        "weight": {"type": "number", "description": "Share of the simulator relative to other sessions' runs (default: 1)", "default": 1}
                     },
                     "required": ["session_id"]
                 }
             },
+            {
+                "name": "sim_job_status",
+                "description": "Get progress of a background run job started by sim_run with wait=false, and its result once finished.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {"job_id": {"type": "string", "description": "Job identifier returned by sim_run"}},
+                    "required": ["job_id"]
+                }
+            },
+            {
+                "name": "sim_job_cancel",
+                "description": "Cancel an unfinished run job. The session stops where the job's last slice left it.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {"job_id": {"type": "string", "description": "Job identifier returned by sim_run"}},
+                    "required": ["job_id"]
+                }
+            },
             {
                 "name": "sim_run_until_output",
                 "description": "Run until UART output is available or halt. Optionally include screen state.",
@@ -661,6 +724,20 @@ class MCPSimulatorServer:
                 msg = f"Set working directory to: {arguments['cwd']}" if success else "Error: Session not found"
                 return [{"type": "text", "text": msg}]
             
+            # Run jobs
+            elif name == "sim_job_status":
+                job = self.session_manager.scheduler.jobs.get(arguments["job_id"])
+                if job is None:
+                    return [{"type": "text", "text": f"Error: Job {arguments['job_id']} not found"}]
+                if not job.done:
+                    self._ensure_scheduler_running()
+                return [{"type": "text", "text": self._format_job(job)}]
+            
+            elif name == "sim_job_cancel":
+                if self.session_manager.scheduler.cancel(arguments["job_id"]):
+                    return [{"type": "text", "text": f"Cancelled job: {arguments['job_id']}"}]
+                return [{"type": "text", "text": f"Error: Job {arguments['job_id']} not found or already finished"}]
+            
             # Get session for all other operations
             session_id = arguments.get("session_id")
             if not session_id:
@@ -670,6 +747,11 @@ class MCPSimulatorServer:
             if not session:
                 return [{"type": "text", "text": f"Error: Session {session_id} not found"}]
             
+            if name in JOB_EXCLUSIVE_TOOLS:
+                job = self.session_manager.scheduler.active_job(session)
+                if job is not None:
+                    return [{"type": "text", "text": f"Error: Session {session_id} is running job {job.id} (see sim_job_status, sim_job_cancel)"}]
+            
             # ELF loading
             if name == "sim_load_elf":
                 argv = arguments.get("argv")
@@ -701,8 +783,16 @@ class MCPSimulatorServer:
                 return [{"type": "text", "text": text}]
             
             elif name == "sim_run":
-                result = session.run(arguments.get("max_steps", 1000000))
+                job = self.session_manager.scheduler.submit(
+                    session, arguments.get("max_steps", 1000000),
+                    weight=arguments.get("weight", 1), label=session_id)
+                if not arguments.get("wait", True):
+                    self._ensure_scheduler_running()
+                    return [{"type": "text", "text": f"Started job: {job.id}"}]
+                result = await self._wait_for_job(job)
                 text = f"Status: {result.status}\nInstructions: {result.instruction_count}\nPC: 0x{result.pc:08x}"
+                if result.elided:
+                    text += f"\nElided (idle input polling): {result.elided}"
                 if result.error:
                     text += f"\nError: {result.error}"
                 if arguments.get("include_screen", False):
@@ -11,21 +11,36 @@ import os
 from cpu import RV32CPU
 from memory import Memory
 from decoder import decode_instruction, get_instruction_name
-from execute import execute_instruction
-from exceptions import EBreakException, ECallException, MemoryAccessFault
+from execute import STATUS_ECALL, STATUS_EBREAK, STATUS_WFI, STATUS_INTERRUPTS
+from clint import service_interrupts, cycles_until_interrupt, wfi_wakes, seconds_until_wake
+from predecode import PredecodeCache
+from block_engine import BlockEngine, WARM_THRESHOLD, HOT_THRESHOLD
+from exceptions import MemoryAccessFault
 from debugger import Debugger
 from syscalls import SyscallHandler
 from elf_loader import load_elf_image
 from objdump_cache import DisasmCache
+from clock import VirtualClock
+from counters import HardwareCounters
+from hle import LibcHLE
+from lockstep import Lockstep
+from aot import install_precompiled
+
+
+def _nothing_in_flight():
+    """RV32System._in_flight while no run loop is active."""
+    return 0
 
 
 class ExecutionResult:
     """Result of running the simulator"""
-    def __init__(self, status, instruction_count=0, error=None, pc=None):
-        self.status = status  # 'running', 'halted', 'breakpoint', 'error', 'max_steps'
+    def __init__(self, status, instruction_count=0, error=None, pc=None, elided=0):
+        self.status = status  # 'running', 'halted', 'breakpoint', 'error', 'max_steps', 'waiting'
         self.instruction_count = instruction_count
         self.error = error
         self.pc = pc
+        # Idle poll-loop instructions skipped instead of executed (not in instruction_count)
+        self.elided = elided
     
     def __repr__(self):
         return f"ExecutionResult(status={self.status}, instructions={self.instruction_count}, pc=0x{self.pc:08x if self.pc else 0:08x})"
@@ -38,8 +53,12 @@ class RV32System:
     Provides programmatic control over CPU, memory, execution, and I/O.
     """
     
+    ENGINES = ('interp', 'block')
+
     def __init__(self, start_addr=0x80000000, fs_root="/home/dev/git/pyrv32/pyrv32_sim_fs", 
-                 trace_buffer_size=10000):
+                 trace_buffer_size=10000, engine='block', trace=False,
+                 warm_threshold=WARM_THRESHOLD, hot_threshold=HOT_THRESHOLD,
+                 clock_mhz=None, translation_cache=None, aot=False):
         """
         Initialize the simulator system.
         
@@ -47,19 +66,60 @@ class RV32System:
             start_addr: Initial PC value (default 0x80000000)
             fs_root: Filesystem root for syscall handler
             trace_buffer_size: Size of execution trace buffer
+            engine: Execution engine for run(): 'interp' (reference
+                    interpreter) or 'block' (tiered basic blocks while no
+                    debug feature is armed, interpreter otherwise)
+            trace: Capture every executed instruction in the trace buffer
+                   from the start (capture forces the interpreter)
+            warm_threshold: Block engine: executions before a block is
+                            translated to closures
+            hot_threshold: Block engine: executions before a block is
+                           compiled from generated source (None = never)
+            clock_mhz: Derive the timer registers from the retired
+                       instruction count at this simulated clock rate
+                       (deterministic virtual time); None reads host time
+            translation_cache: TranslationCache restoring predecode and
+                               block state when an ELF is loaded (and
+                               saving it with save_translation_cache)
+            aot: Run blocks from the ahead-of-time module next to a
+                 loaded ELF (aot.py) if one matches the image. Off by
+                 default: the module is Python code that gets imported
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}' (expected one of {', '.join(self.ENGINES)})")
+        self.engine = engine
+        self.warm_threshold = warm_threshold
+        self.hot_threshold = hot_threshold
         self.cpu = RV32CPU()
         # Always use PTY for Console UART in headless/server mode
         self.memory = Memory(use_console_pty=False, save_console_output=True)
+        self.cpu.counters = HardwareCounters(self.retired_instructions, self.memory)
+        self.predecode = PredecodeCache(self.memory)
+        self.block_engine = BlockEngine(self.cpu, self.memory, self.predecode,
+                                        self.warm_threshold, self.hot_threshold,
+                                        skip_idle_polls=True)
         self.syscall_handler = SyscallHandler(fs_root=fs_root)
         self.fs_root = fs_root  # Track filesystem root for coordination/cleanup
         self.debugger = Debugger(trace_buffer_size=trace_buffer_size)
+        if not trace:
+            self.debugger.trace_buffer.disable()
         
         self.cpu.pc = start_addr
         self.start_addr = start_addr
         self.instruction_count = 0
+        self.elided_instructions = 0  # Idle RX poll iterations skipped by run()
+        self.interrupts_taken = 0  # Traps entered for CLINT interrupts
         self.halted = False
         
+        # Instructions retired by the run loop in progress but not yet
+        # added to instruction_count (see retired_instructions)
+        self._in_flight = _nothing_in_flight
+        self.clock_mhz = clock_mhz
+        self._attach_clock()
+        self.hle = None  # LibcHLE once enable_hle() was called
+        self._hle_functions = []  # Routines reset() dropped; the next load_elf() intercepts them
+        self.divergence = None  # lockstep.Divergence found by the last run_lockstep()
+        
         # Track UART output positions for incremental reads
         self._debug_uart_read_pos = 0
         self._console_uart_read_pos = 0
@@ -70,6 +130,9 @@ class RV32System:
         self.elf_path = None  # Path to loaded ELF file
         self.last_load_info = None  # Cached metadata from last ELF load
         self.disasm_cache = DisasmCache()
+        self.translation_cache = translation_cache
+        self.aot = aot
+        self._loaded_image = None  # (image_digest, segments) of the loaded ELF
     
     def load_elf(self, elf_path, argv=None, envp=None):
         """
@@ -92,6 +155,20 @@ class RV32System:
         self.reverse_symbols = result.reverse_symbols
         self.elf_path = elf_path
         self.cpu.pc = result.entry_point
+        self._loaded_image = (result.image_digest, result.segments)
+        restored = None
+        if self.translation_cache is not None:
+            restored = self.translation_cache.load(result.image_digest, result.segments,
+                                                   self.predecode, self.block_engine)
+        precompiled = install_precompiled(elf_path, result.image_digest, self.block_engine) \
+            if self.aot else 0
+        if self.hle is not None:
+            # Re-resolve intercepted routines in the new symbol table
+            names = list(self.hle.installed) or self._hle_functions
+            self._hle_functions = []
+            self.hle.uninstall()
+            if names:
+                self.hle.install(self.symbols, names)
 
         segments = [{
             'vaddr': seg.vaddr,
@@ -105,8 +182,12 @@ class RV32System:
             'bytes_loaded': result.bytes_loaded,
             'entry_point': result.entry_point,
             'segments': segments,
-            'symbols_loaded': len(self.symbols)
+            'symbols_loaded': len(self.symbols),
+            'aot_blocks': precompiled
         }
+        if self.translation_cache is not None:
+            info['translation_cache'] = 'cold' if restored is None else \
+                {'predecoded': restored[0], 'blocks': restored[1]}
         self.last_load_info = info
         if argv is not None or envp is not None:
             arg_info = self._setup_program_arguments(argv or [], envp or [])
@@ -123,6 +204,19 @@ class RV32System:
             info['disasm_cache'] = 'ready'
         return info
 
+    def save_translation_cache(self):
+        """
+        Save predecode and block state of the loaded ELF to the translation cache.
+
+        Returns:
+            Path of the cache file, or None without a translation cache or
+            loaded ELF
+        """
+        if self.translation_cache is None or self._loaded_image is None:
+            return None
+        digest, segments = self._loaded_image
+        return self.translation_cache.save(digest, segments, self.predecode, self.block_engine)
+
     def _setup_program_arguments(self, extra_argv=None, envp=None):
         """Write argc/argv/envp blocks into memory and set argument registers."""
         if not self.memory:
@@ -301,13 +395,55 @@ class RV32System:
         """Reset the system to initial state"""
         self.cpu = RV32CPU()
         self.memory = Memory()
+        self.cpu.counters = HardwareCounters(self.retired_instructions, self.memory)
+        self.predecode = PredecodeCache(self.memory)
+        self.block_engine = BlockEngine(self.cpu, self.memory, self.predecode,
+                                        self.warm_threshold, self.hot_threshold,
+                                        skip_idle_polls=True)
         self.cpu.pc = self.start_addr
         self.instruction_count = 0
+        self.elided_instructions = 0
+        self.interrupts_taken = 0
         self.halted = False
+        self._attach_clock()
+        self._loaded_image = None
+        if self.hle is not None:
+            # The old entry addresses mean nothing in cleared memory: keep
+            # the routine names for load_elf() to resolve in its symbols
+            hle = self.hle
+            self.hle = LibcHLE(self.predecode, verify=hle.verify)
+            self._hle_functions = list(hle.installed) or self._hle_functions
         self._debug_uart_read_pos = 0
         self._console_uart_read_pos = 0
         self.debugger.trace_buffer.clear()
     
+    def _attach_clock(self):
+        """Give memory a VirtualClock if virtual time is selected."""
+        if self.clock_mhz is not None:
+            self.memory.clock = VirtualClock(self.clock_mhz, self.retired_instructions)
+    
+    def set_clock(self, mhz):
+        """
+        Select the time source of the timer registers.
+        
+        Args:
+            mhz: Simulated clock rate in MHz for deterministic virtual time
+                 (counted from instruction 0), or None for host time
+        """
+        self.clock_mhz = mhz
+        self.memory.clock = None
+        self._attach_clock()
+    
+    def retired_instructions(self):
+        """
+        Instructions retired so far, exact even in the middle of run().
+        
+        The run loops keep their count in a local and add it to
+        instruction_count when they return; while one is active,
+        _in_flight reports that local.
+        """
+        return self.instruction_count + self._in_flight()
+    
     def step(self, count=1):
         """
         Execute N instructions.
@@ -325,8 +461,8 @@ class RV32System:
         
         try:
             for i in range(count):
-                # Fetch instruction
-                insn = self.memory.read_word(self.cpu.pc)
+                # Fetch and decode (cached per PC after first execution)
+                insn, handler, decoded = self.predecode.lookup(self.cpu.pc)
                 
                 # Record in trace buffer
                 self.debugger.trace_buffer.add(
@@ -355,16 +491,12 @@ class RV32System:
                     )
                 
                 # Execute instruction
-                try:
-                    continue_exec = execute_instruction(self.cpu, self.memory, insn)
-                    if not continue_exec:
-                        self.halted = True
-                        return ExecutionResult('halted', executed + 1, pc=self.cpu.pc)
-                
-                except ECallException:
-                    # Handle syscall
-                    self.syscall_handler.handle_syscall(self.cpu, self.memory)
-                    self.cpu.pc += 4
+                self.memory.current_pc = self.cpu.pc
+                status = handler(self.cpu, self.memory, decoded)
+                if status is not True:
+                    stop = self._system_status(status, executed)
+                    if stop is not None:
+                        return stop
                 
                 executed += 1
                 self.instruction_count += 1
@@ -373,18 +505,7 @@ class RV32System:
                 watchpoint_hits = self.memory.check_pending_watchpoints()
                 if watchpoint_hits:
                     # Watchpoint was hit - halt after instruction completed
-                    self.halted = True
-                    wp_info = watchpoint_hits[0]  # Report first watchpoint
-                    return ExecutionResult(
-                        'halted',
-                        executed,
-                        error=f"{wp_info.access_type.capitalize()} watchpoint at {wp_info.address:#x}",
-                        pc=self.cpu.pc
-                    )
-        
-        except EBreakException as e:
-            self.halted = True
-            return ExecutionResult('halted', executed, pc=e.pc)
+                    return self._watchpoint_result(watchpoint_hits, executed)
         
         except MemoryAccessFault as e:
             self.halted = True
@@ -410,6 +531,9 @@ class RV32System:
         """
         Run until halted, breakpoint, or max_steps.
         
+        Pending CLINT interrupts are delivered between batches of
+        instructions (see clint.service_interrupts), never inside one.
+        
         Args:
             max_steps: Maximum instructions to execute
             
@@ -419,10 +543,19 @@ class RV32System:
         # Clear halted flag to allow resuming after breakpoint/watchpoint
         self.halted = False
         
+        # Armed state only changes between runs (MCP tools, CLI debugger)
+        if self.engine == 'block' and not self.debug_armed():
+            return self._run_blocks(max_steps)
+        
         executed = 0
         
         while executed < max_steps:
-            result = self.step(1)
+            window = self._service_interrupts(max_steps - executed)
+            if self.debugger.step_mode or self.debugger.bp_manager.register_breakpoints:
+                # Conditions that must be evaluated before every instruction
+                result = self.step(1)
+            else:
+                result = self._run_fast(window)
             executed += result.instruction_count
             
             if result.status != 'running':
@@ -435,6 +568,281 @@ class RV32System:
         
         return ExecutionResult('max_steps', executed, pc=self.cpu.pc)
     
+    def _run_fast(self, max_steps):
+        """
+        Inner run loop without per-instruction step() overhead.
+        
+        Executes predecoded instructions in one loop with everything it
+        touches cached in locals, and builds an ExecutionResult only when
+        it stops. Produces the same results as repeated step(1) calls as
+        long as no register breakpoint or step mode is active (run()
+        checks). Instructions at a breakpoint address are handed to
+        step() so conditions and hit counts are evaluated there.
+        
+        Args:
+            max_steps: Maximum instructions to execute
+            
+        Returns:
+            ExecutionResult ('running' if max_steps was reached)
+        """
+        cpu = self.cpu
+        memory = self.memory
+        regs = cpu.regs
+        entries = self.predecode.entries
+        lookup = self.predecode.lookup
+        breakpoints = self.debugger.bp_manager.breakpoints
+        trace = self.debugger.trace_buffer
+        tracing = trace.enabled
+        trace_add = trace.add
+        pending_watchpoints = memory.pending_watchpoints
+        start_count = self.instruction_count
+        executed = 0
+        # step() below keeps instruction_count current itself
+        self._in_flight = lambda: start_count + executed - self.instruction_count
+        
+        try:
+            while executed < max_steps:
+                pc = cpu.pc
+                if pc in breakpoints:
+                    self.instruction_count = start_count + executed
+                    result = self.step(1)
+                    executed += result.instruction_count
+                    if result.status != 'running':
+                        return ExecutionResult(result.status, executed, result.error, result.pc)
+                    continue
+                
+                entry = entries.get(pc)
+                if entry is None:
+                    entry = lookup(pc)
+                insn, handler, decoded = entry
+                if tracing:
+                    trace_add(start_count + executed, pc, regs, insn)
+                
+                memory.current_pc = pc
+                status = handler(cpu, memory, decoded)
+                if status is not True:
+                    stop = self._system_status(status, executed)
+                    if stop is not None:
+                        return stop
+                    if status != STATUS_ECALL:
+                        # WFI or interrupt enables changed: let run() check
+                        executed += 1
+                        return ExecutionResult('running', executed, pc=cpu.pc)
+                executed += 1
+                
+                if pending_watchpoints:
+                    return self._watchpoint_result(memory.check_pending_watchpoints(), executed)
+        
+        except MemoryAccessFault as e:
+            self.halted = True
+            return ExecutionResult(
+                'error',
+                executed,
+                error=f"Memory fault: {e.access_type} at 0x{e.address:08x}",
+                pc=e.pc
+            )
+        
+        except Exception as e:
+            self.halted = True
+            return ExecutionResult('error', executed, error=str(e), pc=cpu.pc)
+        
+        finally:
+            self.instruction_count = start_count + executed
+            self._in_flight = _nothing_in_flight
+        
+        return ExecutionResult('running', executed, pc=cpu.pc)
+    
+    def _system_status(self, status, executed):
+        """
+        Act on a handler status other than True.
+        
+        ECALLs are serviced here and execution continues past them;
+        EBREAK, exit syscalls, unsupported syscalls and a False status
+        halt the system. A WFI completes if console input is pending or an
+        interrupt ends it (clint.wfi_wakes); otherwise the run stops
+        'waiting' with the PC still on the WFI, so the next run retries it
+        (see wait_for_input()). STATUS_INTERRUPTS continues.
+        
+        Args:
+            status: Value returned by the instruction handler
+            executed: Instructions completed before this one
+            
+        Returns:
+            ExecutionResult to stop with, or None to continue
+        """
+        cpu = self.cpu
+        if status == STATUS_INTERRUPTS:
+            return None
+        if status == STATUS_ECALL:
+            if self.syscall_handler.service(cpu, self.memory):
+                cpu.pc += 4
+                return None
+            self.halted = True
+            return ExecutionResult('halted', executed, error=self.syscall_handler.stop_reason, pc=cpu.pc)
+        if status == STATUS_WFI:
+            if self.memory.console_uart.has_input() or wfi_wakes(cpu, self.memory.clint):
+                cpu.pc += 4
+                return None
+            return ExecutionResult('waiting', executed,
+                                   error=f"Waiting for input (WFI at 0x{cpu.pc:08x})", pc=cpu.pc)
+        self.halted = True
+        if status == STATUS_EBREAK:
+            return ExecutionResult('halted', executed, pc=cpu.pc)
+        return ExecutionResult('halted', executed + 1, pc=cpu.pc)
+    
+    def _service_interrupts(self, budget):
+        """
+        Deliver a pending interrupt and size the next batch of instructions.
+        
+        Args:
+            budget: Instructions left in the run
+            
+        Returns:
+            Instructions to run before the next call (at most budget)
+        """
+        cause, window = service_interrupts(self.cpu, self.memory.clint, budget)
+        if cause is not None:
+            self.interrupts_taken += 1
+        return window
+    
+    def _watchpoint_result(self, watchpoint_hits, executed):
+        """Halt and report the first watchpoint hit by the last instruction."""
+        self.halted = True
+        wp_info = watchpoint_hits[0]
+        return ExecutionResult(
+            'halted',
+            executed,
+            error=f"{wp_info.access_type.capitalize()} watchpoint at {wp_info.address:#x}",
+            pc=self.cpu.pc
+        )
+    
+    def debug_armed(self):
+        """
+        True if a breakpoint, watchpoint, step mode or trace capture is armed.
+        
+        run() uses the block engine only while this is False; anything armed
+        drops it to the instrumented interpreter for the whole run.
+        """
+        return bool(self.debugger.armed() or
+                    self.memory.read_watchpoints or self.memory.write_watchpoints)
+    
+    def _run_blocks(self, max_steps):
+        """
+        run() on the block engine.
+        
+        Translated blocks execute until an instruction needs the host
+        (ECALL/EBREAK, untranslatable code); that instruction goes through
+        step() and translation resumes. Translated instructions are not
+        recorded in the trace buffer.
+        
+        If the program reaches an RX status poll loop while no input is
+        pending, the whole iterations that fit in the remaining budget are
+        skipped: the loop's registers are set to their idle values and the
+        run stops at the loop head with status 'waiting'. If an enabled
+        interrupt comes due within the budget (virtual clock), only the
+        iterations before its deadline are skipped and the run goes on to
+        take it. Skipped instructions count against max_steps and are
+        reported in ExecutionResult.elided and elided_instructions, not in
+        instruction_count.
+        
+        Args:
+            max_steps: Maximum instructions to execute
+            
+        Returns:
+            ExecutionResult
+        """
+        executed = 0
+        elided = 0
+        engine = self.block_engine
+        self._in_flight = lambda: engine.in_flight()
+        
+        try:
+            while executed + elided < max_steps:
+                end = executed + self._service_interrupts(max_steps - executed - elided)
+                count, fault = engine.run(end - executed)
+                executed += count
+                self.instruction_count += count
+                if fault is not None:
+                    self.halted = True
+                    return ExecutionResult(
+                        'error',
+                        executed,
+                        error=f"Memory fault: {fault.access_type} at 0x{fault.address:08x}",
+                        pc=fault.pc,
+                        elided=elided
+                    )
+                poll = engine.idle_poll
+                if poll is not None:
+                    poll.settle(self.cpu.regs)
+                    remaining = max_steps - executed - elided
+                    due = cycles_until_interrupt(self.cpu, self.memory.clint)
+                    if due is not None and due <= remaining:
+                        # Skip to the deadline (the window ends there) and
+                        # step the last partial iteration into the interrupt
+                        elided += self._elide(poll, end - executed)
+                        continue
+                    elided += self._elide(poll, remaining)
+                    return ExecutionResult(
+                        'waiting',
+                        executed,
+                        error=f"Waiting for input (RX status poll at 0x{poll.head:08x})",
+                        pc=self.cpu.pc,
+                        elided=elided
+                    )
+                if executed >= end:
+                    continue
+                
+                result = self.step(1)
+                executed += result.instruction_count
+                
+                if result.status != 'running':
+                    return ExecutionResult(
+                        result.status,
+                        executed,
+                        result.error,
+                        result.pc,
+                        elided
+                    )
+        finally:
+            self._in_flight = _nothing_in_flight
+        
+        return ExecutionResult('max_steps', executed, pc=self.cpu.pc, elided=elided)
+    
+    def _elide(self, poll, budget):
+        """
+        Skip the whole idle iterations of a poll loop that fit in budget.
+        
+        Returns:
+            Instructions skipped
+        """
+        skipped = budget // poll.count * poll.count
+        self.elided_instructions += skipped
+        if self.memory.clock is not None:
+            self.memory.clock.fast_forward(skipped)
+        return skipped
+    
+    def run_lockstep(self, max_steps=1000000, interval=1, unit='instructions'):
+        """
+        Run while validating the engine against the reference interpreter.
+        
+        A shadow CPU/memory pair starts from the current state and follows
+        on execute.execute_instruction; registers, PC and written memory
+        are compared every interval (see lockstep.py).
+        
+        Args:
+            max_steps: Maximum instructions to execute
+            interval: Instructions (or blocks) between comparisons
+            unit: 'instructions' or 'blocks' (block engine only)
+            
+        Returns:
+            ExecutionResult; status 'diverged' if the two disagreed, with
+            the report in error and the details in self.divergence
+        """
+        lockstep = Lockstep(self)
+        result = lockstep.run(max_steps, interval, unit)
+        self.divergence = lockstep.divergence
+        return result
+    
     def run_until_output(self, max_steps=100000):
         """
         Run until console UART has new output or execution stops.
@@ -494,6 +902,32 @@ class RV32System:
         
         return result
     
+    def _polls_detected(self):
+        """True if run() uses the block engine, which stops at idle RX polls."""
+        return self.engine == 'block' and not self.debug_armed()
+    
+    def _run_until_rx_idle(self, max_steps):
+        """
+        run() until the program waits for input or stops.
+        
+        Returns:
+            ExecutionResult with the instructions executed and elided over
+            all runs (see _stopped_at_idle_poll)
+        """
+        executed = 0
+        elided = 0
+        while executed + elided < max_steps:
+            result = self.run(max_steps - executed - elided)
+            executed += result.instruction_count
+            elided += result.elided
+            if result.status != 'running':
+                return ExecutionResult(result.status, executed, result.error, result.pc, elided)
+        return ExecutionResult('max_steps', executed, pc=self.cpu.pc, elided=elided)
+    
+    def _stopped_at_idle_poll(self, result):
+        """True if result is a block-engine stop in front of an idle RX status poll loop."""
+        return result.status == 'waiting' and self.block_engine.idle_poll is not None
+    
     def run_until_input_consumed(self, max_steps=1000000, then_idle=True, min_idle_instructions=100):
         """
         Run until input buffer is empty AND optionally until program is idle.
@@ -503,6 +937,12 @@ class RV32System:
         the program has done significant work after consuming input, ensuring
         screen updates have occurred.
         
+        On the block engine the run goes until the program spins on the RX
+        status with nothing to read (the engine's idle poll detection, whose
+        skipped iterations are reported in elided), which already means the
+        input is consumed and the program idle. The interpreter stops at
+        every RX status read through a temporary read watchpoint instead.
+        
         Args:
             max_steps: Maximum total instructions to execute
             then_idle: If True, after input consumed, continue until idle
@@ -511,6 +951,14 @@ class RV32System:
         Returns:
             ExecutionResult with cumulative instruction count and final state
         """
+        if self._polls_detected():
+            result = self._run_until_rx_idle(max_steps)
+            if not self._stopped_at_idle_poll(result):
+                return result
+            return ExecutionResult('halted', result.instruction_count,
+                                   error=f"Input consumed, idle at RX status poll 0x{result.pc:08x}",
+                                   pc=result.pc, elided=result.elided)
+        
         CONSOLE_UART_RX_STATUS_ADDR = 0x10001008
         total_executed = 0
         input_consumed_at = 0
@@ -532,6 +980,9 @@ class RV32System:
                     return ExecutionResult(result.status, total_executed, result.error, result.pc)
                 if result.status == 'max_steps':
                     return ExecutionResult(result.status, total_executed, result.error, result.pc)
+                # Parked on a WFI with no input: nothing will run until some arrives
+                if result.status == 'waiting':
+                    return ExecutionResult(result.status, total_executed, result.error, result.pc)
                 
                 # Check if input buffer is empty
                 buffer_empty = len(self.memory.console_uart.rx_buffer) == 0
@@ -579,6 +1030,11 @@ class RV32System:
         execute between polls, indicating meaningful processing happened (not just
         character-by-character polling).
         
+        On the block engine the run goes until the program spins on the RX
+        status with nothing to read (see run_until_input_consumed); if fewer
+        than min_instructions ran before that, the result is 'waiting', as
+        nothing more happens until input arrives.
+        
         Args:
             max_steps: Maximum total instructions to execute
             min_instructions: Minimum instructions between polls to consider "idle"
@@ -586,6 +1042,14 @@ class RV32System:
         Returns:
             ExecutionResult with cumulative instruction count
         """
+        if self._polls_detected():
+            result = self._run_until_rx_idle(max_steps)
+            if not self._stopped_at_idle_poll(result) or result.instruction_count < min_instructions:
+                return result
+            return ExecutionResult('halted', result.instruction_count,
+                                   error=f"Idle after {result.instruction_count} instructions",
+                                   pc=result.pc, elided=result.elided)
+        
         CONSOLE_UART_RX_STATUS_ADDR = 0x10001008
         total_executed = 0
         
@@ -605,6 +1069,9 @@ class RV32System:
                     return ExecutionResult(result.status, total_executed, result.error, result.pc)
                 if result.status == 'max_steps':
                     return ExecutionResult(result.status, total_executed, result.error, result.pc)
+                # Parked on a WFI with no input: nothing will run until some arrives
+                if result.status == 'waiting':
+                    return ExecutionResult(result.status, total_executed, result.error, result.pc)
                 
                 # Check if we executed enough instructions to consider it "meaningful work"
                 if result.instruction_count >= min_instructions:
@@ -893,15 +1360,14 @@ class RV32System:
             address: Memory address
             data: bytes or bytearray to write
         """
-        for i, byte in enumerate(data):
-            self.memory.write_byte(address + i, byte)
+        self.memory.write_bytes(address, data)
     
     def load_binary_data(self, data, address=None):
         """Legacy helper to write raw program bytes into memory and reset PC."""
         if not isinstance(data, (bytes, bytearray)):
             raise TypeError("data must be bytes or bytearray")
         address = self.start_addr if address is None else address
-        self.write_memory(address, data)
+        self.memory.load_program(address, data)
         self.cpu.pc = address
         return len(data)
     
@@ -994,10 +1460,75 @@ class RV32System:
             'halted': self.halted,
             'pc': self.cpu.pc,
             'instruction_count': self.instruction_count,
+            'elided_instructions': self.elided_instructions,
             'console_has_output': len(self.memory.console_uart.get_output_text()) > 0,
             'breakpoint_count': len(self.debugger.bp_manager.list())
         }
     
+    def enable_hle(self, functions=None, verify=False):
+        """
+        Intercept libc routines by ELF symbol and run them in Python.
+        
+        See hle.py. Requires a loaded ELF with a symbol table; the
+        interception follows later load_elf() calls (also after reset(),
+        which drops it until the next ELF is loaded).
+        
+        Args:
+            functions: Routine names from hle.HLE_FUNCTIONS (None = all)
+            verify: Run the real routine on every call and record where
+                    the emulation would have differed (get_hle_stats)
+            
+        Returns:
+            Dict mapping each intercepted routine to its entry address
+        """
+        if self.hle is None:
+            self.hle = LibcHLE(self.predecode, verify=verify)
+        self.hle.verify = verify
+        return self.hle.install(self.symbols, functions)
+    
+    def disable_hle(self, functions=None):
+        """
+        Stop intercepting libc routines.
+        
+        Args:
+            functions: Routine names to stop intercepting (None = all)
+        """
+        if self.hle is not None:
+            self.hle.uninstall(functions)
+        self._hle_functions = [] if functions is None else \
+            [name for name in self._hle_functions if name not in functions]
+    
+    def get_hle_stats(self):
+        """
+        Get libc HLE statistics.
+        
+        Returns:
+            Dict with 'installed' (name -> address), 'calls' (name -> count),
+            'verify' and 'mismatches' (name, args, problems) from verify mode
+        """
+        if self.hle is None:
+            return {'installed': {}, 'calls': {}, 'verify': False, 'mismatches': []}
+        return self.hle.stats()
+    
+    def get_fusion_stats(self):
+        """
+        Get macro-op fusion hit counts of the block engine.
+        
+        Returns:
+            Dict mapping idiom ('lui+addi', 'auipc+jalr', 'slt+branch') to
+            the number of times it executed as a fused pair
+        """
+        return self.block_engine.fusion_stats()
+    
+    def get_ras_stats(self):
+        """
+        Get return-address stack prediction counters of the block engine.
+        
+        Returns:
+            Dict with 'hits', 'misses' and 'depth' (see BlockEngine.ras_stats)
+        """
+        return self.block_engine.ras_stats()
+    
     # VT100 Terminal screen commands
     
     def get_screen_display(self):
@@ -1038,3 +1569,21 @@ class RV32System:
             data: String or bytes to inject
         """
         self.console_uart_write(data)
+    
+    def wait_for_input(self, timeout=None):
+        """
+        Sleep until console input arrives, e.g. after a run stopped 'waiting'
+        at a WFI. Input injected from another thread wakes it, and so does
+        the deadline of an enabled machine timer interrupt.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            True if input is available, False if the timeout expired or
+            the timer deadline was reached
+        """
+        due = seconds_until_wake(self.cpu, self.memory.clint)
+        if due is not None and (timeout is None or due < timeout):
+            timeout = due
+        return self.memory.console_uart.wait_for_input(timeout)
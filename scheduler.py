@@ -0,0 +1,231 @@
+"""
+Scheduler - Instruction-quantum time slicing of simulator sessions
+
+RV32System.run() keeps the host busy until the run ends, so with several
+MCP sessions one sim_run with max_steps=5000000 holds up every other
+session, and every quick tool call, until it is done. QuantumScheduler
+turns runs into RunJobs that execute a quantum of instructions at a time:
+
+    scheduler = QuantumScheduler(quantum=100_000)
+    job = scheduler.submit(system, max_steps=5_000_000)
+    while scheduler.run_slice():
+        ...  # serve other requests between slices
+
+Jobs take turns in submission order (round-robin); each turn runs
+quantum * weight instructions, so a job of weight 2 gets twice the share
+of a job of weight 1. Between slices a session is in a consistent state
+and can be inspected or given input.
+
+A job finishes when its session stops for any reason other than the
+slice budget, or when max_steps instructions have run. Its result is the
+ExecutionResult a single run(max_steps) would have returned, with counts
+summed over the slices. The one difference: a run that reaches an idle
+RX poll loop stops 'waiting' in the slice where it got there, and elided
+covers only the rest of that slice rather than all of max_steps.
+"""
+
+import itertools
+from collections import deque
+
+from pyrv32_system import ExecutionResult
+
+
+DEFAULT_QUANTUM = 100_000
+
+# Finished jobs kept for status queries (oldest are forgotten first)
+FINISHED_JOBS_KEPT = 100
+
+
+class RunJob:
+    """One session's run(max_steps), executed in slices by a QuantumScheduler."""
+
+    def __init__(self, job_id, system, max_steps, weight=1, label=None):
+        """
+        Args:
+            job_id: Scheduler-assigned identifier
+            system: RV32System to run
+            max_steps: Instruction budget of the whole run
+            weight: Share of the processor relative to other jobs
+            label: Caller's name for the job (e.g. the session ID)
+        """
+        self.id = job_id
+        self.system = system
+        self.max_steps = max_steps
+        self.weight = weight
+        self.label = label
+        self.executed = 0
+        self.elided = 0
+        self.slices = 0
+        self.result = None  # ExecutionResult once finished
+        self._callbacks = []
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    @property
+    def remaining(self):
+        # Skipped idle polls count against the budget, as in run()
+        return self.max_steps - self.executed - self.elided
+
+    def state(self):
+        """'queued', 'running' (has had a slice), 'done' or 'cancelled'."""
+        if self.result is not None:
+            return 'cancelled' if self.result.status == 'cancelled' else 'done'
+        return 'running' if self.slices else 'queued'
+
+    def add_done_callback(self, callback):
+        """Call callback(job) when the job finishes (at once if it has)."""
+        if self.done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def run_slice(self, budget):
+        """
+        Run the session for up to budget instructions of the remaining run.
+
+        Returns:
+            True if the job finished
+        """
+        try:
+            result = self.system.run(min(budget, self.remaining))
+        except Exception as e:
+            self._finish(ExecutionResult('error', self.executed, error=str(e),
+                                         pc=self.system.cpu.pc, elided=self.elided))
+            return True
+        self.executed += result.instruction_count
+        self.elided += result.elided
+        self.slices += 1
+        if result.status != 'max_steps' or self.remaining <= 0:
+            self._finish(ExecutionResult(result.status, self.executed, result.error,
+                                         result.pc, self.elided))
+        return self.done
+
+    def cancel(self):
+        """Finish the job now with status 'cancelled'."""
+        if not self.done:
+            self._finish(ExecutionResult('cancelled', self.executed, pc=self.system.cpu.pc,
+                                         elided=self.elided))
+
+    def _finish(self, result):
+        self.result = result
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def status(self):
+        """Dict describing the job's progress (and result once finished)."""
+        info = {
+            'id': self.id,
+            'label': self.label,
+            'state': self.state(),
+            'executed': self.executed,
+            'max_steps': self.max_steps,
+            'slices': self.slices,
+            'weight': self.weight,
+        }
+        if self.result is not None:
+            info.update(status=self.result.status, pc=self.result.pc,
+                        error=self.result.error, elided=self.result.elided)
+        return info
+
+    def __repr__(self):
+        return f"RunJob({self.id}, {self.state()}, {self.executed}/{self.max_steps})"
+
+
+class QuantumScheduler:
+    """Runs RunJobs round-robin in instruction quanta."""
+
+    def __init__(self, quantum=DEFAULT_QUANTUM):
+        """
+        Args:
+            quantum: Instructions per turn for a job of weight 1
+        """
+        if quantum < 1:
+            raise ValueError(f"Quantum must be at least 1 instruction, got {quantum}")
+        self.quantum = quantum
+        self.jobs = {}         # id -> RunJob, active and recently finished
+        self._queue = deque()  # active jobs in turn order
+        self._ids = itertools.count(1)
+
+    def submit(self, system, max_steps, weight=1, label=None):
+        """
+        Queue a run of system.
+
+        Args:
+            system: RV32System to run
+            max_steps: Instruction budget of the whole run
+            weight: Share relative to other jobs (quantum * weight per turn)
+            label: Caller's name for the job
+
+        Returns:
+            The queued RunJob
+
+        Raises:
+            ValueError: If weight is not positive
+            RuntimeError: If system already has an unfinished job
+        """
+        if weight <= 0:
+            raise ValueError(f"Job weight must be positive, got {weight}")
+        active = self.active_job(system)
+        if active is not None:
+            raise RuntimeError(f"Session already has unfinished job {active.id}")
+        job = RunJob(f"job-{next(self._ids)}", system, max_steps, weight, label)
+        self.jobs[job.id] = job
+        self._queue.append(job)
+        return job
+
+    def active_job(self, system):
+        """The unfinished job running system, or None."""
+        return next((job for job in self._queue if job.system is system), None)
+
+    def pending(self):
+        """True if any job is unfinished."""
+        return bool(self._queue)
+
+    def run_slice(self):
+        """
+        Give the next job its turn.
+
+        Returns:
+            The job that ran, or None if there are no unfinished jobs
+        """
+        if not self._queue:
+            return None
+        job = self._queue.popleft()
+        if job.run_slice(max(1, int(self.quantum * job.weight))):
+            self._forget_finished()
+        else:
+            self._queue.append(job)
+        return job
+
+    def run_all(self):
+        """Run slices until every job has finished."""
+        while self.run_slice() is not None:
+            pass
+
+    def cancel(self, job_id):
+        """
+        Cancel an unfinished job.
+
+        Returns:
+            True if the job was cancelled, False if it is unknown or finished
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        self._queue.remove(job)
+        job.cancel()
+        self._forget_finished()
+        return True
+
+    def cancel_system(self, system):
+        """Cancel the unfinished job of system, if any."""
+        job = self.active_job(system)
+        return job is not None and self.cancel(job.id)
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:-FINISHED_JOBS_KEPT]:
+            del self.jobs[job_id]
@@ -32,6 +32,16 @@ SYS_FSTAT = 80
 SYS_EXIT = 93
 SYS_EXIT_GROUP = 94
 
+SYSCALL_NAMES = {
+    17: "GETCWD", 35: "UNLINKAT", 37: "LINKAT", 38: "RENAMEAT",
+    48: "FACCESSAT", 49: "CHDIR", 56: "OPENAT", 57: "CLOSE",
+    62: "LSEEK", 63: "READ", 64: "WRITE", 79: "FSTATAT",
+    80: "FSTAT", 93: "EXIT", 94: "EXIT_GROUP"
+}
+
+# Returned by a syscall implementation that terminates the program
+EXIT = object()
+
 
 class SyscallHandler:
     """
@@ -59,32 +69,9 @@ class SyscallHandler:
         self.fd_map[0] = None  # stdin
         self.fd_map[1] = None  # stdout  
         self.fd_map[2] = None  # stderr
-    
-    def handle_syscall(self, cpu, memory):
-        """
-        Handle ECALL syscall.
-        
-        Args:
-            cpu: RV32CPU instance with registers containing syscall args
-            memory: Memory instance for reading/writing strings and buffers
-            
-        Returns:
-            None (modifies cpu.regs[10] with return value)
-        """
-        syscall_num = cpu.regs[17]  # a7
-        
-        # Log syscall entry
-        syscall_names = {
-            17: "GETCWD", 35: "UNLINKAT", 37: "LINKAT", 38: "RENAMEAT",
-            48: "FACCESSAT", 49: "CHDIR", 56: "OPENAT", 57: "CLOSE",
-            62: "LSEEK", 63: "READ", 64: "WRITE", 79: "FSTATAT",
-            80: "FSTAT", 93: "EXIT", 94: "EXIT_GROUP"
-        }
-        syscall_name = syscall_names.get(syscall_num, f"UNKNOWN_{syscall_num}")
-        print(f"[SYSCALL] {syscall_name} (a0={cpu.regs[10]:08x}, a1={cpu.regs[11]:08x}, a2={cpu.regs[12]:08x}, a3={cpu.regs[13]:08x})")
         
-        # Dispatch to handler
-        handlers = {
+        self.stop_reason = None  # Why the last service() call returned False
+        self.handlers = {
             SYS_GETCWD: self._sys_getcwd,
             SYS_CHDIR: self._sys_chdir,
             SYS_OPENAT: self._sys_openat,
@@ -101,18 +88,57 @@ class SyscallHandler:
             SYS_EXIT: self._sys_exit,
             SYS_EXIT_GROUP: self._sys_exit_group,
         }
+    
+    def handle_syscall(self, cpu, memory):
+        """
+        Handle ECALL syscall.
         
-        handler = handlers.get(syscall_num)
-        if handler:
-            result = handler(cpu, memory)
-            cpu.regs[10] = result & 0xFFFFFFFF  # a0 = return value
-        else:
-            # Unsupported syscall - raise exception to break execution
+        Args:
+            cpu: RV32CPU instance with registers containing syscall args
+            memory: Memory instance for reading/writing strings and buffers
+            
+        Returns:
+            None (modifies cpu.regs[10] with return value)
+            
+        Raises:
+            EBreakException: If the program exits or the syscall is unsupported
+        """
+        if not self.service(cpu, memory):
             from exceptions import EBreakException
-            raise EBreakException(
-                cpu.pc,
-                f"Unsupported syscall {syscall_num} (a0={cpu.regs[10]:08x}, a1={cpu.regs[11]:08x}, a2={cpu.regs[12]:08x})"
-            )
+            raise EBreakException(cpu.pc, self.stop_reason)
+    
+    def service(self, cpu, memory):
+        """
+        Service an ECALL without raising.
+        
+        Args:
+            cpu: RV32CPU instance with registers containing syscall args
+            memory: Memory instance for reading/writing strings and buffers
+            
+        Returns:
+            True to continue execution, False to stop. On False,
+            self.stop_reason is None for exit/exit_group or an error
+            message for an unsupported syscall.
+        """
+        syscall_num = cpu.regs[17]  # a7
+        
+        # Log syscall entry
+        syscall_name = SYSCALL_NAMES.get(syscall_num, f"UNKNOWN_{syscall_num}")
+        print(f"[SYSCALL] {syscall_name} (a0={cpu.regs[10]:08x}, a1={cpu.regs[11]:08x}, a2={cpu.regs[12]:08x}, a3={cpu.regs[13]:08x})")
+        
+        # Dispatch to handler
+        handler = self.handlers.get(syscall_num)
+        if handler is None:
+            # Unsupported syscall - stop execution
+            self.stop_reason = (f"Unsupported syscall {syscall_num} (a0={cpu.regs[10]:08x}, "
+                                f"a1={cpu.regs[11]:08x}, a2={cpu.regs[12]:08x})")
+            return False
+        result = handler(cpu, memory)
+        if result is EXIT:
+            self.stop_reason = None
+            return False
+        cpu.regs[10] = result & 0xFFFFFFFF  # a0 = return value
+        return True
     
     # Helper methods
     
@@ -758,11 +784,9 @@ class SyscallHandler:
             a0: exit status
             
         Returns:
-            Does not return (raises exception)
+            EXIT (execution stops like an EBREAK)
         """
-        from exceptions import EBreakException
-        # Treat as EBREAK for clean termination
-        raise EBreakException(cpu.pc)
+        return EXIT
     
     def _sys_exit_group(self, cpu, memory):
         """
@@ -772,6 +796,6 @@ class SyscallHandler:
             a0: exit status
             
         Returns:
-            Does not return (raises exception)
+            EXIT (execution stops like an EBREAK)
         """
         return self._sys_exit(cpu, memory)
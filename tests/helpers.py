@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the unit tests: loading hand-assembled programs into
+an RV32System and wrapping them in a minimal ELF
+"""
+
+import os
+import struct
+import contextlib
+import io
+
+from pyrv32_system import RV32System
+
+
+BASE = 0x80000000
+
+
+def program_bytes(words):
+    """Little-endian bytes of a list of instruction words"""
+    return b"".join(w.to_bytes(4, 'little') for w in words)
+
+
+def quietly(function, *args, **kwargs):
+    """Call function with its console messages suppressed"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def load_words(words, **options):
+    """Create an RV32System (fs_root /tmp, options passed on) with words loaded at BASE"""
+    sim = quietly(RV32System, fs_root="/tmp", **options)
+    sim.load_binary_data(program_bytes(words))
+    return sim
+
+
+def write_elf(directory, words, name="program.elf"):
+    """Write a minimal RV32 ELF with words as one executable PT_LOAD segment at BASE"""
+    code = program_bytes(words)
+    header = b'\x7fELF' + bytes([1, 1, 1]) + bytes(9) + struct.pack(
+        '<HHIIIIIHHHHHH', 2, 243, 1, BASE, 52, 0, 0, 52, 32, 1, 0, 0, 0)
+    segment = struct.pack('<IIIIIIII', 1, 84, BASE, BASE, len(code), len(code), 5, 4)
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(header + segment + code)
+    return path
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ahead-of-time translation of whole ELFs (aot.py)
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyrv32_system import RV32System
+from aot import translate_elf, module_path
+from block_engine import TIER_SOURCE
+from tests.helpers import BASE, quietly, write_elf
+
+
+# main calls a counting loop, then jumps through a register to code the
+# static walk cannot find
+CALL_PROGRAM = [
+    0x00500513,  # 00: addi x10, x0, 5
+    0x024000ef,  # 04: jal ra, func
+    0x00000297,  # 08: auipc x5, 0             <- return site
+    0x01428293,  # 0c: addi x5, x5, 0x14
+    0x00028067,  # 10: jalr x0, 0(x5)          (indirect: to 0x1c)
+    0x00000013,  # 14: nop
+    0x00000013,  # 18: nop
+    0x00700613,  # 1c: addi x12, x0, 7
+    0x00100073,  # 20: ebreak
+    0x00000013,  # 24: nop
+    0x00a585b3,  # 28: add x11, x11, x10       <- func
+    0xfff50513,  # 2c: addi x10, x10, -1
+    0xfe051ce3,  # 30: bne x10, x0, func
+    0x00008067,  # 34: ret
+]
+
+# Blocks reachable without running: main, return site, loop, ret
+STATIC_BLOCKS = [BASE, BASE + 0x08, BASE + 0x28, BASE + 0x34]
+
+
+def test_translated_blocks_skip_warm_up(runner):
+    """AOT: statically found blocks run generated code at once, the rest falls back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        elf = write_elf(tmp, CALL_PROGRAM)
+        path, count = quietly(translate_elf, elf)
+        if path != module_path(elf) or count != len(STATIC_BLOCKS):
+            runner.test_fail("translate", f"{len(STATIC_BLOCKS)} blocks", f"{count} at {path}")
+
+        sim = quietly(RV32System, fs_root="/tmp", aot=True)
+        info = sim.load_elf(elf)
+        if info['aot_blocks'] != len(STATIC_BLOCKS):
+            runner.test_fail("load", f"{len(STATIC_BLOCKS)} AOT blocks", str(info['aot_blocks']))
+        result = sim.run()
+        regs = sim.cpu.regs
+        if (result.status, regs[11], regs[12]) != ('halted', 15, 7):
+            runner.test_fail("run", "halted, x11=15, x12=7",
+                             f"{result.status}, x11={regs[11]}, x12={regs[12]}")
+
+        engine = sim.block_engine
+        tiers = {start: block.tier for start, block in engine.blocks.items()}
+        expected = dict.fromkeys(STATIC_BLOCKS, TIER_SOURCE)
+        if {start: tiers.get(start) for start in STATIC_BLOCKS} != expected or \
+                engine.blocks_precompiled != len(STATIC_BLOCKS):
+            runner.test_fail("tiers", "source tier for the AOT blocks", str(tiers))
+        # The indirect jump target was translated at run time
+        if tiers.get(BASE + 0x1c) == TIER_SOURCE:
+            runner.test_fail("fallback", "JIT tier for 0x8000001c", str(tiers.get(BASE + 0x1c)))
+
+
+def test_stale_module_ignored(runner):
+    """AOT: a module generated from another image is not used"""
+    with tempfile.TemporaryDirectory() as tmp:
+        elf = write_elf(tmp, CALL_PROGRAM)
+        quietly(translate_elf, elf)
+        # addi x10, x0, 5 -> addi x10, x0, 3 in the same file
+        write_elf(tmp, [0x00300513] + CALL_PROGRAM[1:])
+
+        sim = quietly(RV32System, fs_root="/tmp", aot=True)
+        info = sim.load_elf(elf)
+        result = sim.run()
+        if info['aot_blocks'] != 0 or sim.block_engine.blocks_precompiled != 0:
+            runner.test_fail("stale module", "0 AOT blocks", str(info['aot_blocks']))
+        if result.status != 'halted' or sim.cpu.regs[11] != 6:
+            runner.test_fail("run", "halted, x11=6", f"{result.status}, x11={sim.cpu.regs[11]}")
+
+
+def test_lockstep_with_translated_blocks(runner):
+    """AOT: generated blocks agree with the reference interpreter"""
+    with tempfile.TemporaryDirectory() as tmp:
+        elf = write_elf(tmp, CALL_PROGRAM)
+        quietly(translate_elf, elf)
+        sim = quietly(RV32System, fs_root="/tmp", aot=True)
+        sim.load_elf(elf)
+        result = sim.run_lockstep(1000, unit='blocks')
+        if result.status != 'halted' or sim.divergence is not None:
+            runner.test_fail("lockstep", "halted", f"{result.status}: {result.error}")
+        if sim.block_engine.blocks_precompiled < len(STATIC_BLOCKS):
+            runner.test_fail("precompiled", f">= {len(STATIC_BLOCKS)}",
+                             str(sim.block_engine.blocks_precompiled))
+
+
+def test_module_not_imported_by_default(runner):
+    """AOT: without aot=True a matching module next to the ELF is not imported"""
+    with tempfile.TemporaryDirectory() as tmp:
+        elf = write_elf(tmp, CALL_PROGRAM)
+        quietly(translate_elf, elf)
+        marker = os.path.join(tmp, "imported")
+        with open(module_path(elf), 'a') as f:
+            f.write(f"open({marker!r}, 'w').close()\n")
+
+        sim = quietly(RV32System, fs_root="/tmp")
+        info = sim.load_elf(elf)
+        result = sim.run()
+        if info['aot_blocks'] != 0 or sim.block_engine.blocks_precompiled != 0:
+            runner.test_fail("default", "0 AOT blocks", str(info['aot_blocks']))
+        if os.path.exists(marker):
+            runner.test_fail("import", "module not executed", "module executed")
+        if result.status != 'halted' or sim.cpu.regs[11] != 15:
+            runner.test_fail("run", "halted, x11=15", f"{result.status}, x11={sim.cpu.regs[11]}")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the NumPy batch engine (batch_engine.py)
+"""
+
+import sys
+import os
+import contextlib
+import io
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from batch_engine import NUMPY_AVAILABLE
+from tests.helpers import BASE, load_words, program_bytes
+
+
+# Sums the squares of the console input bytes, storing each partial sum
+SUM_PROGRAM = [
+    0x100012b7,  # 00: lui x5, 0x10001           (console UART)
+    0x00000313,  # 04: addi x6, x0, 0
+    0x80002437,  # 08: lui x8, 0x80002
+    0x0082c383,  # 0c: lbu x7, 8(x5)            <- loop: RX status
+    0x00038e63,  # 10: beq x7, x0, done
+    0x0042c383,  # 14: lbu x7, 4(x5)            RX byte
+    0x027384b3,  # 18: mul x9, x7, x7
+    0x00930333,  # 1c: add x6, x6, x9
+    0x00642023,  # 20: sw x6, 0(x8)
+    0x00440413,  # 24: addi x8, x8, 4
+    0xfe5ff06f,  # 28: jal x0, loop
+    0x00628023,  # 2c: sb x6, 0(x5)             <- done: TX low byte
+    0x00100073,  # 30: ebreak
+]
+
+# Stores to address 0 if the first input byte is 'x'
+FAULT_PROGRAM = [
+    0x100012b7,  # 00: lui x5, 0x10001
+    0x0042c383,  # 04: lbu x7, 4(x5)
+    0x07800413,  # 08: addi x8, x0, 'x'
+    0x00839463,  # 0c: bne x7, x8, +8
+    0x00702023,  # 10: sw x7, 0(x0)
+    0x00100073,  # 14: ebreak
+]
+
+# write(1, BASE + 0x24, 3) then exit(0)
+WRITE_PROGRAM = [
+    0x00100513,  # 00: addi x10, x0, 1
+    0x800005b7,  # 04: lui x11, 0x80000
+    0x02458593,  # 08: addi x11, x11, 0x24
+    0x00300613,  # 0c: addi x12, x0, 3
+    0x04000893,  # 10: addi x17, x0, 64
+    0x00000073,  # 14: ecall
+    0x00000513,  # 18: addi x10, x0, 0
+    0x05d00893,  # 1c: addi x17, x0, 93
+    0x00000073,  # 20: ecall
+]
+
+
+def make_engine(lanes, words):
+    from batch_engine import BatchEngine
+    engine = BatchEngine(lanes, fs_root="/tmp")
+    engine.load_binary_data(program_bytes(words))
+    return engine
+
+
+def test_lanes_match_interpreter(runner):
+    """BatchEngine: diverging lanes end in the interpreter's state"""
+    if not NUMPY_AVAILABLE:
+        return
+    inputs = [b"", b"a", b"hello", b"hello", b"\xff" * 40, b"xyz"]
+    engine = make_engine(len(inputs), SUM_PROGRAM)
+    for lane, data in enumerate(inputs):
+        engine.inject_input(lane, data)
+    results = engine.run()
+
+    for lane, data in enumerate(inputs):
+        sim = load_words(SUM_PROGRAM, engine='interp')
+        sim.inject_console_input(data)
+        expected = sim.run()
+        actual = results[lane]
+        if actual.status != expected.status or \
+                actual.instruction_count != expected.instruction_count:
+            runner.test_fail(f"lane {lane} result",
+                             f"{expected.status}, {expected.instruction_count} instructions",
+                             f"{actual.status}, {actual.instruction_count} instructions")
+        if engine.lane_registers(lane) != sim.cpu.regs[:32]:
+            runner.test_fail(f"lane {lane} registers", str(sim.cpu.regs[:32]),
+                             str(engine.lane_registers(lane)))
+        stored = 4 * len(data)
+        if engine.read_memory(lane, 0x80002000, stored) != sim.memory.read_bytes(0x80002000, stored):
+            runner.test_fail(f"lane {lane} memory", "interpreter's partial sums", "different")
+        total = sum(b * b for b in data)
+        if engine.console_output(lane) != bytes([total & 0xFF]):
+            runner.test_fail(f"lane {lane} output", repr(bytes([total & 0xFF])),
+                             repr(engine.console_output(lane)))
+
+
+def test_copy_on_write_pages(runner):
+    """BatchEngine: lanes share the image and copy only pages they store to"""
+    if not NUMPY_AVAILABLE:
+        return
+    engine = make_engine(3, SUM_PROGRAM)
+    engine.inject_input(1, b"ab")
+    engine.run()
+    if [engine.private_pages(lane) for lane in range(3)] != [0, 1, 0]:
+        runner.test_fail("private pages", "[0, 1, 0]",
+                         str([engine.private_pages(lane) for lane in range(3)]))
+    if engine.read_memory(0, 0x80002000, 4) != bytes(4):
+        runner.test_fail("lane 0 data", "untouched", repr(engine.read_memory(0, 0x80002000, 4)))
+
+    engine.write_memory(2, BASE, program_bytes([0x00100073]))  # ebreak at the entry point
+    if engine.read_memory(0, BASE, 4) != program_bytes(SUM_PROGRAM[:1]):
+        runner.test_fail("shared code", "unchanged for lane 0", "modified")
+
+
+def test_faults_stop_single_lanes(runner):
+    """BatchEngine: a faulting lane stops, the others run to completion"""
+    if not NUMPY_AVAILABLE:
+        return
+    engine = make_engine(3, FAULT_PROGRAM)
+    engine.inject_input(0, b"a")
+    engine.inject_input(1, b"x")
+    results = engine.run()
+    statuses = [result.status for result in results]
+    if statuses != ['halted', 'error', 'halted']:
+        runner.test_fail("statuses", "['halted', 'error', 'halted']", str(statuses))
+    if results[1].error != "Memory fault: store at 0x00000000" or results[1].pc != BASE + 0x10:
+        runner.test_fail("fault", "store at 0x00000000, pc 0x80000010",
+                         f"{results[1].error}, pc 0x{results[1].pc:08x}")
+    if [result.instruction_count for result in results] != [4, 4, 4]:
+        runner.test_fail("counts", "[4, 4, 4]", str([r.instruction_count for r in results]))
+
+
+def test_syscalls_per_lane(runner):
+    """BatchEngine: each lane services its own ECALLs"""
+    if not NUMPY_AVAILABLE:
+        return
+    engine = make_engine(2, WRITE_PROGRAM)
+    engine.write_memory(0, BASE + 0x24, b"one")
+    engine.write_memory(1, BASE + 0x24, b"two")
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = engine.run()
+    outputs = [engine.console_output(lane) for lane in range(2)]
+    if outputs != [b"one", b"two"]:
+        runner.test_fail("outputs", "[b'one', b'two']", str(outputs))
+    if [(r.status, r.instruction_count) for r in results] != [('halted', 8)] * 2:
+        runner.test_fail("exit", "halted after 8 instructions",
+                         str([(r.status, r.instruction_count) for r in results]))
+
+
+def test_wfi_lanes_wait_for_input(runner):
+    """BatchEngine: lanes without input wait at WFI until inject_input"""
+    if not NUMPY_AVAILABLE:
+        return
+    wfi_program = [
+        0x10500073,  # 00: wfi
+        0x100012b7,  # 04: lui x5, 0x10001
+        0x0042c383,  # 08: lbu x7, 4(x5)
+        0x00100073,  # 0c: ebreak
+    ]
+    engine = make_engine(2, wfi_program)
+    engine.inject_input(1, b"b")
+    statuses = [(r.status, r.pc, r.instruction_count) for r in engine.run()]
+    if statuses != [('waiting', BASE, 0), ('halted', BASE + 0xc, 3)]:
+        runner.test_fail("first run", "lane 0 waiting, lane 1 halted", str(statuses))
+
+    engine.inject_input(0, b"a")
+    result = engine.run()[0]
+    if (result.status, result.instruction_count) != ('halted', 3) or engine.lane_registers(0)[7] != 0x61:
+        runner.test_fail("resumed lane", "halted after 3, x7=0x61",
+                         f"{result.status} after {result.instruction_count}")
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the basic-block translator (block_engine.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyrv32_system import RV32System
+from block_engine import TIER_INTERP, TIER_CLOSURE, TIER_SOURCE
+from tests.helpers import BASE, load_words
+
+
+# Loop exercising ALU, M-extension, loads/stores, branches and jumps
+LOOP_PROGRAM = [
+    0x01400093,  # 00: addi x1, x0, 20
+    0xffd00113,  # 04: addi x2, x0, -3
+    0x800012b7,  # 08: lui x5, 0x80001
+    0x00110133,  # 0c: add x2, x2, x1        <- loop
+    0x402001b3,  # 10: sub x3, x0, x2
+    0x4011d213,  # 14: srai x4, x3, 1
+    0x4011d333,  # 18: sra x6, x3, x1
+    0x0021a3b3,  # 1c: slt x7, x3, x2
+    0x02310433,  # 20: mul x8, x2, x3
+    0x021444b3,  # 24: div x9, x8, x1
+    0x003280a3,  # 28: sb x3, 1(x5)
+    0x00029503,  # 2c: lh x10, 0(x5)
+    0x00a2a223,  # 30: sw x10, 4(x5)
+    0x0042a583,  # 34: lw x11, 4(x5)
+    0x00b14133,  # 38: xor x2, x2, x11
+    0xfff08093,  # 3c: addi x1, x1, -1
+    0xfc0096e3,  # 40: bne x1, x0, loop
+    0x0080066f,  # 44: jal x12, +8
+    0x00100073,  # 48: ebreak (skipped)
+    0x00000697,  # 4c: auipc x13, 0
+    0x00100073,  # 50: ebreak
+]
+
+FAULT_PROGRAM = [
+    0x00100093,  # 00: addi x1, x0, 1
+    0x00200113,  # 04: addi x2, x0, 2
+    0x00002183,  # 08: lw x3, 0(x0)  -> fault
+    0x00100073,  # 0c: ebreak
+]
+
+# f is called from the loop and from g, so its return target alternates
+CALL_PROGRAM = [
+    0x00a00413,  # 00: addi s0, x0, 10
+    0x00000513,  # 04: addi a0, x0, 0
+    0x014000ef,  # 08: jal ra, f          <- loop
+    0x018000ef,  # 0c: jal ra, g
+    0xfff40413,  # 10: addi s0, s0, -1
+    0xfe041ae3,  # 14: bne s0, x0, loop
+    0x00100073,  # 18: ebreak
+    0x00150513,  # 1c: f: addi a0, a0, 1
+    0x00008067,  # 20: ret
+    0x00008493,  # 24: g: addi s1, ra, 0
+    0xff5ff0ef,  # 28: jal ra, f
+    0x00350513,  # 2c: addi a0, a0, 3
+    0x00048093,  # 30: addi ra, s1, 0
+    0x00008067,  # 34: ret
+]
+
+# (warm_threshold, hot_threshold) combinations covering every tier
+TIER_CONFIGS = [(0, None), (0, 0), (100, None), (2, 5)]
+
+
+def test_block_engine_matches_interpreter(runner):
+    """BlockEngine: final state matches the reference interpreter in every tier"""
+    ref = load_words(LOOP_PROGRAM, engine='interp')
+    ref_result = ref.run()
+
+    for warm, hot in TIER_CONFIGS:
+        sim = load_words(LOOP_PROGRAM, engine='block', warm_threshold=warm, hot_threshold=hot)
+        result = sim.run()
+        config = f"warm={warm} hot={hot}"
+
+        if (result.status, result.instruction_count, result.pc) != \
+                (ref_result.status, ref_result.instruction_count, ref_result.pc):
+            runner.test_fail(f"block engine result ({config})",
+                             f"{ref_result.status} {ref_result.instruction_count} {ref_result.pc:#x}",
+                             f"{result.status} {result.instruction_count} {result.pc:#x}")
+        if sim.cpu.regs[:32] != ref.cpu.regs[:32]:
+            runner.test_fail(f"block engine registers ({config})", str(ref.cpu.regs), str(sim.cpu.regs))
+        if sim.read_memory(0x80001000, 8) != ref.read_memory(0x80001000, 8):
+            runner.test_fail(f"block engine memory ({config})", ref.read_memory(0x80001000, 8).hex(),
+                             sim.read_memory(0x80001000, 8).hex())
+        if sim.block_engine.blocks_translated == 0:
+            runner.test_fail(f"block engine used ({config})", "blocks translated", "none")
+
+
+def test_block_tier_promotion(runner):
+    """BlockEngine: blocks move up a tier when their hit count reaches the thresholds"""
+    sim = load_words(LOOP_PROGRAM, engine='block', warm_threshold=2, hot_threshold=5)
+    engine = sim.block_engine
+
+    sim.run(max_steps=17)  # First block once
+    if engine.blocks[BASE].tier != TIER_INTERP:
+        runner.test_fail("cold tier", TIER_INTERP, engine.blocks[BASE].tier)
+
+    sim.run(max_steps=14 * 2)  # Loop block twice more
+    loop = engine.blocks[BASE + 0x0c]
+    if (loop.hits, loop.tier) != (2, TIER_CLOSURE):
+        runner.test_fail("warm tier", f"2 hits, tier {TIER_CLOSURE}", f"{loop.hits} hits, tier {loop.tier}")
+
+    sim.run()
+    if loop.tier != TIER_SOURCE:
+        runner.test_fail("hot tier", TIER_SOURCE, loop.tier)
+
+
+def test_block_boundaries(runner):
+    """BlockEngine: a block runs up to and including its branch"""
+    sim = load_words(LOOP_PROGRAM, engine='block')
+    block = sim.block_engine.translate(BASE)
+
+    if block.start != BASE or block.end != BASE + 0x44 or block.count != 17:
+        runner.test_fail("block boundaries", "0x80000000-0x80000044, 17 insns", repr(block))
+
+    # A block cannot start on an instruction that needs the host
+    if sim.block_engine.translate(BASE + 0x50) is not None:
+        runner.test_fail("ebreak block", "None", "translated block")
+
+
+def test_block_chaining(runner):
+    """BlockEngine: blocks link to their successors and re-link after retranslation"""
+    sim = load_words(LOOP_PROGRAM, engine='block')
+    sim.run()
+    engine = sim.block_engine
+    loop = engine.blocks[BASE + 0x0c]
+
+    if loop.taken is not loop or loop.fallthrough is not engine.blocks[BASE + 0x44]:
+        runner.test_fail("block links", "loop -> loop, loop -> 0x80000044",
+                         f"{loop.taken!r}, {loop.fallthrough!r}")
+
+    # Rewrite the first loop instruction with itself: the block is retranslated
+    sim.write_memory(BASE + 0x0c, (0x00110133).to_bytes(4, 'little'))
+    if loop.valid:
+        runner.test_fail("block invalidated", "valid=False", "valid=True")
+
+    sim.cpu.pc = BASE
+    sim.cpu.regs[:32] = [0] * 32
+    sim.run()
+    new_loop = engine.blocks[BASE + 0x0c]
+    if new_loop is loop or new_loop.taken is not new_loop or engine.blocks[BASE].taken is not new_loop:
+        runner.test_fail("block re-link", "links point at the retranslated block", "stale links")
+
+
+def test_return_address_stack(runner):
+    """BlockEngine: returns follow the caller's link predicted by the return stack"""
+    ref = load_words(CALL_PROGRAM, engine='interp')
+    ref.run()
+    for warm, hot in TIER_CONFIGS:
+        sim = load_words(CALL_PROGRAM, engine='block', warm_threshold=warm, hot_threshold=hot)
+        result = sim.run()
+        config = f"warm={warm} hot={hot}"
+
+        if result.status != 'halted' or sim.cpu.regs[:32] != ref.cpu.regs[:32]:
+            runner.test_fail(f"RAS result ({config})", f"halted, a0={ref.cpu.regs[10]}",
+                             f"{result.status}, a0={sim.cpu.regs[10]}")
+        stats = sim.block_engine.ras_stats()
+        if stats != {'hits': 30, 'misses': 0, 'depth': 0}:
+            runner.test_fail(f"RAS stats ({config})", "30 hits, 0 misses, depth 0", str(stats))
+
+    # The call blocks in the loop and in g
+    callers = sim.block_engine.blocks[BASE + 0x08], sim.block_engine.blocks[BASE + 0x24]
+    if any(caller.ret is not sim.block_engine.blocks[caller.end] for caller in callers):
+        runner.test_fail("RAS links", "callers link to their return sites", "missing link")
+
+
+def test_return_address_stack_resync(runner):
+    """BlockEngine: a return the stack did not predict discards the stale entries above it"""
+    sim = load_words(CALL_PROGRAM, engine='block')
+    sim.run()
+    engine = sim.block_engine
+
+    # f returns to 0x0c, but a call to g was pushed without returning
+    engine.return_stack.extend([engine.blocks[BASE + 0x08], engine.blocks[BASE + 0x0c]])
+    sim.cpu.pc = BASE + 0x1c
+    sim.cpu.regs[1] = BASE + 0x0c
+    sim.cpu.regs[8] = 1
+    result = sim.run()
+
+    stats = engine.ras_stats()
+    if result.status != 'halted' or (stats['hits'], stats['misses'], stats['depth']) != (32, 1, 0):
+        runner.test_fail("RAS resync", "halted, 32 hits, 1 miss, depth 0",
+                         f"{result.status}, {stats}")
+
+
+def test_block_max_steps(runner):
+    """BlockEngine: run() stops exactly at max_steps"""
+    for steps in (1, 5, 17, 40):
+        ref = load_words(LOOP_PROGRAM, engine='interp')
+        sim = load_words(LOOP_PROGRAM, engine='block')
+        ref_result = ref.run(max_steps=steps)
+        result = sim.run(max_steps=steps)
+        if result.instruction_count != steps or sim.cpu.pc != ref.cpu.pc or sim.cpu.regs[:32] != ref.cpu.regs[:32]:
+            runner.test_fail(f"block max_steps={steps}",
+                             f"{ref_result.instruction_count} insns, pc={ref.cpu.pc:#x}",
+                             f"{result.instruction_count} insns, pc={sim.cpu.pc:#x}")
+
+
+def test_block_fault_exact_count(runner):
+    """BlockEngine: a fault mid-block reports the faulting PC and executed count"""
+    for warm, hot in TIER_CONFIGS:
+        sim = load_words(FAULT_PROGRAM, engine='block', warm_threshold=warm, hot_threshold=hot)
+        result = sim.run()
+        config = f"warm={warm} hot={hot}"
+
+        if result.status != 'error' or result.pc != BASE + 8 or result.instruction_count != 2:
+            runner.test_fail(f"block fault ({config})", "error at 0x80000008 after 2 insns",
+                             f"{result.status} at {result.pc:#x} after {result.instruction_count} insns")
+        if sim.cpu.regs[1] != 1 or sim.cpu.regs[2] != 2:
+            runner.test_fail(f"block fault registers ({config})", "x1=1 x2=2",
+                             f"x1={sim.cpu.regs[1]} x2={sim.cpu.regs[2]}")
+
+
+def test_block_invalidated_by_store(runner):
+    """BlockEngine: rewriting code inside a translated block drops the block"""
+    sim = load_words(LOOP_PROGRAM, engine='block')
+    sim.run()
+    if BASE not in sim.block_engine.blocks:
+        runner.test_fail("block cached", "block at 0x80000000", "missing")
+
+    # addi x1, x0, 20 -> addi x1, x0, 1 (single iteration)
+    sim.write_memory(BASE, (0x00100093).to_bytes(4, 'little'))
+    if BASE in sim.block_engine.blocks:
+        runner.test_fail("block invalidate", "block dropped", "block still cached")
+
+    sim.cpu.pc = BASE
+    sim.run()
+    if sim.cpu.regs[1] != 0 or sim.cpu.regs[13] != BASE + 0x4c:
+        runner.test_fail("rewritten block", "x1=0 x13=0x8000004c",
+                         f"x1={sim.cpu.regs[1]} x13={sim.cpu.regs[13]:#x}")
+
+
+def test_block_engine_defers_to_breakpoints(runner):
+    """RV32System: breakpoints still stop a block-engine run"""
+    sim = load_words(LOOP_PROGRAM, engine='block')
+    sim.add_breakpoint(BASE + 0x44)
+    result = sim.run()
+
+    if result.status != 'breakpoint' or result.pc != BASE + 0x44:
+        runner.test_fail("block breakpoint", "breakpoint at 0x80000044",
+                         f"{result.status} at {result.pc:#x}")
+
+
+def test_unknown_engine_rejected(runner):
+    """RV32System: unknown engine names raise ValueError"""
+    try:
+        RV32System(fs_root="/tmp", engine='jit')
+    except ValueError:
+        return
+    runner.test_fail("unknown engine", "ValueError", "no exception")
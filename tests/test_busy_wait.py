@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for RX status poll-loop detection (busy_wait.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from decoder import decode_instruction
+from busy_wait import match_rx_poll_loop
+from tests.helpers import BASE, load_words
+
+
+# stdin_read's wait for the first byte, then read it
+POLL_PROGRAM = [
+    0x10001737,  # 00: lui a4, 0x10001
+    0x00874783,  # 04: lbu a5, 8(a4)      <- poll loop
+    0x0017f793,  # 08: andi a5, a5, 1
+    0xfe078ce3,  # 0c: beqz a5, poll loop
+    0x00474503,  # 10: lbu a0, 4(a4)
+    0x00100073,  # 14: ebreak
+]
+
+# Sums every input byte into a1, polling between bytes
+SUM_PROGRAM = POLL_PROGRAM[:5] + [
+    0x00a585b3,  # 14: add a1, a1, a0
+    0xfedff06f,  # 18: j poll loop
+]
+
+
+def as_block(words, start=BASE + 4):
+    """Block instruction tuples (pc, handler, decoded) for words at start"""
+    return tuple((start + 4 * i, None, decode_instruction(w)) for i, w in enumerate(words))
+
+
+def test_idle_poll_skipped(runner):
+    """RV32System.run: an idle RX poll loop is fast-forwarded and reported as elided"""
+    ref, sim = load_words(POLL_PROGRAM, engine='interp'), load_words(POLL_PROGRAM)
+    ref_result = ref.run(max_steps=1000)
+    result = sim.run(max_steps=1000)
+
+    if (result.status, result.pc) != ('waiting', BASE + 4):
+        runner.test_fail("idle poll status", "waiting at 0x80000004", f"{result.status} at {result.pc:#x}")
+    if result.instruction_count + result.elided != ref_result.instruction_count:
+        runner.test_fail("idle poll accounting", f"{ref_result.instruction_count} executed + elided",
+                         f"{result.instruction_count} + {result.elided}")
+    if sim.instruction_count != result.instruction_count or sim.elided_instructions != result.elided:
+        runner.test_fail("idle poll counters", f"{result.instruction_count} / {result.elided}",
+                         f"{sim.instruction_count} / {sim.elided_instructions}")
+    if sim.cpu.regs[:32] != ref.cpu.regs[:32] or sim.cpu.pc != ref.cpu.pc:
+        runner.test_fail("idle poll state", f"pc={ref.cpu.pc:#x} {ref.cpu.regs}",
+                         f"pc={sim.cpu.pc:#x} {sim.cpu.regs}")
+
+
+def test_poll_resumes_on_input(runner):
+    """RV32System.run: the poll loop runs normally once input is pending"""
+    sim = load_words(POLL_PROGRAM)
+    sim.run(max_steps=1000)
+    sim.inject_console_input("x")
+    result = sim.run(max_steps=1000)
+
+    if result.status != 'halted' or sim.cpu.regs[10] != ord('x') or result.elided:
+        runner.test_fail("poll with input", "halted, a0='x', nothing elided",
+                         f"{result.status}, a0={sim.cpu.regs[10]:#x}, elided={result.elided}")
+
+
+def test_input_helpers_use_idle_polls(runner):
+    """run_until_input_consumed/run_until_idle: stop at the idle poll loop without a watchpoint"""
+    sim = load_words(SUM_PROGRAM)
+    sim.inject_console_input(b"abc")
+    result = sim.run_until_input_consumed(100000)
+    if (result.status, result.pc) != ('halted', BASE + 4) or result.elided == 0 or \
+            sim.cpu.regs[11] != sum(b"abc"):
+        runner.test_fail("input consumed", f"halted at poll loop, elided > 0, a1={sum(b'abc')}",
+                         f"{result.status} at {result.pc:#x}, {result.elided} elided, a1={sim.cpu.regs[11]}")
+    if result.instruction_count + result.elided != 100000 or sim.memory.read_watchpoints:
+        runner.test_fail("accounting", "budget spent, no watchpoint",
+                         f"{result.instruction_count} + {result.elided}, {sim.memory.read_watchpoints}")
+
+    sim.inject_console_input(b"d")
+    result = sim.run_until_idle(100000, min_instructions=5)
+    if (result.status, result.pc) != ('halted', BASE + 4) or result.elided == 0 or \
+            sim.cpu.regs[11] != sum(b"abcd"):
+        runner.test_fail("idle", "halted at poll loop, elided > 0",
+                         f"{result.status} at {result.pc:#x}, {result.elided} elided")
+    # Already idle: fewer than min_instructions run before the poll
+    result = sim.run_until_idle(100000, min_instructions=5)
+    if result.status != 'waiting' or result.instruction_count != 0:
+        runner.test_fail("still idle", "waiting after 0", f"{result.status} after {result.instruction_count}")
+
+
+def test_small_budget_not_elided(runner):
+    """RV32System.run: a budget shorter than one iteration executes normally"""
+    sim = load_words(POLL_PROGRAM)
+    result = sim.run(max_steps=6)
+    if (result.status, result.instruction_count, result.elided) != ('max_steps', 6, 0):
+        runner.test_fail("small budget", "max_steps, 6 insns, 0 elided",
+                         f"{result.status}, {result.instruction_count} insns, {result.elided} elided")
+
+
+def test_poll_loop_shapes(runner):
+    """match_rx_poll_loop: accepts load/mask/branch loops, rejects loops with other effects"""
+    loop = match_rx_poll_loop(as_block(POLL_PROGRAM[1:4]))
+    if loop is None or (loop.head, loop.count, loop.base_reg, loop.written) != (BASE + 4, 3, 14, (15, 15)):
+        runner.test_fail("poll loop", "head 0x80000004, 3 insns, base a4", repr(loop))
+
+    rejected = {
+        "writes its base register": [0x00874703, 0x00177793, 0xfe078ce3],  # lbu a4, 8(a4)
+        "stores": [0x00874783, 0x00f70023, 0xfe078ce3],                     # sb a5, 0(a4)
+        "exits while zero": [0x00874783, 0x0017f793, 0xfe079ce3],           # bnez a5
+    }
+    for name, words in rejected.items():
+        if match_rx_poll_loop(as_block(words)) is not None:
+            runner.test_fail(f"poll loop that {name}", "None", "PollLoop")
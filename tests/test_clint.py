@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit tests for CLINT timer interrupts, trap entry and Zicsr (clint.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cpu import RV32CPU, CSR_MSTATUS, CSR_MTVEC, CSR_MEPC, MSTATUS_MIE, MSTATUS_MPIE
+from memory import Memory
+from execute import execute_instruction
+from tests.helpers import BASE, load_words
+
+
+CLOCK_MHZ = 10  # 1 mtime tick per cycle
+
+# Arms mtimecmp = 1000, enables the timer interrupt and waits in WFI; the
+# handler at 0x40 counts the interrupt in x10, disarms the timer and
+# records mcause/mepc in x11/x12
+WFI_PROGRAM = [
+    0x020042b7,  # 00: lui x5, 0x02004           (mtimecmp)
+    0x3e800313,  # 04: addi x6, x0, 1000
+    0x0062a023,  # 08: sw x6, 0(x5)
+    0x0002a223,  # 0c: sw x0, 4(x5)
+    0x800003b7,  # 10: lui x7, 0x80000
+    0x04038393,  # 14: addi x7, x7, 0x40
+    0x30539073,  # 18: csrw mtvec, x7
+    0x08000413,  # 1c: addi x8, x0, 0x80         (MTIE)
+    0x30442073,  # 20: csrs mie, x8
+    0x30046073,  # 24: csrsi mstatus, 8          (MIE)
+    0x10500073,  # 28: wfi                       <- sleep
+    0xfe050ee3,  # 2c: beq x10, x0, sleep
+    0x00100073,  # 30: ebreak
+    0x00000013,  # 34: nop
+    0x00000013,  # 38: nop
+    0x00000013,  # 3c: nop
+    0x00150513,  # 40: addi x10, x10, 1          <- handler
+    0xfff00313,  # 44: addi x6, x0, -1
+    0x0062a223,  # 48: sw x6, 4(x5)              (disarm)
+    0x342025f3,  # 4c: csrr x11, mcause
+    0x34102673,  # 50: csrr x12, mepc
+    0x30200073,  # 54: mret
+]
+
+# Same, but spins on "beq x10, x0, 0" and the deadline is 500
+SPIN_PROGRAM = list(WFI_PROGRAM)
+SPIN_PROGRAM[1] = 0x1f400313   # 04: addi x6, x0, 500
+SPIN_PROGRAM[10] = 0x00050063  # 28: beq x10, x0, 0    <- spin
+
+# Same, but polls the console RX status (no input arrives) instead of a WFI
+POLL_PROGRAM = WFI_PROGRAM[:10] + [
+    0x10001737,  # 28: lui x14, 0x10001
+    0x00874783,  # 2c: lbu x15, 8(x14)         <- poll
+    0x0017f793,  # 30: andi x15, x15, 1
+    0xfe078ce3,  # 34: beq x15, x0, poll
+    0x00100073,  # 38: ebreak
+    0x00000013,  # 3c: nop
+] + WFI_PROGRAM[16:]
+
+
+def test_csr_instructions_and_mret(runner):
+    """Zicsr: read-modify-write forms return the old value; MRET restores MIE"""
+    cpu = RV32CPU()
+    mem = Memory()
+    cpu.pc = BASE
+    cpu.csrs[CSR_MTVEC] = BASE
+    cpu.regs[11] = BASE + 0x100
+    cpu.regs[13] = 1
+    for insn in (0x30559573,   # csrrw x10, mtvec, x11
+                 0x3056a673,   # csrrs x12, mtvec, x13
+                 0x3050f773):  # csrrci x14, mtvec, 1
+        execute_instruction(cpu, mem, insn)
+    if (cpu.regs[10], cpu.regs[12], cpu.regs[14]) != (BASE, BASE + 0x100, BASE + 0x101):
+        runner.test_fail("old values", "0x80000000, 0x80000100, 0x80000101",
+                         ", ".join(f"0x{cpu.regs[r]:08x}" for r in (10, 12, 14)))
+    if cpu.csrs[CSR_MTVEC] != BASE + 0x100 or cpu.pc != BASE + 12:
+        runner.test_fail("mtvec", "0x80000100", f"0x{cpu.csrs[CSR_MTVEC]:08x}")
+
+    cpu.csrs[CSR_MSTATUS] = MSTATUS_MPIE
+    cpu.csrs[CSR_MEPC] = BASE + 0x40
+    execute_instruction(cpu, mem, 0x30200073)  # mret
+    if cpu.pc != BASE + 0x40 or not cpu.csrs[CSR_MSTATUS] & MSTATUS_MIE:
+        runner.test_fail("mret", "pc 0x80000040, MIE set",
+                         f"pc 0x{cpu.pc:08x}, mstatus 0x{cpu.csrs[CSR_MSTATUS]:08x}")
+
+
+def test_wfi_sleeps_until_timer_interrupt(runner):
+    """CLINT: WFI skips virtual time to mtimecmp and the interrupt traps to mtvec"""
+    for engine in ('interp', 'block'):
+        sim = load_words(WFI_PROGRAM, engine=engine, clock_mhz=CLOCK_MHZ)
+        result = sim.run(10000)
+        regs = sim.cpu.regs
+        if (result.status, result.instruction_count) != ('halted', 18):
+            runner.test_fail(f"{engine} result", "halted after 18",
+                             f"{result.status} after {result.instruction_count}: {result.error}")
+        if (regs[10], regs[11], regs[12]) != (1, 0x80000007, BASE + 0x2c):
+            runner.test_fail(f"{engine} trap", "x10=1, mcause=0x80000007, mepc=0x8000002c",
+                             f"x10={regs[10]}, mcause=0x{regs[11]:08x}, mepc=0x{regs[12]:08x}")
+        if sim.memory.clint.mtime() < 1000 or sim.interrupts_taken != 1:
+            runner.test_fail(f"{engine} time", "mtime >= 1000, 1 interrupt",
+                             f"{sim.memory.clint.mtime()}, {sim.interrupts_taken}")
+
+
+def test_timer_interrupts_busy_loop_at_deadline(runner):
+    """CLINT: the interrupt arrives at the same instruction on every engine and slicing"""
+    counts = []
+    for engine, slice_size in (('interp', 10000), ('block', 10000), ('block', 7)):
+        sim = load_words(SPIN_PROGRAM, engine=engine, clock_mhz=CLOCK_MHZ)
+        executed = 0
+        while True:
+            result = sim.run(slice_size)
+            executed += result.instruction_count
+            if result.status != 'max_steps':
+                break
+        counts.append((result.status, executed, sim.cpu.regs[12]))
+    # 500 instructions until mtime reaches mtimecmp, 6 in the handler, 2 beqs
+    if counts != [('halted', 508, BASE + 0x28)] * 3:
+        runner.test_fail("deadline", "halted after 508, mepc 0x80000028 everywhere", str(counts))
+
+    sim = load_words(SPIN_PROGRAM, clock_mhz=CLOCK_MHZ)
+    result = sim.run_lockstep(10000)
+    if result.status != 'halted' or sim.divergence is not None:
+        runner.test_fail("lockstep", "halted", f"{result.status}: {result.error}")
+
+
+def test_timer_interrupts_elided_poll_loop_at_deadline(runner):
+    """CLINT: idle RX poll elision stops at the timer deadline and takes the interrupt"""
+    ref = load_words(POLL_PROGRAM, engine='interp', clock_mhz=CLOCK_MHZ)
+    ref_result = ref.run(100000)
+    sim = load_words(POLL_PROGRAM, clock_mhz=CLOCK_MHZ)
+    result = sim.run(100000)
+
+    if (result.status, sim.interrupts_taken) != ('waiting', 1) or result.elided == 0:
+        runner.test_fail("status", "waiting after 1 interrupt, iterations elided",
+                         f"{result.status} after {sim.interrupts_taken}, {result.elided} elided")
+    # Trapped in the same poll instruction as the interpreter
+    if (sim.cpu.regs[10], sim.cpu.regs[11], sim.cpu.regs[12]) != (1, 0x80000007, ref.cpu.regs[12]):
+        runner.test_fail("trap", f"x10=1, mcause=0x80000007, mepc=0x{ref.cpu.regs[12]:08x}",
+                         f"x10={sim.cpu.regs[10]}, mcause=0x{sim.cpu.regs[11]:08x}, "
+                         f"mepc=0x{sim.cpu.regs[12]:08x}")
+    total = result.instruction_count + result.elided
+    if ref_result.instruction_count != 100000 or not 100000 - 3 < total <= 100000:
+        runner.test_fail("budget", "100000 executed or elided",
+                         f"{result.instruction_count} + {result.elided}")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Unit tests for deterministic virtual time (clock.py)
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from memory import Memory
+from clock import VirtualClock, DEFAULT_EPOCH
+from tests.helpers import load_words
+
+
+# Sum the nanosecond register over four loop iterations, then read the
+# millisecond and seconds registers
+CLOCK_PROGRAM = [
+    0x100007b7,  # 00: lui a5, 0x10000
+    0x00400093,  # 04: addi x1, x0, 4
+    0x00c7a503,  # 08: lw a0, 12(a5)         <- loop
+    0x00a585b3,  # 0c: add a1, a1, a0
+    0xfff08093,  # 10: addi x1, x1, -1
+    0xfe009ae3,  # 14: bne x1, x0, loop
+    0x0047a603,  # 18: lw a2, 4(a5)
+    0x0087a683,  # 1c: lw a3, 8(a5)
+    0x00100073,  # 20: ebreak
+]
+
+
+def test_virtual_time_from_instruction_count(runner):
+    """VirtualClock: registers follow the retired instruction count in every engine and tier"""
+    # ns reads retire after 2, 6, 10 and 14 instructions; ms after 18
+    expected = ((2 + 6 + 10 + 14) * 1_000_000, 18, DEFAULT_EPOCH)
+    configs = [('interp', {}), ('block', {'warm_threshold': 0, 'hot_threshold': None}),
+               ('block', {'warm_threshold': 0, 'hot_threshold': 0})]
+    for engine, options in configs:
+        sim = load_words(CLOCK_PROGRAM, engine=engine, clock_mhz=0.001, **options)
+        sim.run()
+        got = tuple(sim.cpu.regs[11:14])
+        if got != expected:
+            runner.test_fail(f"virtual time ({engine} {options})", str(expected), str(got))
+
+
+def test_clock_word_read_is_latched(runner):
+    """Memory.read_word: samples each timer register once per word"""
+    samples = []
+
+    class CountingClock:
+        def read_register(self, address):
+            samples.append(address)
+            return 0x01020304 * len(samples)
+
+    mem = Memory()
+    mem.clock = CountingClock()
+    value = mem.read_word(Memory.CLOCK_NSEC_ADDR)
+    if value != 0x01020304 or samples != [Memory.CLOCK_NSEC_ADDR]:
+        runner.test_fail("latched word read", "0x01020304 from 1 sample",
+                         f"0x{value:08x} from {len(samples)} samples")
+
+    # Separate byte reads sample again
+    mem.read_byte(Memory.TIMER_ADDR)
+    mem.read_byte(Memory.TIMER_ADDR + 1)
+    if len(samples) != 3:
+        runner.test_fail("byte reads", "one sample per byte", f"{len(samples) - 1} samples")
+
+
+def test_fast_forward_and_reset(runner):
+    """VirtualClock: fast-forwarded instructions count as time; reset restarts it"""
+    clock = VirtualClock(2, lambda: 1000)  # 1000 instructions at 2 MHz = 500 us
+    clock.fast_forward(3000)
+    if clock.elapsed_ns() != 2_000_000 or clock.read_register(Memory.TIMER_ADDR) != 2:
+        runner.test_fail("fast_forward", "2 ms", f"{clock.elapsed_ns()} ns")
+
+    sim = load_words(CLOCK_PROGRAM, engine='block', clock_mhz=0.001)
+    sim.run()
+    sim.reset()
+    if sim.memory.clock is None or sim.memory.clock.cycles() != 0:
+        runner.test_fail("clock after reset", "virtual clock at 0", repr(sim.memory.clock))
+
+
+def test_host_timer_counts_from_load(runner):
+    """Memory: the host-time ms timer counts from load_program, not the first MMIO access"""
+    mem = Memory()
+    mem.load_program(0x80000000, bytes(16))
+    time.sleep(0.05)
+    mem.read_word(0x80000000)  # RAM fast path
+    elapsed = mem.read_word(Memory.TIMER_ADDR)
+    if not 40 <= elapsed < 10000:
+        runner.test_fail("ms timer after 50 ms", "about 50", str(elapsed))
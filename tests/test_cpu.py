@@ -13,7 +13,7 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from cpu import RV32CPU
+from cpu import RV32CPU, X0_SINK
 
 
 def test_x0_hardwired_to_zero_read(runner):
@@ -155,3 +155,19 @@ def test_all_registers_accessible(runner):
         if result != expected:
             runner.test_fail(f"Register x{i} access",
                            f"0x{expected:08x}", f"0x{result:08x}")
+
+
+def test_x0_writes_go_to_sink(runner):
+    """Instructions writing x0 store into the sink slot; regs[0] stays zero"""
+    from memory import Memory
+    from execute import execute_instruction
+    cpu = RV32CPU()
+    cpu.pc = 0x80000000
+    # jal x0, 8; lui x0, 0x12345; addi x0, x0, 5
+    for insn in (0x0080006f, 0x12345037, 0x00500013):
+        execute_instruction(cpu, Memory(), insn)
+    runner.log(f"  regs[0] = 0x{cpu.regs[0]:08x}, regs[X0_SINK] = 0x{cpu.regs[X0_SINK]:08x}")
+    if cpu.regs[0] != 0 or cpu.read_reg(0) != 0:
+        runner.test_fail("x0 after writes", "0x00000000", f"0x{cpu.regs[0]:08x}")
+    if len(cpu.regs) != X0_SINK + 1 or any(cpu.regs[1:32]):
+        runner.test_fail("x0 sink layout", "x1-x31 untouched", str(cpu.regs))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the DecodedInsn record returned by decode_instruction()
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from decoder import decode_instruction, DecodedInsn
+
+
+def test_decoded_insn_fields(runner):
+    """DecodedInsn: fields read the same as attributes and as dict keys"""
+    d = decode_instruction(0x00c58533)  # add x10, x11, x12
+    expected = {'opcode': 0b0110011, 'rd': 10, 'funct3': 0, 'rs1': 11, 'rs2': 12,
+                'funct7': 0, 'imm': 0, 'format': 'R', 'raw': 0x00c58533, 'name': 'ADD'}
+
+    if d.to_dict() != expected:
+        runner.test_fail("DecodedInsn fields", str(expected), str(d.to_dict()))
+    for key, value in expected.items():
+        if d[key] != value or getattr(d, key) != value:
+            runner.test_fail(f"DecodedInsn {key}", str(value), f"{d[key]} / {getattr(d, key)}")
+    if 'rd' not in d or 'bogus' in d or d.get('bogus', 7) != 7:
+        runner.test_fail("DecodedInsn membership", "rd only", "unexpected membership")
+
+    try:
+        d['bogus']
+    except KeyError:
+        pass
+    else:
+        runner.test_fail("DecodedInsn missing key", "KeyError", "no exception")
+
+
+def test_decode_is_memoized(runner):
+    """decode_instruction: the same word decodes to one shared DecodedInsn"""
+    first = decode_instruction(0xfff08093)   # addi x1, x1, -1
+    second = decode_instruction(0xfff08093)
+    if not isinstance(first, DecodedInsn) or first is not second:
+        runner.test_fail("decode memo", "same DecodedInsn object", f"{first!r} / {second!r}")
+
+    # Words beyond 32 bits are masked before the lookup
+    if decode_instruction(0x1_fff08093) is not first:
+        runner.test_fail("decode memo masking", "same object for masked word", "new object")
+
+
+def test_decode_unknown_not_cached(runner):
+    """decode_instruction: unsupported words raise on every decode"""
+    for _ in range(2):
+        try:
+            decode_instruction(0x10200073)  # sret
+        except NotImplementedError:
+            continue
+        runner.test_fail("unknown instruction", "NotImplementedError", "decoded")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the (opcode, funct3, funct7) dispatch tables in
+decoder.py and execute.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from decoder import decode_instruction, dispatch_key, DISPATCH_MASK, INSTRUCTION_NAMES
+from execute import select_handler, DISPATCH_TABLE, HANDLERS_BY_NAME, exec_system
+
+
+def test_dispatch_key_matches_instruction_bits(runner):
+    """dispatch_key: equals the funct7/funct3/opcode bits of the instruction word"""
+    insn = 0x4011d213  # srai x4, x3, 1
+    d = decode_instruction(insn)
+    key = dispatch_key(d['opcode'], d['funct3'], d['funct7'])
+    if key != insn & DISPATCH_MASK:
+        runner.test_fail("dispatch_key", f"0x{insn & DISPATCH_MASK:08x}", f"0x{key:08x}")
+
+
+def test_every_named_encoding_has_handler(runner):
+    """DISPATCH_TABLE: every decodable encoding maps to the handler for its name"""
+    for key, name in INSTRUCTION_NAMES.items():
+        if DISPATCH_TABLE.get(key) is not HANDLERS_BY_NAME[name]:
+            runner.test_fail("dispatch coverage", f"{name} handler at 0x{key:08x}",
+                             str(DISPATCH_TABLE.get(key)))
+
+
+def test_select_handler_specializes(runner):
+    """select_handler: ADD/SUB and SRLI/SRAI resolve to distinct handlers"""
+    add = select_handler(decode_instruction(0x002081b3))   # add x3, x1, x2
+    sub = select_handler(decode_instruction(0x402081b3))   # sub x3, x1, x2
+    srli = select_handler(decode_instruction(0x0011d213))  # srli x4, x3, 1
+    srai = select_handler(decode_instruction(0x4011d213))  # srai x4, x3, 1
+
+    if add is not HANDLERS_BY_NAME['ADD'] or sub is not HANDLERS_BY_NAME['SUB']:
+        runner.test_fail("ADD/SUB dispatch", "_exec_add/_exec_sub", f"{add.__name__}/{sub.__name__}")
+    if srli is not HANDLERS_BY_NAME['SRLI'] or srai is not HANDLERS_BY_NAME['SRAI']:
+        runner.test_fail("SRLI/SRAI dispatch", "_exec_srli/_exec_srai", f"{srli.__name__}/{srai.__name__}")
+
+
+def test_system_dispatch(runner):
+    """select_handler: ECALL/EBREAK share exec_system; other SYSTEM encodings are rejected"""
+    for insn in (0x00000073, 0x00100073):
+        if select_handler(decode_instruction(insn)) is not exec_system:
+            runner.test_fail("system dispatch", "exec_system", f"0x{insn:08x}")
+
+    try:
+        decode_instruction(0x10200073)  # sret
+    except NotImplementedError:
+        return
+    runner.test_fail("sret decode", "NotImplementedError", "decoded")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test WFI instruction
+WFI idles the simulator until console input arrives
+"""
+
+import sys
+import os
+import contextlib
+import io
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cpu import RV32CPU
+from memory import Memory
+from execute import execute_instruction
+from decoder import decode_instruction
+from tests.helpers import load_words
+
+
+# Reads one console byte into x7 once input is available
+WFI_PROGRAM = [
+    0x10500073,  # 00: wfi
+    0x100012b7,  # 04: lui x5, 0x10001
+    0x0042c383,  # 08: lbu x7, 4(x5)
+    0x00100073,  # 0c: ebreak
+]
+
+# stdin_read: poll the RX status, sleep in WFI while it is empty
+POLL_WFI_PROGRAM = [
+    0x100012b7,  # 00: lui x5, 0x10001
+    0x0082c303,  # 04: lbu x6, 8(x5)           <- poll
+    0x00137313,  # 08: andi x6, x6, 1
+    0x00031663,  # 0c: bne x6, x0, read
+    0x10500073,  # 10: wfi
+    0xff1ff06f,  # 14: jal x0, poll
+    0x0042c383,  # 18: lbu x7, 4(x5)           <- read
+    0x00100073,  # 1c: ebreak
+]
+
+
+def test_wfi_reference_is_nop(runner):
+    """WFI: decodes by imm and completes at once in execute_instruction"""
+    decoded = decode_instruction(0x10500073)
+    if decoded['name'] != 'WFI':
+        runner.test_fail("WFI name", "WFI", decoded['name'])
+
+    cpu = RV32CPU()
+    mem = Memory()
+    cpu.pc = 0x80000100
+    if execute_instruction(cpu, mem, 0x10500073) is not True or cpu.pc != 0x80000104:
+        runner.test_fail("WFI", "True, PC 0x80000104", f"PC 0x{cpu.pc:08x}")
+
+
+def test_wfi_waits_for_input(runner):
+    """WFI: a run stops 'waiting' on the WFI and resumes after input"""
+    for engine in ('interp', 'block'):
+        sim = load_words(WFI_PROGRAM, engine=engine)
+        result = sim.run(1000)
+        if (result.status, result.instruction_count, result.pc) != ('waiting', 0, 0x80000000):
+            runner.test_fail(f"{engine} idle", "waiting, 0, 0x80000000",
+                             f"{result.status}, {result.instruction_count}, 0x{result.pc:08x}")
+        if sim.run(1000).status != 'waiting':
+            runner.test_fail(f"{engine} idle again", "waiting", "resumed without input")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim.inject_console_input(b"A")
+        result = sim.run(1000)
+        if (result.status, result.instruction_count) != ('halted', 3) or sim.cpu.regs[7] != 0x41:
+            runner.test_fail(f"{engine} resumed", "halted after 3, x7=0x41",
+                             f"{result.status} after {result.instruction_count}, x7=0x{sim.cpu.regs[7]:x}")
+
+
+def test_wait_for_input_wakes_on_inject(runner):
+    """WFI: wait_for_input sleeps until input is injected from another thread"""
+    sim = load_words(WFI_PROGRAM, engine='interp')
+    if sim.wait_for_input(timeout=0.01):
+        runner.test_fail("timeout", "False", "True")
+
+    timer = threading.Timer(0.02, sim.memory.console_uart.inject_input, args=(b"x",))
+    timer.start()
+    try:
+        if not sim.wait_for_input(timeout=5):
+            runner.test_fail("wake", "True", "False")
+    finally:
+        timer.cancel()
+
+
+def test_input_helpers_return_when_waiting(runner):
+    """WFI: run_until_input_consumed/run_until_idle stop once the guest waits"""
+    helpers = (('run_until_input_consumed', lambda sim: sim.run_until_input_consumed(10000)),
+                ('run_until_idle', lambda sim: sim.run_until_idle(10000)))
+    for engine in ('interp', 'block'):
+        for name, run in helpers:
+            sim = load_words(POLL_WFI_PROGRAM, engine=engine)
+            result = run(sim)
+            if (result.status, result.pc) != ('waiting', 0x80000010):
+                runner.test_fail(f"{engine} {name}", "waiting at 0x80000010",
+                                 f"{result.status} at 0x{result.pc:08x}")
+            if 0x10001008 in sim.memory.read_watchpoints:
+                runner.test_fail(f"{engine} {name} watchpoint", "removed", "left armed")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for macro-op fusion in the block engine (fusion.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from decoder import decode_instruction
+from fusion import match_pair, find_fusions, LUI_ADDI, AUIPC_JALR, SLT_BRANCH
+from tests.helpers import BASE, load_words
+
+
+# Loop using every fused idiom; the first pass enters the lui+addi pair
+# at its second instruction
+FUSION_PROGRAM = [
+    0x00500093,  # 00: addi x1, x0, 5
+    0x10000293,  # 04: addi x5, x0, 0x100
+    0x0080006f,  # 08: jal x0, +8 (to the addi at 0x10)
+    0x800012b7,  # 0c: lui x5, 0x80001         <- loop
+    0x01028313,  # 10: addi x6, x5, 16
+    0x00000397,  # 14: auipc x7, 0
+    0x00c38467,  # 18: jalr x8, 12(x7)         -> 0x20
+    0x00100073,  # 1c: ebreak (skipped)
+    0xfff08093,  # 20: addi x1, x1, -1
+    0x001024b3,  # 24: slt x9, x0, x1
+    0xfe0492e3,  # 28: bne x9, x0, loop
+    0x0010b513,  # 2c: sltiu x10, x1, 1
+    0xfe0506e3,  # 30: beq x10, x0, 0x1c (not taken)
+    0x00100073,  # 34: ebreak
+]
+
+TIER_CONFIGS = [(0, None), (0, 0), (2, 5)]
+
+
+def test_match_pair(runner):
+    """match_pair: recognizes the three idioms only when the registers connect"""
+    d = decode_instruction
+    cases = [
+        (0x800012b7, 0x01028313, LUI_ADDI),    # lui x5; addi x6, x5, 16
+        (0x800012b7, 0x01030313, None),        # lui x5; addi x6, x6, 16
+        (0x00000397, 0x00c38467, AUIPC_JALR),  # auipc x7; jalr x8, 12(x7)
+        (0x001024b3, 0xfe0492e3, SLT_BRANCH),  # slt x9; bne x9, x0
+        (0x001024b3, 0xfe1482e3, None),        # slt x9; beq x9, x1
+        (0x0010b513, 0xfe0506e3, SLT_BRANCH),  # sltiu x10; beq x10, x0
+    ]
+    for first, second, expected in cases:
+        idiom = match_pair(d(first), d(second))
+        if idiom != expected:
+            runner.test_fail(f"match_pair 0x{first:08x} 0x{second:08x}", str(expected), str(idiom))
+
+    # Pairs do not overlap
+    fusions = find_fusions([(0, d(0x800012b7)), (4, d(0x01028313)), (8, d(0x01030313))])
+    if fusions != {0: LUI_ADDI}:
+        runner.test_fail("find_fusions", "{0: 'lui+addi'}", str(fusions))
+
+
+def test_fused_blocks_match_interpreter(runner):
+    """BlockEngine: fused pairs leave the same state as the interpreter in every tier"""
+    ref = load_words(FUSION_PROGRAM, engine='interp')
+    ref_result = ref.run()
+
+    for warm, hot in TIER_CONFIGS:
+        sim = load_words(FUSION_PROGRAM, engine='block', warm_threshold=warm, hot_threshold=hot)
+        result = sim.run()
+        config = f"warm={warm} hot={hot}"
+        if (result.status, result.instruction_count, result.pc) != \
+                (ref_result.status, ref_result.instruction_count, ref_result.pc):
+            runner.test_fail(f"fusion result ({config})",
+                             f"{ref_result.status} {ref_result.instruction_count} {ref_result.pc:#x}",
+                             f"{result.status} {result.instruction_count} {result.pc:#x}")
+        if sim.cpu.regs[:32] != ref.cpu.regs[:32]:
+            runner.test_fail(f"fusion registers ({config})", str(ref.cpu.regs), str(sim.cpu.regs))
+
+
+def test_fusion_stats(runner):
+    """RV32System.get_fusion_stats: counts fused executions per idiom"""
+    sim = load_words(FUSION_PROGRAM, engine='block', warm_threshold=0)
+    sim.run()
+    stats = sim.get_fusion_stats()
+    # The loop runs 5 times, the final sltiu+beq once
+    expected = {LUI_ADDI: 4, AUIPC_JALR: 5, SLT_BRANCH: 6}
+    if stats != expected:
+        runner.test_fail("fusion stats", str(expected), str(stats))
+
+    # Counts survive invalidation of the blocks that produced them
+    sim.write_memory(BASE + 0x0c, (0x800012b7).to_bytes(4, 'little'))
+    if sim.get_fusion_stats() != expected:
+        runner.test_fail("fusion stats after invalidation", str(expected), str(sim.get_fusion_stats()))
+
+
+def test_breakpoint_on_second_instruction(runner):
+    """RV32System: a breakpoint on the second instruction of a pair sees the first one's result"""
+    ref, sim = load_words(FUSION_PROGRAM, engine='interp'), load_words(FUSION_PROGRAM, engine='block', warm_threshold=0)
+    sim.run(max_steps=20)  # Translate and run the fused loop
+    ref.run(max_steps=20)
+
+    for system in (ref, sim):
+        system.add_breakpoint(BASE + 0x10)
+    ref_result, result = ref.run(), sim.run()
+
+    if (result.status, result.pc, result.instruction_count) != \
+            (ref_result.status, ref_result.pc, ref_result.instruction_count):
+        runner.test_fail("breakpoint in pair", f"{ref_result.status} at {ref_result.pc:#x}",
+                         f"{result.status} at {result.pc:#x}")
+    if sim.cpu.regs[:32] != ref.cpu.regs[:32] or sim.cpu.regs[5] != 0x80001000:
+        runner.test_fail("breakpoint in pair state", "x5=0x80001000, registers as interpreter",
+                         f"x5={sim.cpu.regs[5]:#x}")
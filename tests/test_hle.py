@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Unit tests for high-level emulation of libc routines (hle.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from memory import Memory
+from exceptions import MemoryAccessFault
+from hle import PLANS
+from tests.helpers import BASE, load_words, program_bytes
+
+
+DATA = 0x80002000
+
+# Calls each routine once, keeping the return values in s1-s5. The
+# routines are plain byte loops standing in for picolibc's.
+HLE_PROGRAM = [
+    0x80002437,  # 00: lui s0, 0x80002
+    0x10040513,  # 04: addi a0, s0, 0x100
+    0x07800593,  # 08: addi a1, x0, 'x'
+    0x00a00613,  # 0c: addi a2, x0, 10
+    0x06c000ef,  # 10: jal ra, memset
+    0x00050493,  # 14: addi s1, a0, 0
+    0x20040513,  # 18: addi a0, s0, 0x200
+    0x00040593,  # 1c: addi a1, s0, 0
+    0x00600613,  # 20: addi a2, x0, 6
+    0x074000ef,  # 24: jal ra, memcpy
+    0x00050913,  # 28: addi s2, a0, 0
+    0x00040513,  # 2c: addi a0, s0, 0
+    0x030000ef,  # 30: jal ra, strlen
+    0x00050993,  # 34: addi s3, a0, 0
+    0x00040513,  # 38: addi a0, s0, 0
+    0x01040593,  # 3c: addi a1, s0, 0x10
+    0x07c000ef,  # 40: jal ra, strcmp
+    0x00050a13,  # 44: addi s4, a0, 0
+    0x30040513,  # 48: addi a0, s0, 0x300
+    0x00040593,  # 4c: addi a1, s0, 0
+    0x00c00613,  # 50: addi a2, x0, 12
+    0x08c000ef,  # 54: jal ra, strncpy
+    0x00050a93,  # 58: addi s5, a0, 0
+    0x00100073,  # 5c: ebreak
+    0x00050593,  # 60: strlen: addi a1, a0, 0
+    0x0005c283,  # 64: lbu t0, 0(a1)
+    0x00028663,  # 68: beqz t0, 0x74
+    0x00158593,  # 6c: addi a1, a1, 1
+    0xff5ff06f,  # 70: j 0x64
+    0x40a58533,  # 74: sub a0, a1, a0
+    0x00008067,  # 78: ret
+    0x00050313,  # 7c: memset: addi t1, a0, 0
+    0x00060a63,  # 80: beqz a2, 0x94
+    0x00b30023,  # 84: sb a1, 0(t1)
+    0x00130313,  # 88: addi t1, t1, 1
+    0xfff60613,  # 8c: addi a2, a2, -1
+    0xff1ff06f,  # 90: j 0x80
+    0x00008067,  # 94: ret
+    0x00050313,  # 98: memcpy: addi t1, a0, 0
+    0x00060e63,  # 9c: beqz a2, 0xb8
+    0x0005c283,  # a0: lbu t0, 0(a1)
+    0x00530023,  # a4: sb t0, 0(t1)
+    0x00158593,  # a8: addi a1, a1, 1
+    0x00130313,  # ac: addi t1, t1, 1
+    0xfff60613,  # b0: addi a2, a2, -1
+    0xfe9ff06f,  # b4: j 0x9c
+    0x00008067,  # b8: ret
+    0x00054283,  # bc: strcmp: lbu t0, 0(a0)
+    0x0005c303,  # c0: lbu t1, 0(a1)
+    0x00629a63,  # c4: bne t0, t1, 0xd8
+    0x00028863,  # c8: beqz t0, 0xd8
+    0x00150513,  # cc: addi a0, a0, 1
+    0x00158593,  # d0: addi a1, a1, 1
+    0xfe9ff06f,  # d4: j 0xbc
+    0x40628533,  # d8: sub a0, t0, t1
+    0x00008067,  # dc: ret
+    0x00050393,  # e0: strncpy: addi t2, a0, 0
+    0x02060063,  # e4: beqz 0x104
+    0x0005c283,  # e8: lbu t0, 0(a1)
+    0x00538023,  # ec: sb t0, 0(t2)
+    0x00138393,  # f0: addi t2, t2, 1
+    0xfff60613,  # f4: addi a2, a2, -1
+    0xfe0286e3,  # f8: beqz t0, 0xe4 (pad with NULs)
+    0x00158593,  # fc: addi a1, a1, 1
+    0xfe5ff06f,  # 100: j 0xe4
+    0x00008067,  # 104: ret
+]
+
+SYMBOLS = {'strlen': BASE + 0x60, 'memset': BASE + 0x7c, 'memcpy': BASE + 0x98,
+           'strcmp': BASE + 0xbc, 'strncpy': BASE + 0xe0}
+
+
+def make_system(engine='block'):
+    """Create an RV32System with HLE_PROGRAM, its symbols and input strings"""
+    sim = load_words(HLE_PROGRAM, engine=engine)
+    sim.symbols = dict(SYMBOLS)
+    sim.write_memory(DATA, b"hello\0")
+    sim.write_memory(DATA + 0x10, b"help\0")
+    return sim
+
+
+def outcome(sim):
+    """Return values (s1-s5) and the memory the calls wrote"""
+    return (tuple(sim.cpu.regs[r] for r in (9, 18, 19, 20, 21)),
+            sim.read_memory(DATA + 0x100, 12), sim.read_memory(DATA + 0x200, 8),
+            sim.read_memory(DATA + 0x300, 14))
+
+
+def test_hle_matches_real_routines(runner):
+    """enable_hle: intercepted calls give the real routines' results in both engines"""
+    ref = make_system('interp')
+    ref.run()
+    expected = outcome(ref)
+    if expected[0][2:4] != (5, (0x6c - 0x70) & 0xFFFFFFFF):
+        runner.test_fail("reference strlen/strcmp", "5, -4", str(expected[0]))
+
+    for engine in ('interp', 'block'):
+        sim = make_system(engine)
+        installed = sim.enable_hle()
+        if installed != SYMBOLS:
+            runner.test_fail(f"installed ({engine})", str(SYMBOLS), str(installed))
+        result = sim.run()
+        if result.status != 'halted' or outcome(sim) != expected:
+            runner.test_fail(f"HLE results ({engine})", str(expected), f"{result.status} {outcome(sim)}")
+        calls = sim.get_hle_stats()['calls']
+        if set(calls.values()) != {1}:
+            runner.test_fail(f"HLE calls ({engine})", "one call each", str(calls))
+        # 23 instructions before the ebreak, and each call counts as one
+        if result.instruction_count != 23 + 5:
+            runner.test_fail(f"HLE instruction count ({engine})", "28", str(result.instruction_count))
+
+
+def test_hle_per_function_flags(runner):
+    """enable_hle/disable_hle: only the selected routines are intercepted"""
+    sim = make_system()
+    sim.enable_hle(['strlen', 'memset'])
+    sim.disable_hle(['memset'])
+    sim.run()
+    calls = sim.get_hle_stats()['calls']
+    if calls['strlen'] != 1 or any(calls[name] for name in calls if name != 'strlen'):
+        runner.test_fail("per-function flags", "only strlen intercepted", str(calls))
+
+    try:
+        sim.enable_hle(['printf'])
+    except ValueError:
+        pass
+    else:
+        runner.test_fail("unknown routine", "ValueError", "no exception")
+
+
+def test_reset_drops_intercepts(runner):
+    """reset: no intercepts at the old entry points once memory is cleared"""
+    sim = make_system()
+    sim.enable_hle()
+    sim.reset()
+    sim.load_binary_data(program_bytes(HLE_PROGRAM))
+    sim.write_memory(DATA, b"hello\0")
+    sim.write_memory(DATA + 0x10, b"help\0")
+    result = sim.run()
+    stats = sim.get_hle_stats()
+    if sim.predecode.overrides or stats['installed'] or any(stats['calls'].values()):
+        runner.test_fail("after reset", "no intercepts", str(stats))
+    # The real routines ran
+    if result.status != 'halted' or result.instruction_count <= 23 + 5:
+        runner.test_fail("real routines", "halted after more than 28",
+                         f"{result.status} after {result.instruction_count}")
+
+
+def test_hle_verify_mode(runner):
+    """enable_hle(verify=True): runs the real routines and reports disagreements"""
+    sim = make_system()
+    sim.enable_hle(verify=True)
+    ref = make_system('interp')
+    ref.run()
+    sim.run()
+    stats = sim.get_hle_stats()
+    if stats['mismatches'] or outcome(sim) != outcome(ref):
+        runner.test_fail("verify mode", "no mismatches, real results", str(stats['mismatches']))
+
+    # A routine that does not behave like strlen is reported
+    sim = make_system()
+    sim.write_memory(BASE + 0x74, (0x00058513).to_bytes(4, 'little'))  # strlen returns a1
+    sim.enable_hle(['strlen'], verify=True)
+    sim.run()
+    mismatches = sim.get_hle_stats()['mismatches']
+    if len(mismatches) != 1 or mismatches[0][0] != 'strlen':
+        runner.test_fail("verify mismatch", "one strlen mismatch", str(mismatches))
+
+
+def test_hle_under_lockstep(runner):
+    """run_lockstep: the reference replays intercepted calls instead of diverging"""
+    for engine in ('interp', 'block'):
+        for unit in (('instructions', 'blocks') if engine == 'block' else ('instructions',)):
+            sim = make_system(engine)
+            sim.enable_hle()
+            result = sim.run_lockstep(1000, unit=unit)
+            if result.status != 'halted' or sim.divergence is not None:
+                runner.test_fail(f"lockstep ({engine}, {unit})", "halted", f"{result.status}: {result.error}")
+            if set(sim.get_hle_stats()['calls'].values()) != {1}:
+                runner.test_fail(f"calls ({engine}, {unit})", "one call each",
+                                 str(sim.get_hle_stats()['calls']))
+            # The intercepts are back in place afterwards
+            overrides = sim.predecode.overrides
+            if sorted(overrides) != sorted(SYMBOLS.values()) or \
+                    not all(h.__name__.startswith('_hle_') for h in overrides.values()):
+                runner.test_fail(f"overrides ({engine}, {unit})", "HLE handlers restored", str(overrides))
+
+
+def test_bulk_reads(runner):
+    """Memory.read_bytes/read_cstring: same bytes as read_byte, faults outside memory"""
+    mem = Memory()
+    mem.write_bytes(0x807FFFF0, b"abc\0" + bytes(range(1, 13)))
+    if mem.read_bytes(0x807FFFF0, 4) != b"abc\0" or mem.read_cstring(0x807FFFF0) != b"abc":
+        runner.test_fail("bulk read", "b'abc'", repr(mem.read_bytes(0x807FFFF0, 4)))
+    if mem.read_cstring(0x807FFFF4, 5) != bytes(range(1, 6)):
+        runner.test_fail("read_cstring limit", "5 bytes", repr(mem.read_cstring(0x807FFFF4, 5)))
+    try:
+        mem.read_cstring(0x807FFFF4)  # runs off the end of RAM
+    except Exception as e:
+        if type(e).__name__ != 'MemoryAccessFault':
+            runner.test_fail("read_cstring past RAM", "MemoryAccessFault", type(e).__name__)
+    else:
+        runner.test_fail("read_cstring past RAM", "MemoryAccessFault", "no exception")
+
+
+def test_bad_lengths_fault(runner):
+    """HLE plans: ranges leaving RAM fault at the first bad byte before building buffers"""
+    mem = Memory()
+    ram_end = Memory.RAM_END
+    cases = (('memset', (DATA, 0x41, 0xFFFFFFFF), ram_end + 1, 'store'),
+             ('strncpy', (DATA, DATA + 0x10, 0x80000000), ram_end + 1, 'store'),
+             ('memcpy', (DATA, 0x10000000, 16), 0x10000000, 'load'),
+             ('memcpy', (0x00001000, DATA, 16), 0x00001000, 'store'))
+    for name, args, address, access_type in cases:
+        try:
+            PLANS[name](mem, *args)
+        except MemoryAccessFault as e:
+            if (e.address, e.access_type) != (address, access_type):
+                runner.test_fail(f"{name} fault", f"{access_type} at 0x{address:08x}",
+                                 f"{e.access_type} at 0x{e.address:08x}")
+        else:
+            runner.test_fail(f"{name} {args}", "MemoryAccessFault", "no exception")
+    if PLANS['memset'](mem, DATA, 0x41, 0) != (DATA, [(DATA, b"")]):
+        runner.test_fail("empty memset", "no fault", "fault")
@@ -645,6 +645,46 @@ def test_mcp_step_single_instruction(runner):
             server.log_fp.close()
 
 
+def test_mcp_background_run_job(runner):
+    """sim_run with wait=false should start a job that can be queried and cancelled."""
+    spin_program = _asm(0x0000006f)  # jal x0, 0
+
+    session_id = None
+    with tempfile.TemporaryDirectory() as tmp_fs_root:
+        server = MCPSimulatorServer()
+        try:
+            _call_tool_text(server, 'sim_create', fs_root=tmp_fs_root)
+            session_id = server.session_manager.list_sessions()[0]
+            _write_program_via_tools(server, session_id, spin_program)
+
+            started = _call_tool_text(server, 'sim_run', session_id=session_id,
+                                      max_steps=10**9, wait=False)
+            if not started.startswith('Started job: '):
+                runner.test_fail('mcp background run start', 'Started job: <id>', started)
+            job_id = started.split(': ', 1)[1]
+
+            status = _call_tool_text(server, 'sim_job_status', job_id=job_id)
+            if f'Job: {job_id}' not in status or f'Session: {session_id}' not in status:
+                runner.test_fail('mcp job status', f'Job: {job_id}', status)
+
+            busy = _call_tool_text(server, 'sim_step', session_id=session_id)
+            if f'running job {job_id}' not in busy:
+                runner.test_fail('mcp busy session', f'running job {job_id}', busy)
+
+            cancelled = _call_tool_text(server, 'sim_job_cancel', job_id=job_id)
+            status = _call_tool_text(server, 'sim_job_status', job_id=job_id)
+            if cancelled != f'Cancelled job: {job_id}' or 'State: cancelled' not in status:
+                runner.test_fail('mcp job cancel', 'State: cancelled', f'{cancelled}\n{status}')
+
+            finished = _call_tool_text(server, 'sim_run', session_id=session_id, max_steps=250)
+            if 'Status: max_steps' not in finished or 'Instructions: 250' not in finished:
+                runner.test_fail('mcp run after cancel', 'max_steps after 250', finished)
+        finally:
+            if session_id:
+                _call_tool_text(server, 'sim_destroy', session_id=session_id)
+            server.log_fp.close()
+
+
 def test_mcp_read_memory_tool(runner):
     """sim_read_memory should return hex bytes that mirror RAM contents."""
     base_addr = 0x80005000
@@ -5,11 +5,14 @@ Tests memory operations and UART functionality.
 """
 
 import sys
+import contextlib
+import io
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from memory import Memory
+from predecode import PredecodeCache
 from uart import DEBUG_UART_TX_ADDR as UART_TX_ADDR
 
 
@@ -199,6 +202,26 @@ def test_misaligned_word(runner):
         runner.test_fail("Misaligned word", "0x12345678", f"0x{result:08x}")
 
 
+def test_ram_word_access_keeps_watchpoints_and_code_current(runner):
+    """RAM fast path: watchpoints still fire and stores re-decode cached code"""
+    mem = Memory()
+    cache = PredecodeCache(mem)
+    mem.write_word(0x80008000, 0x00100093)  # addi x1, x0, 1
+    cache.lookup(0x80008000)
+    mem.write_halfword(0x80008002, 0x0020)  # -> addi x1, x0, 2
+    insn = cache.lookup(0x80008000)[0]
+    runner.log(f"  Re-decoded word: 0x{insn:08x}")
+    if insn != 0x00200093:
+        runner.test_fail("Code store", "0x00200093", f"0x{insn:08x}")
+
+    mem.add_write_watchpoint(0x80008006)
+    with contextlib.redirect_stdout(io.StringIO()):
+        mem.write_word(0x80008004, 0x11223344)
+    hits = [(hit.address, hit.access_type) for hit in mem.check_pending_watchpoints()]
+    if hits != [(0x80008006, 'write')] or mem.read_word(0x80008004) != 0x11223344:
+        runner.test_fail("Write watchpoint", "[(0x80008006, 'write')]", str(hits))
+
+
 def test_reset_clears_memory_and_uart(runner):
     """reset() clears memory and UART"""
     mem = Memory()
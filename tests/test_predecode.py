@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the predecoded instruction cache (predecode.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from memory import Memory
+from predecode import PredecodeCache
+from pyrv32_system import RV32System
+
+
+ADDI_X1_42 = 0x02a00093   # addi x1, x0, 42
+ADDI_X1_7 = 0x00700093    # addi x1, x0, 7
+EBREAK = 0x00100073
+
+
+def test_lookup_caches_entry(runner):
+    """PredecodeCache: second lookup returns the cached tuple"""
+    mem = Memory()
+    cache = PredecodeCache(mem)
+    mem.write_word(0x80000000, ADDI_X1_42)
+
+    first = cache.lookup(0x80000000)
+    second = cache.lookup(0x80000000)
+
+    if first is not second:
+        runner.test_fail("predecode hit", "same entry object", "new entry")
+    if first[0] != ADDI_X1_42 or first[2]['name'] != 'ADDI':
+        runner.test_fail("predecode entry", "ADDI 0x02a00093", f"{first[2]['name']} 0x{first[0]:08x}")
+    if len(cache) != 1:
+        runner.test_fail("predecode size", "1", str(len(cache)))
+
+
+def test_store_invalidates_entry(runner):
+    """PredecodeCache: a store into a cached word drops the entry"""
+    mem = Memory()
+    cache = PredecodeCache(mem)
+    mem.write_word(0x80000000, ADDI_X1_42)
+    cache.lookup(0x80000000)
+
+    mem.write_byte(0x80000002, 0x70)
+
+    if 0x80000000 in cache.entries:
+        runner.test_fail("predecode invalidate", "entry dropped", "entry still cached")
+    insn = cache.lookup(0x80000000)[0]
+    if insn != 0x02700093:
+        runner.test_fail("predecode refetch", "0x02700093", f"0x{insn:08x}")
+
+
+def test_misaligned_pc_not_cached(runner):
+    """PredecodeCache: misaligned PCs are decoded but never cached"""
+    mem = Memory()
+    cache = PredecodeCache(mem)
+    mem.write_word(0x80000002, ADDI_X1_42)
+
+    cache.lookup(0x80000002)
+
+    if len(cache) != 0:
+        runner.test_fail("predecode misaligned", "0 entries", str(len(cache)))
+
+
+def test_system_sees_rewritten_code(runner):
+    """RV32System: rewriting an already executed instruction takes effect"""
+    sim = RV32System()
+    program = ADDI_X1_42.to_bytes(4, 'little') + EBREAK.to_bytes(4, 'little')
+    sim.load_binary_data(program)
+    sim.step(1)
+
+    sim.write_memory(0x80000000, ADDI_X1_7.to_bytes(4, 'little'))
+    sim.cpu.pc = 0x80000000
+    sim.step(1)
+
+    if sim.cpu.regs[1] != 7:
+        runner.test_fail("self-modifying code", "x1=7", f"x1={sim.cpu.regs[1]}")
+
+
+def test_code_pages_tracked(runner):
+    """PredecodeCache: only pages holding cached entries are marked as code"""
+    mem = Memory()
+    cache = PredecodeCache(mem)
+    mem.write_word(0x80001ffc, ADDI_X1_42)
+    cache.lookup(0x80001ffc)
+
+    if mem.code_pages != {0x80001}:
+        runner.test_fail("code pages", "{0x80001}", str({hex(p) for p in mem.code_pages}))
+
+    # Data page: the cache is never consulted
+    invalidated = []
+    cache.invalidate = invalidated.append
+    mem.write_word(0x80002000, 0x12345678)
+    if invalidated:
+        runner.test_fail("data page store", "no invalidation", f"{len(invalidated)} calls")
+
+    cache.clear()
+    if mem.code_pages:
+        runner.test_fail("code pages clear", "empty", str(mem.code_pages))
+
+
+def test_bulk_write_invalidates_code(runner):
+    """Memory.write_bytes: a bulk load over cached code drops the covered entries only"""
+    mem = Memory()
+    cache = PredecodeCache(mem)
+    mem.load_program(0x80000000, (ADDI_X1_42.to_bytes(4, 'little') * 3))
+    for pc in (0x80000000, 0x80000004, 0x80000008):
+        cache.lookup(pc)
+
+    mem.write_bytes(0x80000006, ADDI_X1_7.to_bytes(4, 'little'))
+
+    if sorted(cache.entries) != [0x80000000]:
+        runner.test_fail("bulk invalidate", "[0x80000000]", str([hex(pc) for pc in sorted(cache.entries)]))
+    if mem.read_word(0x80000004) != (ADDI_X1_42 & 0xFFFF) | ((ADDI_X1_7 & 0xFFFF) << 16):
+        runner.test_fail("bulk write data", "merged word", f"0x{mem.read_word(0x80000004):08x}")
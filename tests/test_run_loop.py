@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the RV32System.run fast loop: results must match
+executing the same program one step() at a time
+"""
+
+import sys
+import os
+import re
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyrv32_system import RV32System, ExecutionResult
+from tests.helpers import BASE, load_words
+
+
+PROGRAM = [
+    0x00a00093,  # 00: addi x1, x0, 10
+    0x800012b7,  # 04: lui x5, 0x80001
+    0x00110133,  # 08: add x2, x2, x1       <- loop
+    0x0022a023,  # 0c: sw x2, 0(x5)
+    0xfff08093,  # 10: addi x1, x1, -1
+    0xfe009ae3,  # 14: bne x1, x0, loop
+    0x0002a183,  # 18: lw x3, 0(x5)
+    0x00100073,  # 1c: ebreak
+]
+
+# Reference interpreter with trace capture on
+TRACED = {'engine': 'interp', 'trace': True}
+
+
+def run_by_steps(sim, max_steps=1000000):
+    """Reference: the original run() loop, one step(1) per instruction"""
+    executed = 0
+    while executed < max_steps:
+        result = sim.step(1)
+        executed += result.instruction_count
+        if result.status != 'running':
+            return ExecutionResult(result.status, executed, result.error, result.pc)
+    return ExecutionResult('max_steps', executed, pc=sim.cpu.pc)
+
+
+def check_same(runner, name, ref, sim, ref_result, result):
+    """Compare results, architectural state and trace of two systems"""
+    # Breakpoint IDs are global, so the two systems number theirs differently
+    def summary(r):
+        error = re.sub(r'Breakpoint \d+', 'Breakpoint', r.error) if r.error else r.error
+        return (r.status, r.instruction_count, error, r.pc)
+    got = summary(result)
+    expected = summary(ref_result)
+    if got != expected:
+        runner.test_fail(name, str(expected), str(got))
+    if sim.cpu.regs[:32] != ref.cpu.regs[:32] or sim.instruction_count != ref.instruction_count:
+        runner.test_fail(f"{name} state", f"{ref.cpu.regs} count={ref.instruction_count}",
+                         f"{sim.cpu.regs} count={sim.instruction_count}")
+    ref_trace = [(e.step, e.pc, e.insn) for e in ref.debugger.trace_buffer.get_all()]
+    trace = [(e.step, e.pc, e.insn) for e in sim.debugger.trace_buffer.get_all()]
+    if trace != ref_trace:
+        runner.test_fail(f"{name} trace", f"{len(ref_trace)} entries", f"{len(trace)} entries")
+
+
+def test_run_matches_steps(runner):
+    """RV32System.run: fast loop matches stepping to the halt"""
+    ref, sim = load_words(PROGRAM, **TRACED), load_words(PROGRAM, **TRACED)
+    check_same(runner, "run to halt", ref, sim, run_by_steps(ref), sim.run())
+
+
+def test_run_max_steps(runner):
+    """RV32System.run: fast loop stops exactly at max_steps"""
+    ref, sim = load_words(PROGRAM, **TRACED), load_words(PROGRAM, **TRACED)
+    check_same(runner, "run max_steps", ref, sim, run_by_steps(ref, 13), sim.run(max_steps=13))
+    check_same(runner, "run resume", ref, sim, run_by_steps(ref), sim.run())
+
+
+def test_run_stops_at_breakpoint(runner):
+    """RV32System.run: address breakpoints stop the fast loop with the same hit counts"""
+    ref, sim = load_words(PROGRAM, **TRACED), load_words(PROGRAM, **TRACED)
+    for system in (ref, sim):
+        system.add_breakpoint(BASE + 0x10)
+
+    check_same(runner, "breakpoint hit", ref, sim, run_by_steps(ref), sim.run())
+    # Running again re-checks the breakpoint before executing it
+    check_same(runner, "breakpoint rerun", ref, sim, run_by_steps(ref), sim.run())
+
+    ref_hits = ref.debugger.bp_manager.breakpoints[BASE + 0x10].hit_count
+    hits = sim.debugger.bp_manager.breakpoints[BASE + 0x10].hit_count
+    if hits != ref_hits:
+        runner.test_fail("breakpoint hit count", str(ref_hits), str(hits))
+
+
+def test_run_conditional_breakpoint(runner):
+    """RV32System.run: a breakpoint whose condition is false does not stop the fast loop"""
+    ref, sim = load_words(PROGRAM, **TRACED), load_words(PROGRAM, **TRACED)
+    for system in (ref, sim):
+        system.add_breakpoint(BASE + 0x10, reg_name='x1', reg_value=4)
+
+    check_same(runner, "conditional breakpoint", ref, sim, run_by_steps(ref), sim.run())
+    if sim.cpu.regs[1] != 4:
+        runner.test_fail("conditional breakpoint x1", "4", str(sim.cpu.regs[1]))
+
+
+def test_run_stops_at_watchpoint(runner):
+    """RV32System.run: a write watchpoint halts after the storing instruction"""
+    ref, sim = load_words(PROGRAM, **TRACED), load_words(PROGRAM, **TRACED)
+    for system in (ref, sim):
+        system.add_write_watchpoint(0x80001000)
+
+    check_same(runner, "write watchpoint", ref, sim, run_by_steps(ref), sim.run())
+    if sim.cpu.pc != BASE + 0x10:
+        runner.test_fail("write watchpoint pc", "0x80000010", f"{sim.cpu.pc:#x}")
+
+
+def test_debug_armed_tracking(runner):
+    """RV32System.debug_armed: follows breakpoints, watchpoints, step mode and trace capture"""
+    sim = load_words(PROGRAM, engine='interp')
+    if sim.debug_armed():
+        runner.test_fail("fresh system armed", "False", "True")
+
+    toggles = [
+        ("breakpoint", lambda: sim.add_breakpoint(BASE + 0x10), sim.clear_breakpoints),
+        ("register breakpoint", lambda: sim.add_breakpoint(reg_name='x1', reg_value=3), sim.clear_breakpoints),
+        ("read watchpoint", lambda: sim.add_read_watchpoint(0x80001000),
+         lambda: sim.remove_read_watchpoint(0x80001000)),
+        ("write watchpoint", lambda: sim.add_write_watchpoint(0x80001000),
+         lambda: sim.remove_write_watchpoint(0x80001000)),
+        ("step mode", lambda: sim.debugger.set_step_mode(True), lambda: sim.debugger.set_step_mode(False)),
+        ("trace capture", sim.debugger.trace_buffer.enable, sim.debugger.trace_buffer.disable),
+    ]
+    for name, arm, disarm in toggles:
+        arm()
+        if not sim.debug_armed():
+            runner.test_fail(f"{name} arms", "True", "False")
+        disarm()
+        if sim.debug_armed():
+            runner.test_fail(f"{name} disarms", "False", "True")
+
+
+def test_run_switches_engine_when_armed(runner):
+    """RV32System.run: the block engine hands over to the interpreter while a breakpoint is set"""
+    ref, sim = load_words(PROGRAM, **TRACED), load_words(PROGRAM)
+
+    def compare(name, ref_result, result):
+        if (result.status, result.instruction_count, result.pc) != \
+                (ref_result.status, ref_result.instruction_count, ref_result.pc):
+            runner.test_fail(name, f"{ref_result.status} {ref_result.instruction_count} {ref_result.pc:#x}",
+                             f"{result.status} {result.instruction_count} {result.pc:#x}")
+        if sim.cpu.regs[:32] != ref.cpu.regs[:32] or sim.instruction_count != ref.instruction_count:
+            runner.test_fail(f"{name} state", f"count={ref.instruction_count}", f"count={sim.instruction_count}")
+
+    compare("unarmed run", run_by_steps(ref, 9), sim.run(max_steps=9))
+    translated = sim.block_engine.blocks_translated
+    if translated == 0:
+        runner.test_fail("unarmed run engine", "blocks translated", "none")
+
+    for system in (ref, sim):
+        system.add_breakpoint(BASE + 0x10)
+    compare("armed run", run_by_steps(ref), sim.run())
+    if sim.block_engine.blocks_translated != translated:
+        runner.test_fail("armed run engine", f"{translated} blocks", f"{sim.block_engine.blocks_translated} blocks")
+
+    for system in (ref, sim):
+        system.clear_breakpoints()
+    compare("disarmed run", run_by_steps(ref), sim.run())
+
+
+def test_run_ecall_status(runner):
+    """RV32System.run: ECALLs are serviced and exit/unsupported syscalls halt on the ECALL"""
+    programs = {
+        # addi a7, x0, 93 (exit); ecall
+        "exit": ([0x05d00893, 0x00000073], None),
+        # addi a7, x0, 999; ecall
+        "unsupported": ([0x3e700893, 0x00000073], "Unsupported syscall 999"),
+    }
+    for name, (words, error) in programs.items():
+        for engine in ('interp', 'block'):
+            sim = RV32System(fs_root="/tmp", engine=engine)
+            sim.load_binary_data(b"".join(w.to_bytes(4, 'little') for w in words))
+            result = sim.run()
+            got = (result.status, result.instruction_count, result.pc, (result.error or '')[:len(error or '')] or None)
+            if got != ('halted', 1, BASE + 4, error):
+                runner.test_fail(f"ecall {name} ({engine})", f"halted, 1 insn, pc=0x80000004, {error}", str(got))
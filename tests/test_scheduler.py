@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Unit tests for instruction-quantum scheduling of sessions (scheduler.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scheduler import QuantumScheduler
+from tests.helpers import load_words
+
+
+LOOP_PROGRAM = [
+    0x01400093,  # 00: addi x1, x0, 20
+    0x00000113,  # 04: addi x2, x0, 0
+    0x00110133,  # 08: add x2, x2, x1       <- loop
+    0xfff08093,  # 0c: addi x1, x1, -1
+    0xfe009ce3,  # 10: bne x1, x0, loop
+    0x00100073,  # 14: ebreak
+]
+
+SPIN_PROGRAM = [
+    0x0000006f,  # 00: jal x0, 0
+]
+
+
+def test_sliced_run_matches_single_run(runner):
+    """QuantumScheduler: a job run in slices ends like one run() call"""
+    reference = load_words(LOOP_PROGRAM)
+    expected = reference.run()
+
+    sim = load_words(LOOP_PROGRAM)
+    scheduler = QuantumScheduler(quantum=7)
+    job = scheduler.submit(sim, max_steps=1000)
+    scheduler.run_all()
+
+    result = job.result
+    if (result.status, result.instruction_count, result.pc) != \
+            (expected.status, expected.instruction_count, expected.pc):
+        runner.test_fail("job result", f"{expected.status}, {expected.instruction_count}",
+                         f"{result.status}, {result.instruction_count}")
+    if sim.cpu.regs[:32] != reference.cpu.regs[:32]:
+        runner.test_fail("registers", str(reference.cpu.regs[:32]), str(sim.cpu.regs[:32]))
+    # 62 instructions in slices of 7
+    if job.slices != 9 or job.state() != 'done' or scheduler.pending():
+        runner.test_fail("slices", "9, done", f"{job.slices}, {job.state()}")
+
+
+def test_weighted_round_robin(runner):
+    """QuantumScheduler: jobs alternate, each turn quantum * weight instructions"""
+    scheduler = QuantumScheduler(quantum=100)
+    light = scheduler.submit(load_words(SPIN_PROGRAM), max_steps=1000)
+    heavy = scheduler.submit(load_words(SPIN_PROGRAM), max_steps=1000, weight=3)
+
+    order = [scheduler.run_slice() for _ in range(4)]
+    if order != [light, heavy, light, heavy]:
+        runner.test_fail("turn order", "light, heavy, light, heavy", str(order))
+    if (light.executed, heavy.executed) != (200, 600):
+        runner.test_fail("shares", "(200, 600)", str((light.executed, heavy.executed)))
+
+    scheduler.run_all()
+    if (light.result.status, light.result.instruction_count) != ('max_steps', 1000):
+        runner.test_fail("budget", "max_steps after 1000", repr(light.status()))
+
+
+def test_cancel_and_busy_session(runner):
+    """QuantumScheduler: one job per session; cancelled jobs stop where they are"""
+    sim = load_words(SPIN_PROGRAM)
+    scheduler = QuantumScheduler(quantum=50)
+    job = scheduler.submit(sim, max_steps=10**9)
+    scheduler.run_slice()
+
+    try:
+        scheduler.submit(sim, max_steps=10)
+        runner.test_fail("second job", "RuntimeError", "accepted")
+    except RuntimeError:
+        pass
+
+    if not scheduler.cancel(job.id) or scheduler.cancel(job.id):
+        runner.test_fail("cancel", "True once", "not cancelled once")
+    if job.state() != 'cancelled' or job.result.instruction_count != 50 or scheduler.pending():
+        runner.test_fail("cancelled job", "cancelled after 50", repr(job.status()))
+    if scheduler.submit(sim, max_steps=10) is None:
+        runner.test_fail("resubmit", "new job", "None")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the persistent translation cache (translation_cache.py)
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pyrv32_system import RV32System
+from translation_cache import TranslationCache
+from block_engine import TIER_SOURCE
+from tests.helpers import BASE, quietly, write_elf
+
+
+LOOP_PROGRAM = [
+    0x01400093,  # 00: addi x1, x0, 20
+    0x00000113,  # 04: addi x2, x0, 0
+    0x00110133,  # 08: add x2, x2, x1       <- loop
+    0xfff08093,  # 0c: addi x1, x1, -1
+    0xfe009ce3,  # 10: bne x1, x0, loop
+    0x00100073,  # 14: ebreak
+]
+
+
+def cached_system(cache):
+    """RV32System using cache, with tier thresholds low enough for LOOP_PROGRAM"""
+    return quietly(RV32System, fs_root="/tmp", warm_threshold=2, hot_threshold=5,
+                   translation_cache=cache)
+
+
+def test_session_starts_warm(runner):
+    """TranslationCache: a second load of the same ELF restores predecode and block state"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TranslationCache(tmp)
+        elf = write_elf(tmp, LOOP_PROGRAM)
+
+        first = cached_system(cache)
+        info = first.load_elf(elf)
+        if info['translation_cache'] != 'cold':
+            runner.test_fail("first load", "cold", str(info['translation_cache']))
+        first.run()
+        if first.save_translation_cache() is None:
+            runner.test_fail("save", "cache file path", "None")
+
+        second = cached_system(cache)
+        info = second.load_elf(elf)
+        if info['translation_cache'] != {'predecoded': 6, 'blocks': 2}:
+            runner.test_fail("second load", "6 entries, 2 blocks", str(info['translation_cache']))
+        engine = second.block_engine
+        loop = engine.lookup(BASE + 0x08)
+        if loop.tier != TIER_SOURCE or loop.hits != first.block_engine.blocks[BASE + 0x08].hits:
+            runner.test_fail("restored block", f"tier {TIER_SOURCE}", repr(loop))
+
+        result = second.run()
+        if result.status != 'halted' or second.cpu.regs[:32] != first.cpu.regs[:32]:
+            runner.test_fail("warm run", f"halted, x2={first.cpu.regs[2]}",
+                             f"{result.status}, x2={second.cpu.regs[2]}")
+
+
+def test_stale_entries_rejected(runner):
+    """TranslationCache: other images and unreadable files start cold"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TranslationCache(tmp)
+        elf = write_elf(tmp, LOOP_PROGRAM)
+        sim = cached_system(cache)
+        sim.load_elf(elf)
+        sim.run()
+        path = sim.save_translation_cache()
+
+        # addi x1, x0, 20 -> addi x1, x0, 3: a different image
+        other = write_elf(tmp, [0x00300093] + LOOP_PROGRAM[1:], "other.elf")
+        sim = cached_system(cache)
+        info = sim.load_elf(other)
+        sim.run()
+        if info['translation_cache'] != 'cold' or sim.cpu.regs[2] != 6:
+            runner.test_fail("other image", "cold, x2=6",
+                             f"{info['translation_cache']}, x2={sim.cpu.regs[2]}")
+
+        with open(path, 'wb') as f:
+            f.write(b"truncated")
+        info = cached_system(cache).load_elf(elf)
+        if info['translation_cache'] != 'cold':
+            runner.test_fail("unreadable cache file", "cold", str(info['translation_cache']))
+
+        with open(path, 'w') as f:
+            json.dump({'entries': [[BASE, "code"]], 'blocks': []}, f)
+        info = cached_system(cache).load_elf(elf)
+        if info['translation_cache'] != 'cold':
+            runner.test_fail("malformed record", "cold", str(info['translation_cache']))
+
+
+def test_cache_file_is_plain_data(runner):
+    """TranslationCache: only instruction words and block extents/hits are stored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TranslationCache(tmp)
+        sim = cached_system(cache)
+        sim.load_elf(write_elf(tmp, LOOP_PROGRAM))
+        sim.run()
+        with open(sim.save_translation_cache()) as f:
+            record = json.load(f)
+
+        entries = sorted(tuple(entry) for entry in record['entries'])
+        expected = [(BASE + 4 * i, word) for i, word in enumerate(LOOP_PROGRAM)]
+        if entries != expected:
+            runner.test_fail("entries", str(expected), str(entries))
+        loop = sim.block_engine.blocks[BASE + 0x08]
+        if [BASE + 0x08, BASE + 0x14, loop.hits] not in record['blocks'] or \
+                not all(len(block) == 3 and all(isinstance(v, int) for v in block)
+                        for block in record['blocks']):
+            runner.test_fail("blocks", "[start, end, hits] integers", str(record['blocks']))
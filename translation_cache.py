@@ -0,0 +1,135 @@
+"""
+Translation Cache - Predecode and block state persisted across sessions
+
+A new simulator session starts cold: every instruction is decoded again
+on first execution and every block climbs the tiers again, re-running
+code generation for the hot ones. For a program the size of NetHack that
+is the slow first stretch of each MCP session. TranslationCache saves the
+warm state of a session next to the objdump cache (objdump_cache.CACHE_ROOT)
+and restores it when another session loads the same image:
+
+    predecode entries   (pc, insn) for executable segments
+    block metadata      start, end and hit count of every translated block
+
+Files are plain JSON named by a hash of the loaded PT_LOAD segments
+(ElfLoadResult.image_digest) and the cache format. The cache directory
+is shared, so nothing executable is stored: entries are decoded again on
+load, and blocks restored at the generated-source tier regenerate their
+code with block_code() when first translated. Restored state is only a
+starting point: predecode entries are checked against the words in
+memory before use, block metadata applies only when a block is
+translated with the same extent, and handlers are selected again.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from decoder import decode_instruction
+from objdump_cache import CACHE_ROOT
+
+
+# Bump when the saved record changes shape
+FORMAT_VERSION = 2
+
+PF_X = 0x1
+
+
+class TranslationCache:
+    """Saves and restores translation state keyed by the loaded image."""
+
+    def __init__(self, cache_dir=None):
+        """
+        Args:
+            cache_dir: Directory for cache files (default: objdump_cache.CACHE_ROOT)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else CACHE_ROOT
+
+    def path(self, image_digest):
+        """Return the cache file path for an image digest."""
+        tag = f"{FORMAT_VERSION}:{image_digest}"
+        return self.cache_dir / f"{hashlib.sha256(tag.encode('utf-8')).hexdigest()}.translation"
+
+    def load(self, image_digest, segments, predecode, engine):
+        """
+        Restore saved state into a freshly loaded image.
+
+        Args:
+            image_digest: ElfLoadResult.image_digest of the loaded image
+            segments: Loaded segments (ElfSegment); only executable ones
+                      are considered code
+            predecode: PredecodeCache to fill
+            engine: BlockEngine receiving the block metadata
+
+        Returns:
+            Tuple (predecode entries, blocks) restored, or None if there
+            is no usable cache file
+        """
+        try:
+            with self.path(image_digest).open('r', encoding='utf-8') as fp:
+                record = json.load(fp)
+            saved_entries = [(int(pc), int(insn)) for pc, insn in record['entries']]
+            saved_blocks = [(int(start), int(end), int(hits))
+                            for start, end, hits in record['blocks']]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError):
+            # Truncated or incompatible file: start cold, save() replaces it
+            return None
+
+        entries = 0
+        for seg in segments:
+            if not seg.flags & PF_X or not seg.filesz:
+                continue
+            image = predecode.memory.read_bytes(seg.vaddr, seg.filesz)
+            for pc, insn in saved_entries:
+                offset = pc - seg.vaddr
+                if not (0 <= offset <= seg.filesz - 4 and 0 <= insn <= 0xFFFFFFFF and
+                        image[offset:offset + 4] == insn.to_bytes(4, 'little')):
+                    continue
+                try:
+                    decoded = decode_instruction(insn)
+                except NotImplementedError:
+                    # Left for the lazy path to report when executed
+                    continue
+                predecode.insert(pc, insn, decoded)
+                entries += 1
+
+        blocks = 0
+        for start, end, hits in saved_blocks:
+            if all(word in predecode.entries for word in range(start, end, 4)):
+                # Code is regenerated by the engine if the block is hot
+                engine.warm_blocks[start] = (end, hits, None)
+                blocks += 1
+        return entries, blocks
+
+    def save(self, image_digest, segments, predecode, engine):
+        """
+        Save the current state for an image.
+
+        Blocks restored but not translated again this session are kept.
+
+        Args:
+            image_digest: ElfLoadResult.image_digest of the loaded image
+            segments: Loaded segments (ElfSegment)
+            predecode: PredecodeCache to save
+            engine: BlockEngine to save
+
+        Returns:
+            Path of the written cache file
+        """
+        ranges = [(seg.vaddr, seg.vaddr + seg.filesz) for seg in segments if seg.flags & PF_X]
+        entries = [(pc, insn) for pc, (insn, _, _) in predecode.entries.items()
+                   if any(low <= pc < high for low, high in ranges)]
+        blocks = [(start, end, hits) for start, (end, hits, _) in engine.warm_blocks.items()]
+        blocks += [(block.start, block.end, block.hits) for block in engine.blocks.values()]
+
+        path = self.path(image_digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        with temp.open('w', encoding='utf-8') as fp:
+            json.dump({'entries': entries, 'blocks': blocks}, fp)
+        os.replace(temp, path)
+        return path
+
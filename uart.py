@@ -15,6 +15,8 @@ import pty
 import select
 import termios
 import fcntl
+import threading
+import time
 
 try:
     import pyte
@@ -32,6 +34,10 @@ CONSOLE_UART_TX_ADDR = 0x10001000
 CONSOLE_UART_RX_ADDR = 0x10001004
 CONSOLE_UART_RX_STATUS_ADDR = 0x10001008
 
+# Longest single sleep of wait_for_input() on a PTY/stdin (seconds), so
+# injected input is noticed promptly too
+INPUT_WAIT_SLICE = 0.05
+
 # Legacy alias
 UART_TX_ADDR = DEBUG_UART_TX_ADDR
 
@@ -157,6 +163,7 @@ class ConsoleUART:
         self.use_pty = use_pty
         self.save_output = save_output
         self.rx_buffer = bytearray()
+        self.input_ready = threading.Event()  # Set by inject_input()
         self.tx_buffer = bytearray() if save_output else None
         self.save_raw_output = save_raw_output
         self.raw_output_file = None
@@ -294,6 +301,42 @@ class ConsoleUART:
         else:
             return 0xFF  # No data available
     
+    def has_input(self):
+        """
+        Check if RX data is available, without rx_status()'s logging.
+        
+        Returns:
+            True if at least one byte can be received
+        """
+        self._poll_input()
+        return bool(self.rx_buffer)
+    
+    def wait_for_input(self, timeout=None):
+        """
+        Sleep until RX data is available (used to idle on WFI).
+        
+        Wakes on inject_input() from another thread, or on PTY/stdin data.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            True if input is available, False if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.input_ready.clear()
+            if self.has_input():
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if self.master_fd is None:
+                self.input_ready.wait(remaining)
+            else:
+                wait = INPUT_WAIT_SLICE if remaining is None else min(remaining, INPUT_WAIT_SLICE)
+                select.select([self.master_fd], [], [], wait)
+    
     def rx_status(self):
         """
         Check if RX data is available.
@@ -310,7 +353,6 @@ class ConsoleUART:
         # Auto-dump screen when checking RX status and no data available (waiting for input)
         # Rate limit: only dump if screen changed or 1 second elapsed
         if status == 0 and PYTE_AVAILABLE and hasattr(self, 'screen'):
-            import time
             current_time = time.time()
             current_screen = '\n'.join(self.screen.display)
             
@@ -411,6 +453,7 @@ class ConsoleUART:
         if isinstance(data, str):
             data = data.encode('utf-8')
         self.rx_buffer.extend(data)
+        self.input_ready.set()
         
         # Log injected input
         for byte in data: